@@ -0,0 +1,98 @@
+import os
+import threading
+from file_lock import FileLock
+from storage import iter_accounts
+from validation import luhn_digit, CHECKED_ACCOUNT_LENGTH
+
+SEQUENCE_FILE = "account.seq"
+# Numbers reserved per trip to the sequence file. Unused numbers in a block
+# are skipped after a restart, never handed out twice.
+BLOCK_SIZE = 1000
+# 11-digit sequence, so allocated numbers never look like the 10-digit
+# timestamps older accounts were given.
+SEQUENCE_START = 10 ** 10
+CHECK_DIGIT = True
+
+
+class AccountNumberAllocator:
+    def __init__(self, path=SEQUENCE_FILE, block_size=BLOCK_SIZE, check_digit=CHECK_DIGIT, existing=None):
+        self.path = path
+        self.block_size = block_size
+        self.check_digit = check_digit
+        # Callable returning existing account numbers; only used to seed a
+        # missing sequence file past anything already allocated.
+        self.existing = existing
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(path + ".lock")
+        self._next = 0
+        self._end = 0
+        self._pid = os.getpid()
+        self.blocks = 0
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                return int(f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def _write(self, value):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(str(value))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _seed(self):
+        start = SEQUENCE_START
+        for acc_no in (self.existing() if self.existing else ()):
+            digits = acc_no[3:]
+            if len(acc_no) == CHECKED_ACCOUNT_LENGTH:
+                digits = digits[:-1]
+            if digits.isdigit() and len(digits) == len(str(SEQUENCE_START)):
+                start = max(start, int(digits) + 1)
+        return start
+
+    def _reserve_block(self):
+        with self._file_lock:
+            start = self._read()
+            if start is None:
+                start = self._seed()
+            # The reservation is on disk before any number from it is used.
+            self._write(start + self.block_size)
+        self._next = start
+        self._end = start + self.block_size
+        self.blocks += 1
+
+    def format(self, sequence):
+        digits = str(sequence)
+        if self.check_digit:
+            digits += luhn_digit(digits)
+        return f"ACC{digits}"
+
+    def allocate(self):
+        with self._lock:
+            if os.getpid() != self._pid:
+                # Forked child: the parent's block is not ours to use.
+                self._pid = os.getpid()
+                self._next = self._end = 0
+            if self._next >= self._end:
+                self._reserve_block()
+            sequence = self._next
+            self._next += 1
+        return self.format(sequence)
+
+    def allocate_many(self, count):
+        return [self.allocate() for _ in range(count)]
+
+
+def _existing_numbers():
+    return (row.account_number for row in iter_accounts(fields=("account_number",)))
+
+
+allocator = AccountNumberAllocator(existing=_existing_numbers)
+
+
+def next_account_number():
+    return allocator.allocate()
@@ -0,0 +1,267 @@
+import threading
+from collections import OrderedDict
+from storage import StorageBackend
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def estimate_account_size(account):
+    # Rough in-memory footprint: fixed fields plus the history columns, which
+    # dominate for long-lived accounts.
+    return 1024 + 40 * len(account.history)
+
+
+class CachedStorage(StorageBackend):
+    # Write-through (the default) keeps its own copy of each account and hands
+    # out copies, so a caller changing an account it has not saved yet (or
+    # failed to save) never shows through to other sessions. Write-back has
+    # to share the caller's instance: it holds the only copy of the unsaved
+    # changes until they are flushed.
+    def __init__(self, backend, max_bytes=DEFAULT_MAX_BYTES, max_accounts=None, write_back=False):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.max_accounts = max_accounts
+        self.write_back = write_back
+
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._dirty = set()
+        self._bytes = 0
+        self._version = backend.version()
+        self._writes = threading.local()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.writes = 0
+
+    def _check_version(self):
+        version = self.backend.version()
+        if version != self._version:
+            if self._dirty:
+                self._flush_dirty()
+                version = self.backend.version()
+            self._drop_all()
+            self.invalidations += 1
+            self._version = version
+
+    def _drop_all(self):
+        self._entries.clear()
+        self._sizes.clear()
+        self._bytes = 0
+
+    def _remember(self, acc_no, account):
+        if acc_no in self._entries:
+            self._bytes -= self._sizes[acc_no]
+        size = estimate_account_size(account)
+        self._entries[acc_no] = account
+        self._entries.move_to_end(acc_no)
+        self._sizes[acc_no] = size
+        self._bytes += size
+        self._evict()
+
+    def _adopt_version(self):
+        # After our own backend write: move to the new version only if the
+        # write started from the version we were in step with. Otherwise
+        # someone else wrote since _check_version; keeping the old version
+        # makes the next call drop everything.
+        before, after = self.backend.last_write()
+        if before == self._version:
+            self._version = after
+        self._writes.versions = None
+
+    def _out(self, account):
+        return account if self.write_back or account is None else account.copy()
+
+    def _in(self, account):
+        return account if self.write_back else account.copy()
+
+    def _forget(self, acc_no):
+        if acc_no in self._entries:
+            del self._entries[acc_no]
+            self._bytes -= self._sizes.pop(acc_no)
+        self._dirty.discard(acc_no)
+
+    def _over_budget(self):
+        if self.max_accounts is not None and len(self._entries) > self.max_accounts:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes
+
+    def _evict(self):
+        while len(self._entries) > 1 and self._over_budget():
+            acc_no, account = self._entries.popitem(last=False)
+            self._bytes -= self._sizes.pop(acc_no)
+            if acc_no in self._dirty:
+                self._dirty.discard(acc_no)
+                self._write(account)
+            self.evictions += 1
+
+    def _write(self, account):
+        self.backend.save_account(account, allow_update=True)
+        self.writes += 1
+        self._adopt_version()
+
+    def _flush_dirty(self):
+        for acc_no in list(self._dirty):
+            self._write(self._entries[acc_no])
+        self._dirty.clear()
+        self.backend.wait_durable()
+
+    def mark_dirty(self, account):
+        acc_no = str(account.account_number)
+        with self._lock:
+            self._remember(acc_no, account)
+            self._dirty.add(acc_no)
+            # Nothing written: listeners notified of this save stay in step.
+            version = self.backend.version()
+            self._writes.versions = (version, version)
+
+    def flush(self):
+        with self._lock:
+            self._flush_dirty()
+
+    def load_account(self, acc_no):
+        acc_no = str(acc_no)
+        with self._lock:
+            self._check_version()
+            account = self._entries.get(acc_no)
+            if account is not None:
+                self._entries.move_to_end(acc_no)
+                self.hits += 1
+                return self._out(account)
+
+            self.misses += 1
+            account = self.backend.load_account(acc_no)
+            if account is not None:
+                self._remember(acc_no, account)
+            return self._out(account)
+
+    def load_history(self, acc_no, start=None, end=None, offset=0, limit=None, newest_first=True):
+        acc_no = str(acc_no)
+        with self._lock:
+            self._check_version()
+            account = self._entries.get(acc_no)
+            if account is not None:
+                self.hits += 1
+                return account.get_history_page(start, end, offset, limit, newest_first)
+            # Not cached: let the backend serve just the page instead of
+            # pulling the whole account (and its history) into the cache.
+            return self.backend.load_history(acc_no, start, end, offset, limit, newest_first)
+
+    def account_exists(self, acc_no):
+        acc_no = str(acc_no)
+        with self._lock:
+            self._check_version()
+            if acc_no in self._entries:
+                return True
+            return self.backend.account_exists(acc_no)
+
+    def save_account(self, account, allow_update=False):
+        acc_no = str(account.account_number)
+        with self._lock:
+            self._check_version()
+            if not allow_update or not self.write_back:
+                try:
+                    self.backend.save_account(account, allow_update)
+                except BaseException:
+                    # Whatever the failure (version conflict, disk error), the
+                    # stored account may differ from anything cached; reload
+                    # it next time.
+                    self._forget(acc_no)
+                    raise
+                self.writes += 1
+                self._adopt_version()
+                self._remember(acc_no, self._in(account))
+                self._dirty.discard(acc_no)
+            else:
+                self.mark_dirty(account)
+
+    def save_accounts(self, accounts, allow_update=True):
+        accounts = list(accounts)
+        with self._lock:
+            self._check_version()
+            if allow_update and self.write_back:
+                for account in accounts:
+                    self.mark_dirty(account)
+                return
+            try:
+                self.backend.save_accounts(accounts, allow_update)
+            except BaseException:
+                for account in accounts:
+                    self._forget(str(account.account_number))
+                raise
+            self.writes += 1
+            self._adopt_version()
+            for account in accounts:
+                acc_no = str(account.account_number)
+                self._remember(acc_no, self._in(account))
+                self._dirty.discard(acc_no)
+
+    def delete_account(self, acc_no):
+        acc_no = str(acc_no)
+        with self._lock:
+            self._check_version()
+            self._forget(acc_no)
+            deleted = self.backend.delete_account(acc_no)
+            if deleted:
+                self._adopt_version()
+            return deleted
+
+    def load_all_accounts(self):
+        with self._lock:
+            self._check_version()
+            self._flush_dirty()
+            if not self.write_back:
+                return self.backend.load_all_accounts()
+            # Hand back the cached instance where there is one so callers
+            # never see two objects for the same account.
+            return [
+                self._entries.get(str(acc.account_number), acc)
+                for acc in self.backend.load_all_accounts()
+            ]
+
+    def iter_accounts(self, fields=None):
+        with self._lock:
+            self._check_version()
+            self._flush_dirty()
+        return self.backend.iter_accounts(fields)
+
+    def save_all_accounts(self, accounts_dict):
+        with self._lock:
+            self._dirty.clear()
+            self._drop_all()
+            self.backend.save_all_accounts(accounts_dict)
+            self._version = self.backend.version()
+
+    def version(self):
+        return self.backend.version()
+
+    def last_write(self):
+        versions = getattr(self._writes, "versions", None)
+        return versions if versions is not None else self.backend.last_write()
+
+    def wait_durable(self):
+        # Outside self._lock, so saves of other accounts aren't held up.
+        self.backend.wait_durable()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "writes": self.writes,
+                "dirty": len(self._dirty),
+                "entries": len(self._entries),
+                "bytes": self._bytes
+            }
+
+    def close(self):
+        with self._lock:
+            self._flush_dirty()
+        self.backend.close()
@@ -0,0 +1,155 @@
+import heapq
+from bisect import bisect_left, insort
+from storage import add_save_listener
+from store_view import StoreView
+
+INDEX_FIELDS = ("account_number", "mobile", "email", "branch_code", "holder")
+SEARCH_FIELDS = ("mobile", "email", "branch", "name")
+DEFAULT_LIMIT = 50
+# From this many accounts in one save, the name list is re-sorted once
+# instead of an insort per account.
+BULK_SAVE = 32
+
+
+def _key(field, value):
+    value = str(value or "").strip()
+    if field in ("email", "holder"):
+        return value.lower()
+    if field == "branch_code":
+        return value.upper()
+    return value
+
+
+class AccountIndex(StoreView):
+    # Secondary indexes kept in step with storage's save/remove notifications:
+    # exact-match dicts for mobile, email and branch, and a sorted
+    # (lowercased holder, account number) list searched by bisection for
+    # name prefixes.
+    FIELDS = INDEX_FIELDS
+
+    def _reset(self):
+        self.entries = {}
+        self.by_mobile = {}
+        self.by_email = {}
+        self.by_branch = {}
+        self.holders = []
+
+    def _entry(self, acc_no, mobile, email, branch_code, holder):
+        return (acc_no, _key("mobile", mobile), _key("email", email),
+                _key("branch_code", branch_code), _key("holder", holder))
+
+    def _add_keys(self, entry):
+        acc_no, mobile, email, branch, holder = entry
+        self.by_mobile.setdefault(mobile, set()).add(acc_no)
+        self.by_email.setdefault(email, set()).add(acc_no)
+        self.by_branch.setdefault(branch, set()).add(acc_no)
+
+    def _discard_keys(self, entry):
+        acc_no, mobile, email, branch, holder = entry
+        for index, key in ((self.by_mobile, mobile), (self.by_email, email), (self.by_branch, branch)):
+            members = index.get(key)
+            if members is not None:
+                members.discard(acc_no)
+                if not members:
+                    del index[key]
+
+    def _add(self, entry):
+        self._add_keys(entry)
+        insort(self.holders, (entry[4], entry[0]))
+
+    def _discard(self, entry):
+        self._discard_keys(entry)
+        acc_no, holder = entry[0], entry[4]
+        i = bisect_left(self.holders, (holder, acc_no))
+        if i < len(self.holders) and self.holders[i] == (holder, acc_no):
+            del self.holders[i]
+
+    def _put(self, entry):
+        old = self.entries.get(entry[0])
+        if old == entry:
+            return
+        if old is not None:
+            self._discard(old)
+        self.entries[entry[0]] = entry
+        self._add(entry)
+
+    def _load(self, rows):
+        for row in rows:
+            entry = self._entry(*row)
+            self.entries[entry[0]] = entry
+            self._add_keys(entry)
+            self.holders.append((entry[4], entry[0]))
+        # One sort after the scan instead of an insort per account.
+        self.holders.sort()
+
+    def _saved(self, acc):
+        self._put(self._entry(str(acc.account_number), acc.mobile, acc.email, acc.branch_code, acc.holder))
+
+    def _saved_all(self, accounts):
+        if len(accounts) < BULK_SAVE:
+            super()._saved_all(accounts)
+            return
+        # Bulk saves (onboarding): names are dropped with one filter and
+        # added with one sort, as in _load.
+        stale = set()
+        added = {}
+        for acc in accounts:
+            entry = self._entry(str(acc.account_number), acc.mobile, acc.email, acc.branch_code, acc.holder)
+            old = self.entries.get(entry[0])
+            if old == entry:
+                continue
+            if old is not None:
+                self._discard_keys(old)
+                stale.add((old[4], old[0]))
+            self.entries[entry[0]] = entry
+            self._add_keys(entry)
+            added[entry[0]] = (entry[4], entry[0])
+        if stale:
+            self.holders = [pair for pair in self.holders if pair not in stale]
+        self.holders.extend(added.values())
+        self.holders.sort()
+
+    def _removed(self, acc_no):
+        old = self.entries.pop(acc_no, None)
+        if old is not None:
+            self._discard(old)
+
+    def _exact(self, index_name, field, value, limit):
+        with self._lock:
+            self._ensure_loaded()
+            return heapq.nsmallest(limit, getattr(self, index_name).get(_key(field, value), ()))
+
+    def find_by_mobile(self, mobile, limit=DEFAULT_LIMIT):
+        return self._exact("by_mobile", "mobile", mobile, limit)
+
+    def find_by_email(self, email, limit=DEFAULT_LIMIT):
+        return self._exact("by_email", "email", email, limit)
+
+    def find_by_branch(self, branch_code, limit=DEFAULT_LIMIT):
+        return self._exact("by_branch", "branch_code", branch_code, limit)
+
+    def find_by_name_prefix(self, prefix, limit=DEFAULT_LIMIT):
+        prefix = _key("holder", prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            self._ensure_loaded()
+            found = []
+            i = bisect_left(self.holders, (prefix, ""))
+            while i < len(self.holders) and len(found) < limit:
+                holder, acc_no = self.holders[i]
+                if not holder.startswith(prefix):
+                    break
+                found.append(acc_no)
+                i += 1
+            return found
+
+    def mobile_taken(self, mobile):
+        return bool(self.find_by_mobile(mobile, 1))
+
+    def email_taken(self, email):
+        return bool(self.find_by_email(email, 1))
+
+
+account_index = AccountIndex()
+add_save_listener(account_index.on_save)
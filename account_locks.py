@@ -0,0 +1,64 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class AccountLocks:
+    # One RLock per account currently locked or waited on. Each entry counts
+    # its holders and waiters and is dropped when the last one releases, so
+    # the table stays as small as the number of accounts in use right now.
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def _checkout(self, acc_no):
+        with self._guard:
+            entry = self._locks.get(acc_no)
+            if entry is None:
+                entry = self._locks[acc_no] = [threading.RLock(), 0]
+            entry[1] += 1
+            return entry
+
+    def _checkin(self, acc_no, entry):
+        with self._guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[acc_no]
+
+    def acquire(self, acc_nos):
+        # Always lock in account-number order so two operations touching the
+        # same accounts can never wait on each other in a cycle.
+        held = []
+        try:
+            for acc_no in sorted(set(map(str, acc_nos))):
+                entry = self._checkout(acc_no)
+                try:
+                    entry[0].acquire()
+                except BaseException:
+                    self._checkin(acc_no, entry)
+                    raise
+                held.append((acc_no, entry))
+        except BaseException:
+            self.release(held)
+            raise
+        return held
+
+    def release(self, held):
+        for acc_no, entry in reversed(held):
+            entry[0].release()
+            self._checkin(acc_no, entry)
+
+    def __len__(self):
+        return len(self._locks)
+
+    @contextmanager
+    def locked(self, acc_nos):
+        start = time.perf_counter()
+        locks = self.acquire(acc_nos)
+        try:
+            yield time.perf_counter() - start
+        finally:
+            self.release(locks)
+
+
+account_locks = AccountLocks()
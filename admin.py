@@ -1,9 +1,37 @@
+from pin_security import check_pin, hash_pin, is_pin_hash
+
+SUPREME = "Supreme"
+ADMIN = "admin"
+
+# What each role may do; checked against the Admin held by the session, so
+# no reload is needed.
+ROLE_PERMISSIONS = {
+    SUPREME: {"create_admin", "manage_accounts", "view_reports"},
+    ADMIN: {"manage_accounts", "view_reports"}
+}
+
+# Admin passwords are checked far less often than PINs, so they can afford a
+# higher hashing cost.
+ADMIN_HASH_ITERATIONS = 200000
+
+
 class Admin:
-    def __init__(self, username, password, role="admin"):
+    def __init__(self, username, password, role=ADMIN):
         self.username = username
+        # Salted hash once saved; plaintext only until hash_password() runs
+        # (or for admins written by older versions).
         self.password = password
         self.role = role
         
     def verify(self, username, password):
-        return self.username == username and self.password == password
+        return self.username == username and check_pin(self.password, password)
+
+    def hash_password(self):
+        if not is_pin_hash(self.password):
+            self.password = hash_pin(self.password, ADMIN_HASH_ITERATIONS)
+
+    def can(self, permission):
+        return permission in ROLE_PERMISSIONS.get(self.role, ())
 
+    def is_supreme(self):
+        return self.role == SUPREME
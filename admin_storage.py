@@ -1,42 +1,178 @@
 import os
 import json
-from admin import Admin
+import threading
+from admin import Admin, SUPREME, ADMIN_HASH_ITERATIONS
+from file_lock import FileLock
+from journal_lines import read_line, drop_torn_tail
+from metrics import timed
+from pin_security import hash_pin, check_pin, needs_rehash
 
 Admin_File = "admin.json"
+# New and updated admins are appended here (one JSON record per line, last
+# one wins) and folded back into Admin_File every COMPACT_EVERY records.
+Admin_Journal = "admin.journal"
+COMPACT_EVERY = 100
 
+
+def _file_sig(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _record(admin):
+    return {"username": admin.username, "password": admin.password, "role": admin.role}
+
+
+class AdminRegistry:
+    # Admins indexed by username and cached in memory; reloaded only when
+    # either file's mtime/size changes.
+    def __init__(self, path=None, journal_path=None):
+        self.path = path or Admin_File
+        self.journal_path = journal_path or Admin_Journal
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.splitext(self.path)[0] + ".lock")
+        self._admins = None
+        self._sigs = None
+        self._journal_entries = 0
+        self._journal_end = 0
+        self._dummy_hash = None
+
+    def _current_sigs(self):
+        return (_file_sig(self.path), _file_sig(self.journal_path))
+
+    def _load(self):
+        admins = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                for a in json.load(f):
+                    admins[a["username"]] = Admin(a["username"], a["password"], a["role"])
+        self._journal_entries = 0
+        self._journal_end = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    # Skip a torn last line from a crashed writer.
+                    if not line.endswith(b"\n"):
+                        break
+                    self._journal_end += len(line)
+                    try:
+                        a = read_line(line)[1]
+                    except ValueError:
+                        # Not a torn write (that always ends in a whole record).
+                        continue
+                    admins[a["username"]] = Admin(a["username"], a["password"], a["role"])
+                    self._journal_entries += 1
+        self._admins = admins
+        self._sigs = self._current_sigs()
+
+    def _refresh(self):
+        if self._admins is None or self._current_sigs() != self._sigs:
+            self._load()
+        return self._admins
+
+    def _append(self, admin):
+        drop_torn_tail(self.journal_path, self._journal_end)
+        data = (json.dumps(_record(admin)) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._admins[admin.username] = admin
+        self._journal_entries += 1
+        self._journal_end += len(data)
+        self._sigs = self._current_sigs()
+        if self._journal_entries >= COMPACT_EVERY:
+            self._compact()
+
+    def _compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump([_record(a) for a in self._admins.values()], f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        if os.path.exists(self.journal_path):
+            os.truncate(self.journal_path, 0)
+        self._journal_entries = 0
+        self._journal_end = 0
+        self._sigs = self._current_sigs()
+
+    def get(self, username):
+        with self._lock:
+            return self._refresh().get(username)
+
+    def all(self):
+        with self._lock:
+            return list(self._refresh().values())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._refresh())
+
+    def add(self, admin):
+        # Hash before taking the locks; the duplicate check is a dict lookup.
+        admin.hash_password()
+        with self._lock, self._file_lock:
+            if admin.username in self._refresh():
+                raise ValueError("Admin already exists")
+            self._append(admin)
+
+    def authenticate(self, username, password):
+        admin = self.get(username)
+        if admin is None:
+            # Spend the same hashing time as a real check so unknown
+            # usernames can't be told apart by timing.
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_pin("", ADMIN_HASH_ITERATIONS)
+            check_pin(self._dummy_hash, password)
+            return None
+        if not admin.verify(username, password):
+            return None
+        if needs_rehash(admin.password, ADMIN_HASH_ITERATIONS):
+            self._upgrade(admin, password)
+        return admin
+
+    def _upgrade(self, admin, password):
+        # Plaintext password from an older admin.json: store it hashed.
+        upgraded = Admin(admin.username, hash_pin(password, ADMIN_HASH_ITERATIONS), admin.role)
+        with self._lock, self._file_lock:
+            current = self._refresh().get(admin.username)
+            if current is not None and current.password == admin.password:
+                self._append(upgraded)
+                admin.password = upgraded.password
+
+
+registry = AdminRegistry()
+
+
+@timed("admin_save")
 def save_admin(admin):
-    admins = load_admins()
-    for a in admins:
-        if a.username == admin.username:
-            raise ValueError("Admin already exists")
-    
-    admins.append(admin)
-    with open(Admin_File, "w") as f:
-        json.dump([
-                   {
-                       "username": a.username,
-                       "password": a.password,
-                       "role": a.role
-                   } for a in admins], f, indent=4
-                   )
+    registry.add(admin)
+
 
+@timed("admin_load_all")
 def load_admins():
-    if not os.path.exists(Admin_File):
-        return []
-    with open(Admin_File, "r") as f:
-        data = json.load(f)
-
-    admins = []
-    for a in data:
-        admins.append(Admin(a["username"], a["password"], a["role"]))
-    return admins
-        
+    return registry.all()
+
+
+@timed("admin_find")
+def find_admin(username):
+    return registry.get(username)
+
+
+@timed("admin_authenticate")
+def authenticate_admin(username, password):
+    return registry.authenticate(username, password)
+
+
 def initialize_supreme_admin():
-    admins = load_admins()
-    if not admins:
+    if not len(registry):
         print("🚫 No admin found. Create Supreme Admin")
         username = input("Supreme admin username: ")
         password = input("Supreme admin password: ")
-        supreme = Admin(username, password, role="Supreme")
+        supreme = Admin(username, password, role=SUPREME)
         save_admin(supreme)
-        print("Supreme Admin created successfully")
\ No newline at end of file
+        print("Supreme Admin created successfully")
@@ -0,0 +1,108 @@
+import heapq
+from bisect import bisect_right
+from storage import add_save_listener
+from store_view import StoreView
+from ledger_columns import BALANCE_BANDS, band_labels, to_paise
+
+REPORT_FIELDS = ("account_number", "branch_code", "account_type", "status", "KYC", "balance")
+DEFAULT_TOP_K = 10
+
+
+class AccountAnalytics(StoreView):
+    # Admin rollups kept up to date from storage's save notifications: each
+    # save only moves its own account's contribution.
+    FIELDS = REPORT_FIELDS
+
+    def __init__(self, edges_rupees=BALANCE_BANDS):
+        self.edges = [to_paise(edge) for edge in edges_rupees]
+        self.labels = band_labels(edges_rupees)
+        StoreView.__init__(self)
+
+    def _reset(self):
+        self.accounts = {}
+        self.by_branch = {}
+        self.by_type = {}
+        self.by_status = {}
+        self.kyc_pending = {}
+
+    def _contribution(self, acc_no, branch, account_type, status, kyc, balance):
+        return (acc_no, branch, account_type, status, bool(kyc), to_paise(balance))
+
+    def _apply(self, entry, sign):
+        acc_no, branch, account_type, status, kyc, paise = entry
+        count, total = self.by_branch.get(branch, (0, 0))
+        self.by_branch[branch] = (count + sign, total + sign * paise)
+
+        bands = self.by_type.setdefault(account_type, [0] * (len(self.edges) + 1))
+        bands[bisect_right(self.edges, paise)] += sign
+
+        self.by_status[status] = self.by_status.get(status, 0) + sign
+        if not kyc:
+            self.kyc_pending[branch] = self.kyc_pending.get(branch, 0) + sign
+
+    def _put(self, entry):
+        old = self.accounts.get(entry[0])
+        if old is not None:
+            self._apply(old, -1)
+        self.accounts[entry[0]] = entry
+        self._apply(entry, 1)
+
+    def _add_row(self, row):
+        self._put(self._contribution(*row))
+
+    def _saved(self, acc):
+        self._put(self._contribution(
+            str(acc.account_number), acc.branch_code, acc.account_type,
+            acc.status, acc.KYC, acc.balance
+        ))
+
+    def _removed(self, acc_no):
+        old = self.accounts.pop(acc_no, None)
+        if old is not None:
+            self._apply(old, -1)
+
+    def _prune(self, counts):
+        return {key: value for key, value in sorted(counts.items(), key=lambda item: str(item[0])) if value}
+
+    def branch_totals(self):
+        with self._lock:
+            self._ensure_loaded()
+            return {branch: value for branch, value in sorted(self.by_branch.items()) if value[0]}
+
+    def type_distribution(self):
+        with self._lock:
+            self._ensure_loaded()
+            return {
+                account_type: list(zip(self.labels, bands))
+                for account_type, bands in sorted(self.by_type.items()) if any(bands)
+            }
+
+    def status_counts(self):
+        with self._lock:
+            self._ensure_loaded()
+            return self._prune(self.by_status)
+
+    def kyc_pending_by_branch(self):
+        with self._lock:
+            self._ensure_loaded()
+            return self._prune(self.kyc_pending)
+
+    def top_accounts(self, k=DEFAULT_TOP_K):
+        with self._lock:
+            self._ensure_loaded()
+            top = heapq.nlargest(int(k), self.accounts.values(), key=lambda entry: entry[5])
+            return [(entry[0], entry[5]) for entry in top]
+
+    def report(self, k=DEFAULT_TOP_K):
+        with self._lock:
+            return {
+                "branch_totals": self.branch_totals(),
+                "type_distribution": self.type_distribution(),
+                "status_counts": self.status_counts(),
+                "kyc_pending": self.kyc_pending_by_branch(),
+                "top_accounts": self.top_accounts(k)
+            }
+
+
+analytics = AccountAnalytics()
+add_save_listener(analytics.on_save)
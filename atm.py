@@ -1,9 +1,12 @@
 from datetime import date
-from bank_account import BankAccount
-from storage import save_all_accounts_to_file, save_account, load_all_accounts
-from admin import Admin
-from admin_storage import save_admin, load_admins
-from validation import (validate_account_number, validate_pin, validate_name, validate_amount, validate_date, validate_email, validate_mobile)
+from itertools import chain
+from bank_service import service, generate_account_number, AccountBlocked
+from ledger_columns import format_paise
+from storage import account_numbers
+from validation import (validate_account_number, validate_pin, validate_name, validate_amount, validate_date, validate_email, validate_mobile, validate_address, validate_branch_code)
+
+HISTORY_PAGE_SIZE = 10
+TERMINAL = "console"
 
 
 def get_input(prompt, input_type='str', validation=None, validation_args=None, min_length=None, max_length=None, choices=None, min_value=None, max_value=None):
@@ -64,12 +67,17 @@ def get_input(prompt, input_type='str', validation=None, validation_args=None, m
             return user_input
 
 
-def create_admin():
+def create_admin(admin):
+    if not admin.can("create_admin"):
+        print("❌ Only the Supreme admin can create admins")
+        return
     username = input("Admin username: ").strip()
     password = input("Admin Password: ")
-    admin = Admin(username, password)
-    save_admin(admin)
-    print("✅ Admin account created successfully")
+    try:
+        service.create_admin(admin, username, password)
+        print("✅ Admin account created successfully")
+    except ValueError as e:
+        print(f"❌ {e}")
 
 
 def admin_login():
@@ -77,16 +85,12 @@ def admin_login():
         username = input("Enter username: ")
         password = input("Enter password: ")
 
-        admins = load_admins()
-        for admin in admins:
-            if admin.verify(username, password):
-                print("✅ Logged in successfully")
-                return True
-        print("❌ Invalid admin credentials")
-        return False
+        admin = service.admin_login(username, password)
+        print("✅ Logged in successfully")
+        return admin
     except ValueError:
         print(f"❌ Invalid admin credentials")
-        return False
+        return None
 
 
 def admin_menu():
@@ -99,13 +103,144 @@ def admin_menu():
     print("4. Update user Name")
     print("5. Reset user PIN")
     print("6. Change Account Status")
-    print("7. Logout")
+    print("7. View account history")
+    print("8. Reports")
+    print("9. Search accounts")
+    print("10. Logout")
     print("="*40)
 
 
-def view_all_accounts():
-    accounts = load_all_accounts()
+def show_history(acc_no, admin=None):
+    from_date = to_date = None
+    if input("Filter by date range? (Y/N): ").upper().strip() == 'Y':
+        from_date = get_input("From date (DD-MM-YYYY): ", input_type="str", validation=validate_date)
+        to_date = get_input("To date (DD-MM-YYYY): ", input_type="str", validation=validate_date)
+    
+    offset = 0
+    while True:
+        try:
+            # One extra entry tells us whether there is an older page.
+            if admin is not None:
+                entries = service.account_history(admin, acc_no, HISTORY_PAGE_SIZE + 1, offset, from_date, to_date)
+            else:
+                entries = service.history(acc_no, HISTORY_PAGE_SIZE + 1, offset, from_date, to_date)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+        
+        if not entries and offset == 0:
+            print("\n📋 No transaction history")
+            return
+        
+        print("\n" + "="*50)
+        print("    TRANSACTION HISTORY (newest first)")
+        print("="*50)
+        for h in entries[:HISTORY_PAGE_SIZE]:
+            print(h)
+        print("="*50)
+        
+        if len(entries) <= HISTORY_PAGE_SIZE:
+            return
+        if input("Show older transactions? (Y/N): ").upper().strip() != 'Y':
+            return
+        offset += HISTORY_PAGE_SIZE
+
+
+def view_account_history(admin):
+    print("\n" + "="*50)
+    print("         ACCOUNT HISTORY")
+    print("="*50)
+    
+    acc_no = get_input(
+        "Enter account number: ",
+        input_type="str",
+        validation=validate_account_number,
+        validation_args={'existing': account_numbers}
+    ).upper()
+    
+    show_history(acc_no, admin)
+
+
+def search_accounts(admin):
+    print("\n" + "="*50)
+    print("         SEARCH ACCOUNTS")
+    print("="*50)
+    print("1. By mobile number")
+    print("2. By email address")
+    print("3. By branch code")
+    print("4. By name (starts with)")
+    
+    searches = {1: ("mobile", "Enter mobile number: "), 2: ("email", "Enter email address: "),
+                3: ("branch", "Enter branch code: "), 4: ("name", "Enter the start of the name: ")}
+    choice = get_input("Search by (1-4): ", input_type="menu")
+    if choice not in searches:
+        print("❌ Invalid choice")
+        return
+    
+    by, prompt = searches[choice]
+    value = get_input(prompt, input_type="str")
+    try:
+        accounts = service.search_accounts(admin, by, value)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    
     if not accounts:
+        print("\n📋 No matching accounts")
+        return
+    
+    print("\n" + "="*90)
+    print(f"{'Account':<16} {'Holder':<22} {'Mobile':<12} {'Branch':<8} {'Status':<10} {'Balance':>14}")
+    print("-"*90)
+    for acc in accounts:
+        print(f"{acc.account_number:<16} {acc.holder[:21]:<22} {acc.mobile:<12} {acc.branch_code:<8} "
+              f"{acc.status:<10} {'₹' + format(acc.balance, ',.2f'):>14}")
+    print("="*90)
+    print(f"{len(accounts)} account(s) found")
+
+
+def show_reports(admin):
+    try:
+        report = service.reports(admin)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+    
+    print("\n" + "="*60)
+    print("                    BANK REPORTS")
+    print("="*60)
+    
+    print("\n🏦 Deposits per branch:")
+    for branch, (count, paise) in report["branch_totals"].items():
+        print(f"   {branch:<12} {count:>8} accounts   {format_paise(paise):>20}")
+    
+    print("\n📊 Balance distribution per account type:")
+    for account_type, bands in report["type_distribution"].items():
+        print(f"   {account_type}:")
+        for label, count in bands:
+            if count:
+                print(f"      {label:<30} {count:>8}")
+    
+    print("\n📋 Accounts per status:")
+    for status, count in report["status_counts"].items():
+        print(f"   {status:<12} {count:>8}")
+    
+    print("\n⚠️  KYC pending per branch:")
+    if not report["kyc_pending"]:
+        print("   None")
+    for branch, count in report["kyc_pending"].items():
+        print(f"   {branch:<12} {count:>8}")
+    
+    print("\n💰 Top accounts by balance:")
+    for rank, (acc_no, paise) in enumerate(report["top_accounts"], 1):
+        print(f"   {rank:>2}. {acc_no:<16} {format_paise(paise):>20}")
+    print("="*60)
+
+
+def view_all_accounts(admin):
+    accounts = service.list_accounts(admin, fields=("account_number", "holder", "account_type", "status", "balance", "KYC"))
+    first = next(accounts, None)
+    if first is None:
         print("\n📋 No accounts found")
         return
         
@@ -115,7 +250,9 @@ def view_all_accounts():
     print(f"{'Acc No':<16} {'Holder':<25} {'Type':<15} {'Status':<18} {'Balance':<25} {'KYC':<12}")
     print("-"*120)
 
-    for acc in accounts:
+    total = 0
+    for acc in chain([first], accounts):
+        total += 1
         if acc.status == "Active":
             status_display = "✅ Active"
         elif acc.status == "Inactive":
@@ -143,7 +280,7 @@ def view_all_accounts():
         )
 
     print("="*120)
-    print(f"{'Total Accounts:':<20} {len(accounts)}")
+    print(f"{'Total Accounts:':<20} {total}")
     print("="*120)
 
 
@@ -168,22 +305,19 @@ def show_account_info(account):
     print("="*60)
 
 
-def delete_account():
+def delete_account(admin):
     print("\n" + "="*50)
     print("         DELETE ACCOUNT")
     print("="*50)
     
-    accounts = load_all_accounts()
-    accounts_dict = {acc.account_number: acc for acc in accounts}
-    
     acc_no = get_input(
         "Enter account number to delete: ",
         input_type="str",
         validation=validate_account_number,
-        validation_args={'existing': accounts_dict}
-    )
+        validation_args={'existing': account_numbers}
+    ).upper()
     
-    account = accounts_dict[acc_no]
+    account = service.get_account(acc_no)
     
     print(f"\n⚠️  About to delete:")
     print(f"   Account: {acc_no}")
@@ -196,27 +330,27 @@ def delete_account():
         print("❌ Deletion cancelled")
         return
     
-    del accounts_dict[acc_no]
-    save_all_accounts_to_file(accounts_dict)
+    try:
+        service.delete_account(admin, acc_no)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
     print(f"✅ Account {acc_no} deleted successfully")
 
 
-def update_username():
+def update_username(admin):
     print("\n" + "="*50)
     print("         UPDATE ACCOUNT NAME")
     print("="*50)
     
-    accounts = load_all_accounts()
-    accounts_dict = {acc.account_number: acc for acc in accounts}
-    
     acc_no = get_input(
         "Enter account number: ",
         input_type="str",
         validation=validate_account_number,
-        validation_args={'existing': accounts_dict}
-    )
+        validation_args={'existing': account_numbers}
+    ).upper()
     
-    account = accounts_dict[acc_no]
+    account = service.get_account(acc_no)
     print(f"\nCurrent name: {account.holder}")
     
     new_username = get_input(
@@ -232,27 +366,27 @@ def update_username():
         print("❌ Update cancelled")
         return
     
-    account.holder = new_username
-    save_all_accounts_to_file(accounts_dict)
+    try:
+        service.update_name(admin, acc_no, new_username)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
     print(f"✅ Name updated to: {new_username}")
 
 
-def reset_pin():
+def reset_pin(admin):
     print("\n" + "="*50)
     print("         RESET ACCOUNT PIN")
     print("="*50)
     
-    accounts = load_all_accounts()
-    accounts_dict = {acc.account_number: acc for acc in accounts}
-    
     acc_no = get_input(
         "Enter account number: ",
         input_type="str",
         validation=validate_account_number,
-        validation_args={'existing': accounts_dict}
-    )
+        validation_args={'existing': account_numbers}
+    ).upper()
     
-    account = accounts_dict[acc_no]
+    account = service.get_account(acc_no)
     print(f"\nAccount Holder: {account.holder}")
     
     new_pin = get_input(
@@ -271,27 +405,27 @@ def reset_pin():
         print("❌ PINs do not match")
         return
     
-    account.set_pin(new_pin)
-    save_all_accounts_to_file(accounts_dict)
+    try:
+        service.reset_pin(admin, acc_no, new_pin)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
     print(f"✅ PIN reset successful for account {acc_no}")
 
 
-def change_account_status():
+def change_account_status(admin):
     print("\n" + "="*50)
     print("         CHANGE ACCOUNT STATUS")
     print("="*50)
     
-    accounts = load_all_accounts()
-    accounts_dict = {acc.account_number: acc for acc in accounts}
-    
     acc_no = get_input(
         "Enter account number: ",
         input_type="str",
         validation=validate_account_number,
-        validation_args={'existing': accounts_dict}
-    )
+        validation_args={'existing': account_numbers}
+    ).upper()
     
-    account = accounts_dict[acc_no]
+    account = service.get_account(acc_no)
     
     print(f"\n📋 Account Holder: {account.holder}")
     print(f"📋 Current Status: {account.status}")
@@ -331,21 +465,17 @@ def change_account_status():
         return
     
     old_status = account.status
-    account.status = new_status
-    
-    accounts_dict[acc_no] = account
-    save_all_accounts_to_file(accounts_dict)
+    try:
+        service.change_status(admin, acc_no, new_status)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
     
     print(f"\n✅ Account status changed successfully!")
     print(f"   {old_status} → {new_status}")
     print(f"   Account: {acc_no} ({account.holder})")
 
 
-def generate_account_number():
-    import time
-    return f"ACC{int(time.time())}"
-
-
 def create_new_account():
     print("\n=== Create New Account ===\n")
     
@@ -371,7 +501,7 @@ def create_new_account():
     address = get_input(
         "Enter address: ",
         input_type="str",
-        min_length=10
+        validation=validate_address
     )
     
     mobile = get_input(
@@ -412,8 +542,7 @@ def create_new_account():
     branch_code = get_input(
         "Enter branch code (e.g., BR001): ",
         input_type="str",
-        min_length=3,
-        max_length=10
+        validation=validate_branch_code
     ).upper()
     
     opening_date = str(date.today())
@@ -480,25 +609,21 @@ def create_new_account():
         print("❌ Account creation cancelled.")
         return None
     
-    account = BankAccount(
-        account_number=acc_no,
-        holder=name,
-        gender=gender,
-        DOB=dob,
-        address=address,
-        mobile=mobile,
-        email=email,
-        account_type=account_type,
-        status=status,
-        KYC=kyc,
-        branch_code=branch_code,
-        opening_date=opening_date,
-        pin=pin,
-        balance=balance
-    )
-    
-    account.set_pin(pin)
-    return account
+    return {
+        "account_number": acc_no,
+        "holder": name,
+        "gender": gender,
+        "DOB": dob,
+        "address": address,
+        "mobile": mobile,
+        "email": email,
+        "account_type": account_type,
+        "KYC": kyc,
+        "branch_code": branch_code,
+        "opening_date": opening_date,
+        "pin": pin,
+        "balance": balance
+    }
 
 
 def login():
@@ -507,15 +632,12 @@ def login():
     print("="*40)
     
     try:
-        accounts = load_all_accounts()
-        accounts_dict = {acc.account_number: acc for acc in accounts}
-        
         acc_no = get_input(
             "Enter your account number: ",
             input_type="str",
             validation=validate_account_number,
-            validation_args={'existing': accounts_dict}
-        )
+            validation_args={'existing': account_numbers}
+        ).upper()
         
         pin = get_input(
             "Enter PIN: ",
@@ -523,19 +645,16 @@ def login():
             validation=validate_pin
         )
         
-        account = accounts_dict[acc_no]
-        
-        if account.status != "Active":
-            print(f"❌ Login denied. Account status: {account.status}")
-            print("   Please contact Bank Administration for assistance.")
-            return None
-        
-        if not account.verify_pin(pin):
-            raise ValueError("Incorrect PIN")
+        account = service.login(acc_no, pin, TERMINAL)
         
         print(f"✅ Welcome, {account.holder}!")
         return account
     
+    except AccountBlocked as e:
+        print(f"❌ {e}")
+        print("   Please contact Bank Administration for assistance.")
+        return None
+    
     except ValueError as e:
         print(f"❌ Login failed: {e}")
         return None
@@ -566,146 +685,142 @@ def main_menu():
     print("="*40)
 
 
-while True:
-    menu()
-    choice = get_input("Enter your choice: ", input_type="menu")
-    
-    if choice == 1:
-        current_account = login()
-        if current_account:
-            while True:
-                main_menu()
-                choice = get_input("Enter choice: ", input_type="menu")
+def main():
+    while True:
+        menu()
+        choice = get_input("Enter your choice: ", input_type="menu")
+    
+        if choice == 1:
+            current_account = login()
+            if current_account:
+                while True:
+                    main_menu()
+                    choice = get_input("Enter choice: ", input_type="menu")
                 
-                if choice == 1:
-                    try:
-                        amount = get_input(
-                            "Enter amount to deposit: ",
-                            input_type="amount",
-                            validation=validate_amount
-                        )
+                    if choice == 1:
+                        try:
+                            amount = get_input(
+                                "Enter amount to deposit: ",
+                                input_type="amount",
+                                validation=validate_amount
+                            )
                         
-                        current_account.deposit(amount)
-                        save_account(current_account, allow_update=True)
-                        print(f"✅ Deposited ₹{amount:.2f} successfully")
+                            current_account = service.deposit(current_account.account_number, amount)
+                            print(f"✅ Deposited ₹{amount:.2f} successfully")
                     
-                    except ValueError as e:
-                        print(f"❌ Transaction failed: {e}")
+                        except ValueError as e:
+                            print(f"❌ Transaction failed: {e}")
                 
-                elif choice == 2:
-                    try:
-                        amount = get_input(
-                            "Enter amount to withdraw: ",
-                            input_type="amount",
-                            min_value=1,
-                            max_value=current_account.get_balance(),
-                            validation=validate_amount
-                        )
+                    elif choice == 2:
+                        try:
+                            amount = get_input(
+                                "Enter amount to withdraw: ",
+                                input_type="amount",
+                                min_value=1,
+                                max_value=current_account.get_balance(),
+                                validation=validate_amount
+                            )
                         
-                        current_account.withdraw(amount)
-                        save_account(current_account, allow_update=True)
-                        print(f"✅ Withdrew ₹{amount:.2f} successfully")
+                            current_account = service.withdraw(current_account.account_number, amount)
+                            print(f"✅ Withdrew ₹{amount:.2f} successfully")
                     
-                    except ValueError as e:
-                        print(f"❌ Transaction failed: {e}")
+                        except ValueError as e:
+                            print(f"❌ Transaction failed: {e}")
                 
-                elif choice == 3:
-                    try:
-                        accounts = load_all_accounts()
-                        accounts_dict = {acc.account_number: acc for acc in accounts}
+                    elif choice == 3:
+                        try:
+                            target_acc_no = get_input(
+                                "Enter recipient account number: ",
+                                input_type="str",
+                                validation=validate_account_number,
+                                validation_args={'existing': account_numbers}
+                            ).upper()
                         
-                        target_acc_no = get_input(
-                            "Enter recipient account number: ",
-                            input_type="str",
-                            validation=validate_account_number,
-                            validation_args={'existing': accounts_dict}
-                        )
+                            if target_acc_no == current_account.account_number:
+                                print("❌ Cannot transfer to your own account")
+                                continue
                         
-                        target_account = accounts_dict[target_acc_no]
+                            amount = get_input(
+                                "Enter amount to transfer: ",
+                                input_type="amount",
+                                min_value=1,
+                                max_value=current_account.get_balance(),
+                                validation=validate_amount
+                            )
                         
-                        if target_acc_no == current_account.account_number:
-                            print("❌ Cannot transfer to your own account")
-                            continue
-                        
-                        amount = get_input(
-                            "Enter amount to transfer: ",
-                            input_type="amount",
-                            min_value=1,
-                            max_value=current_account.get_balance(),
-                            validation=validate_amount
-                        )
-                        
-                        current_account.transfer(target_account, amount)
-                        save_account(current_account, allow_update=True)
-                        save_account(target_account, allow_update=True)
-                        print(f"✅ Transferred ₹{amount:.2f} to {target_acc_no} ({target_account.holder})")
+                            current_account, target_account = service.transfer(
+                                current_account.account_number, target_acc_no, amount
+                            )
+                            print(f"✅ Transferred ₹{amount:.2f} to {target_acc_no} ({target_account.holder})")
                     
-                    except ValueError as e:
-                        print(f"❌ Transaction failed: {e}")
+                        except ValueError as e:
+                            print(f"❌ Transaction failed: {e}")
                 
-                elif choice == 4:
-                    print(f"\n💰 Current Balance: ₹{current_account.get_balance():.2f}")
+                    elif choice == 4:
+                        print(f"\n💰 Current Balance: ₹{service.balance(current_account.account_number):.2f}")
                 
-                elif choice == 5:
-                    history = current_account.get_history()
-                    if not history:
-                        print("\n📋 No transaction history")
-                    else:
-                        print("\n" + "="*50)
-                        print("         TRANSACTION HISTORY")
-                        print("="*50)
-                        for h in history:
-                            print(h)
-                        print("="*50)
+                    elif choice == 5:
+                        show_history(current_account.account_number)
                 
-                elif choice == 6:
-                    show_account_info(current_account)
+                    elif choice == 6:
+                        show_account_info(current_account)
                 
-                elif choice == 7:
-                    print("👋 Logged out successfully")
-                    break
+                    elif choice == 7:
+                        print("👋 Logged out successfully")
+                        break
                 
-                else:
-                    print("❌ Invalid choice")
-    
-    elif choice == 2:
-        account = create_new_account()
-        if account:
-            try:
-                save_account(account, allow_update=False)
-                print(f"\n✅ Account created successfully!")
-                print(f"   Account Number: {account.account_number}")
-            except ValueError as e:
-                print(f"\n❌ Error: {e}")
-    
-    elif choice == 3:
-        if admin_login():
-            while True:
-                admin_menu()
+                    else:
+                        print("❌ Invalid choice")
+    
+        elif choice == 2:
+            details = create_new_account()
+            if details:
+                try:
+                    account = service.create_account(**details)
+                    print(f"\n✅ Account created successfully!")
+                    print(f"   Account Number: {account.account_number}")
+                except ValueError as e:
+                    print(f"\n❌ Error: {e}")
+    
+        elif choice == 3:
+            current_admin = admin_login()
+            if current_admin:
+                while True:
+                    admin_menu()
                 
-                choice = get_input("Enter choice: ", input_type="menu")
+                    choice = get_input("Enter choice: ", input_type="menu")
                 
-                if choice == 1:
-                    create_admin()
-                elif choice == 2:
-                    view_all_accounts()
-                elif choice == 3:
-                    delete_account()
-                elif choice == 4:
-                    update_username()
-                elif choice == 5:
-                    reset_pin()
-                elif choice == 6:
-                    change_account_status()
-                elif choice == 7:
-                    print("👋 Logged out successfully")
-                    break
-                else:
-                    print("❌ Invalid choice")
+                    if choice == 1:
+                        create_admin(current_admin)
+                    elif choice == 2:
+                        view_all_accounts(current_admin)
+                    elif choice == 3:
+                        delete_account(current_admin)
+                    elif choice == 4:
+                        update_username(current_admin)
+                    elif choice == 5:
+                        reset_pin(current_admin)
+                    elif choice == 6:
+                        change_account_status(current_admin)
+                    elif choice == 7:
+                        view_account_history(current_admin)
+                    elif choice == 8:
+                        show_reports(current_admin)
+                    elif choice == 9:
+                        search_accounts(current_admin)
+                    elif choice == 10:
+                        print("👋 Logged out successfully")
+                        break
+                    else:
+                        print("❌ Invalid choice")
     
-    elif choice == 4:
-        print("👋 Session ended. Thank you for using our banking system!")
-        break
+        elif choice == 4:
+            print("👋 Session ended. Thank you for using our banking system!")
+            break
     
-    else:
-        print("❌ Invalid choice. Please select 1-4.")
\ No newline at end of file
+        else:
+            print("❌ Invalid choice. Please select 1-4.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+from file_lock import FileLock
+from ledger_columns import KNOWN_CATEGORIES, to_paise
+import storage
+from storage import iter_accounts, get_backend, add_save_listener
+
+BALANCE_FILE = "balances.dat"
+# Backends whose version() token means the same thing in every process; the
+# SQLite one is per connection, so the table is not used there.
+SHARED_VERSION_BACKENDS = ("json", "binary", "jsonl")
+
+MAGIC = b"BNKBAL\x00\x01"
+# magic, generation, slots in use, stamp of the store version last applied
+HEADER = struct.Struct("<8sIIQ")
+HEADER_SIZE = 64
+# seq, account version, account number, balance in paise, status code, type code
+SLOT = struct.Struct("<II16sqBB6x")
+SEQ = struct.Struct("<I")
+GROW_SLOTS = 4096
+SCAN_FIELDS = ("account_number", "balance", "status", "account_type")
+
+STATUSES = KNOWN_CATEGORIES["status"]
+TYPES = KNOWN_CATEGORIES["account_type"]
+
+
+def _code(values, value):
+    # 0 means "not representable"; such slots are treated as misses.
+    return values.index(value) + 1 if value in values else 0
+
+
+def _stamp(version):
+    return zlib.crc32(repr(version).encode("utf-8"))
+
+
+class BalanceTable:
+    # Fixed-width slots in a shared memory-mapped file: balance, status, type
+    # and version per account, found through an account number -> slot map.
+    # Every save through storage writes its accounts' slots in place, in
+    # whichever process made it, so a balance read is one slot read instead of
+    # loading the account and its history. Slot writes use a sequence counter
+    # (odd while writing) so readers in other processes never see a torn slot.
+    def __init__(self, path=BALANCE_FILE):
+        self.path = path
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(path + ".lock")
+        self._fd = None
+        self._mm = None
+        self._slots = {}
+        self._indexed = 0
+        self._generation = None
+        self._last_version = None
+        self._last_stamp = _stamp(None)
+        self._rebuild_thread = None
+        # While a rebuild scans: saves made here meanwhile (acc_no -> slot
+        # fields, None if removed) and the store version they lead up to, or
+        # None once a write from elsewhere broke the chain.
+        self._pending = None
+        self._pending_version = None
+        self.rebuilds = 0
+
+    def _open(self):
+        if self._mm is not None:
+            return
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if os.fstat(self._fd).st_size < HEADER_SIZE:
+            with self._file_lock:
+                if os.fstat(self._fd).st_size < HEADER_SIZE:
+                    os.ftruncate(self._fd, HEADER_SIZE + GROW_SLOTS * SLOT.size)
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    os.write(self._fd, HEADER.pack(MAGIC, 0, 0, 0))
+        self._map()
+
+    def _map(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path} is not a balance table")
+
+    def close(self):
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            if self._mm is not None:
+                self._mm.close()
+                os.close(self._fd)
+            self._mm = self._fd = None
+            self._slots = {}
+            self._indexed = 0
+            self._generation = None
+
+    def _header(self):
+        return HEADER.unpack_from(self._mm, 0)[1:]
+
+    def _set_header(self, generation, count, stamp):
+        HEADER.pack_into(self._mm, 0, MAGIC, generation, count, stamp)
+
+    def _offset(self, slot):
+        return HEADER_SIZE + slot * SLOT.size
+
+    def _capacity(self):
+        return (len(self._mm) - HEADER_SIZE) // SLOT.size
+
+    def _read_slot(self, slot):
+        offset = self._offset(slot)
+        while True:
+            seq, version, acc_no, paise, status, account_type = SLOT.unpack_from(self._mm, offset)
+            if not seq & 1 and SEQ.unpack_from(self._mm, offset)[0] == seq:
+                return version, acc_no.rstrip(b"\0").decode("ascii"), paise, status, account_type
+
+    def _write_slot(self, slot, version, acc_no, paise, status, account_type):
+        offset = self._offset(slot)
+        seq = SEQ.unpack_from(self._mm, offset)[0] | 1
+        SLOT.pack_into(self._mm, offset, seq, version, acc_no.encode("ascii"), paise, status, account_type)
+        SEQ.pack_into(self._mm, offset, seq + 1)
+
+    def _sync(self):
+        # Picks up slots added (or a rebuild done) by other processes.
+        generation, count, _ = self._header()
+        if generation != self._generation:
+            self._slots = {}
+            self._indexed = 0
+            self._generation = generation
+        if count > self._capacity():
+            self._map()
+        for slot in range(self._indexed, count):
+            acc_no = self._read_slot(slot)[1]
+            if acc_no:
+                self._slots[acc_no] = slot
+        self._indexed = max(self._indexed, count)
+
+    def _ensure_capacity(self, count):
+        if count <= self._capacity():
+            return
+        os.ftruncate(self._fd, self._offset(count + GROW_SLOTS))
+        self._map()
+
+    def _start_rebuild(self):
+        if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+            return
+        self._rebuild_thread = threading.Thread(target=self._rebuild, daemon=True)
+        self._rebuild_thread.start()
+
+    def _rebuild(self):
+        # Runs in the background. The store is scanned without any lock
+        # held; saves made in this process meanwhile are collected by
+        # on_save and applied over the scan when the slots are written.
+        with self._lock:
+            self._pending = {}
+            self._pending_version = get_backend().version()
+        rows = []
+        for acc_no, balance, status, account_type in iter_accounts(fields=SCAN_FIELDS):
+            if len(acc_no) > 16 or not acc_no.isascii():
+                continue
+            rows.append((acc_no, to_paise(balance), _code(STATUSES, status), _code(TYPES, account_type)))
+        with self._lock, self._file_lock:
+            pending, self._pending = self._pending, None
+            reached = self._pending_version
+            if self._mm is None:
+                return
+            self._sync()
+            generation, _, stamp = self._header()
+            if stamp == self._store_stamp():
+                # Another process rebuilt it meanwhile.
+                return
+            self._set_header(generation + 1, 0, 0)
+            self._ensure_capacity(len(rows) + len(pending))
+            slots = {}
+            for acc_no, paise, status, account_type in rows:
+                slots[acc_no] = len(slots)
+                self._write_slot(slots[acc_no], 0, acc_no, paise, status, account_type)
+            for acc_no, fields in pending.items():
+                slot = slots.get(acc_no)
+                if fields is None:
+                    if slot is not None:
+                        self._write_slot(slot, 0, "", 0, 0, 0)
+                    continue
+                if slot is None:
+                    slot = slots[acc_no] = len(slots)
+                version, paise, status, account_type = fields
+                self._write_slot(slot, version, acc_no, paise, status, account_type)
+            # In step only if nothing but the saves seen here happened since
+            # the scan started.
+            stamp = _stamp(reached) if reached is not None and reached == get_backend().version() else 0
+            self._set_header(generation + 1, len(slots), stamp)
+            self._sync()
+            self.rebuilds += 1
+
+    def _store_stamp(self):
+        version = get_backend().version()
+        if version != self._last_version:
+            self._last_version = version
+            self._last_stamp = _stamp(version)
+        return self._last_stamp
+
+    def _usable(self):
+        if storage.BACKEND not in SHARED_VERSION_BACKENDS:
+            return False
+        self._open()
+        if self._header()[2] != self._store_stamp():
+            # Changed by something that bypassed the save hook (or never
+            # built). Rebuilt off the read path; callers load the account
+            # until it is in step again.
+            self._start_rebuild()
+            return False
+        return True
+
+    def get(self, acc_no):
+        # (balance, status, account type) or None if the caller should load
+        # the account instead.
+        with self._lock:
+            if not self._usable():
+                return None
+            self._sync()
+            slot = self._slots.get(acc_no)
+            if slot is None:
+                return None
+            _, stored, paise, status, account_type = self._read_slot(slot)
+            if stored != acc_no or not status or not account_type:
+                return None
+            return paise / 100, STATUSES[status - 1], TYPES[account_type - 1]
+
+    def balance(self, acc_no):
+        entry = self.get(acc_no)
+        return None if entry is None else entry[0]
+
+    def on_save(self, saved, removed, reset):
+        with self._lock:
+            if storage.BACKEND not in SHARED_VERSION_BACKENDS:
+                return
+            self._open()
+            before, after = get_backend().last_write()
+            if self._pending is not None:
+                for acc in saved:
+                    acc_no = str(acc.account_number)
+                    if len(acc_no) > 16 or not acc_no.isascii():
+                        continue
+                    self._pending[acc_no] = (
+                        acc.version, to_paise(acc.balance), _code(STATUSES, acc.status), _code(TYPES, acc.account_type))
+                for acc_no in removed:
+                    self._pending[acc_no] = None
+                if reset or before != self._pending_version:
+                    self._pending_version = None
+                else:
+                    self._pending_version = after
+            with self._file_lock:
+                if reset:
+                    # Rebuilt from the store on the next read.
+                    generation, count, _ = self._header()
+                    self._set_header(generation, count, 0)
+                    return
+                self._sync()
+                generation, count, stamp = self._header()
+                for acc in saved:
+                    acc_no = str(acc.account_number)
+                    if len(acc_no) > 16 or not acc_no.isascii():
+                        continue
+                    slot = self._slots.get(acc_no)
+                    if slot is None:
+                        self._ensure_capacity(count + 1)
+                        slot = count
+                        count += 1
+                        self._slots[acc_no] = slot
+                    elif self._read_slot(slot)[0] > acc.version:
+                        # A newer save of this account already landed here.
+                        continue
+                    self._write_slot(slot, acc.version, acc_no, to_paise(acc.balance),
+                                     _code(STATUSES, acc.status), _code(TYPES, acc.account_type))
+                for acc_no in removed:
+                    slot = self._slots.pop(acc_no, None)
+                    if slot is not None:
+                        self._write_slot(slot, 0, "", 0, 0, 0)
+                self._indexed = count
+                # Only a table that was in step with the store right before
+                # this write is in step after it. Any other stamp (out of
+                # date, or another process wrote in between) is left alone so
+                # the next read rebuilds.
+                if stamp == _stamp(before):
+                    stamp = _stamp(after)
+                self._set_header(generation, count, stamp)
+
+
+balance_table = BalanceTable()
+add_save_listener(balance_table.on_save)
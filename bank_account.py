@@ -1,7 +1,11 @@
-from datetime import datetime
+import copy
+import time
+from metrics import timed
+from pin_security import check_pin, hash_pin, is_pin_hash
+from transaction import DEPOSIT, WITHDRAWAL, TRANSFER_OUT, TRANSFER_IN, to_transactions, extend_times, query_history
 
 class BankAccount:
-    def __init__(self, account_number, holder, gender, DOB, address, mobile, email, account_type, status, KYC, branch_code, opening_date, pin, balance=0, history=None):
+    def __init__(self, account_number, holder, gender, DOB, address, mobile, email, account_type, status, KYC, branch_code, opening_date, pin, balance=0, history=None, version=0, archived=0):
         self.account_number = account_number
         self.holder = holder
         self.gender = gender
@@ -16,7 +20,11 @@ class BankAccount:
         self.opening_date = opening_date
         self.__pin = pin
         self.balance = float(balance)
-        self.history = history if history is not None else []
+        self.history = to_transactions(history)
+        self._times = []
+        self._times_for = None
+        self.version = version
+        self.archived = archived
 
     def _check_status(self):
         if self.status != "Active":
@@ -45,10 +53,10 @@ class BankAccount:
         if max_limit > 0 and amount > max_limit:
             raise ValueError(f"{self.account_type} account transaction limit is ₹{max_limit:,.2f}")
     
-    def _add_history(self, action):
-        time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.history.append(f"[{time}] {action}")
+    def _add_history(self, kind, amount, counterparty=None):
+        self.history.add(time.time(), kind, amount, self.balance, counterparty)
 
+    @timed("account_deposit")
     def deposit(self, amount):
         self._check_status()
         amount = float(amount)
@@ -62,8 +70,9 @@ class BankAccount:
         self._check_transaction_limits(amount)
         
         self.balance += amount
-        self._add_history(f"Deposited: ₹{amount:.2f}, Balance: ₹{self.balance:.2f}")
+        self._add_history(DEPOSIT, amount)
 
+    @timed("account_withdraw")
     def withdraw(self, amount):
         self._check_status()
         self._check_account_type_for_withdrawal()
@@ -84,8 +93,9 @@ class BankAccount:
                 raise ValueError(f"Savings account requires minimum balance of ₹{min_balance:.2f}")
 
         self.balance -= amount
-        self._add_history(f"Withdrew: ₹{amount:.2f}, Balance: ₹{self.balance:.2f}")
+        self._add_history(WITHDRAWAL, amount)
 
+    @timed("account_transfer")
     def transfer(self, target_account, amount):
         self._check_status()
         self._check_account_type_for_transfer()
@@ -112,10 +122,18 @@ class BankAccount:
             raise ValueError("Cannot transfer to Fixed Deposit accounts.")
 
         self.balance -= amount
-        self._add_history(f"Transferred: ₹{amount:.2f} to {target_account.account_number}, Balance: ₹{self.balance:.2f}")
+        self._add_history(TRANSFER_OUT, amount, target_account.account_number)
 
         target_account.balance += amount
-        target_account._add_history(f"Received: ₹{amount:.2f} from {self.account_number}, Balance: ₹{target_account.balance:.2f}")
+        target_account._add_history(TRANSFER_IN, amount, self.account_number)
+
+    def copy(self):
+        # Independent copy for the account cache.
+        other = copy.copy(self)
+        other.history = self.history.copy()
+        other._times = list(self._times)
+        other._times_for = other.history if self._times_for is self.history else None
+        return other
 
     def get_balance(self):
         return float(self.balance)
@@ -123,14 +141,25 @@ class BankAccount:
     def get_history(self):
         return self.history
 
+    def _history_times(self):
+        if self._times_for is not self.history or len(self._times) > len(self.history):
+            self._times = []
+            self._times_for = self.history
+        return extend_times(self._times, self.history)
+
+    def get_history_page(self, start=None, end=None, offset=0, limit=None, newest_first=True):
+        return query_history(self.history, self._history_times(), start, end, offset, limit, newest_first)
+
     def verify_pin(self, pin):
-        return self.__pin == pin
+        return check_pin(self.__pin, pin)
 
     def get_pin(self):
         return self.__pin
 
     def set_pin(self, new_pin):
-        self.__pin = new_pin
+        # Accepts a PIN or a hash made earlier with hash_pin (so the slow hash
+        # can be computed outside any lock).
+        self.__pin = new_pin if is_pin_hash(new_pin) else hash_pin(new_pin)
     
     def get_account_restrictions(self):
         restrictions = {
@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import atexit
+import itertools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+from bank_service import service, BankError, AuthenticationError, AccountBlocked, AccountNotFound, TooManyAttempts
+
+HOST = "127.0.0.1"
+PORT = 8765
+STORAGE_WORKERS = 16
+MAX_LINE = 64 * 1024
+BACKLOG = 1024
+MAX_TERMINAL_ID = 64
+
+
+class Session:
+    # Per-connection state; every method runs on a storage worker thread.
+    def __init__(self, peer="local", connection=None):
+        self.account_number = None
+        self.admin = None
+        # Failed logins are throttled per terminal: the id the client sends
+        # with login, or else this connection. Never the bare peer address,
+        # which every ATM behind one NAT or proxy (or on localhost) shares.
+        self.peer = peer
+        self.terminal = f"{peer}#{connection}"
+        self.named = False
+
+    def _customer(self):
+        if self.account_number is None:
+            raise AuthenticationError("Please log in first")
+        return self.account_number
+
+    def login(self, account=None, pin=None, terminal=None):
+        if terminal is not None and not self.named:
+            # Fixed for the connection, so a client can't dodge the limit by
+            # sending a new id with every attempt.
+            self.terminal = f"{self.peer}/{str(terminal)[:MAX_TERMINAL_ID]}"
+            self.named = True
+        try:
+            found = service.login(account, pin, self.terminal)
+        except (AccountBlocked, TooManyAttempts):
+            raise
+        except (AccountNotFound, AuthenticationError) as e:
+            # Don't tell a remote client which account numbers exist.
+            raise AuthenticationError("Invalid account number or PIN") from e
+        self.account_number = found.account_number
+        return {"account": found.account_number, "holder": found.holder}
+
+    def logout(self):
+        self.account_number = None
+        self.admin = None
+        return {}
+
+    def balance(self):
+        return {"balance": service.balance(self._customer())}
+
+    def deposit(self, amount=None):
+        account = service.deposit(self._customer(), amount)
+        return {"balance": account.get_balance()}
+
+    def withdraw(self, amount=None):
+        account = service.withdraw(self._customer(), amount)
+        return {"balance": account.get_balance()}
+
+    def transfer(self, target=None, amount=None):
+        src, dst = service.transfer(self._customer(), target, amount)
+        return {"balance": src.get_balance(), "target": dst.account_number, "target_holder": dst.holder}
+
+    def history(self, limit=None, offset=0, from_date=None, to_date=None, oldest_first=False):
+        entries = service.history(self._customer(), limit, offset, from_date, to_date, not oldest_first)
+        return {"history": [str(entry) for entry in entries]}
+
+    def info(self):
+        account = service.get_account(self._customer())
+        return {
+            "account": account.account_number,
+            "holder": account.holder,
+            "account_type": account.account_type,
+            "status": account.status,
+            "balance": account.get_balance(),
+            "branch_code": account.branch_code,
+            "opening_date": account.opening_date,
+            "KYC": account.KYC,
+            "restrictions": account.get_account_restrictions()
+        }
+
+    def admin_login(self, username=None, password=None):
+        self.admin = service.admin_login(username, password)
+        return {"username": self.admin.username, "role": self.admin.role}
+
+    def create_admin(self, username=None, password=None):
+        created = service.create_admin(self.admin, username, password)
+        return {"username": created.username}
+
+    def list_accounts(self):
+        fields = ("account_number", "holder", "account_type", "status", "balance", "KYC")
+        return {"accounts": [row._asdict() for row in service.list_accounts(self.admin, fields)]}
+
+    def search_accounts(self, by=None, value=None, limit=50):
+        found = service.search_accounts(self.admin, by, value, int(limit))
+        return {"accounts": [
+            {"account_number": acc.account_number, "holder": acc.holder, "mobile": acc.mobile,
+             "email": acc.email, "branch_code": acc.branch_code, "status": acc.status,
+             "balance": acc.get_balance()}
+            for acc in found
+        ]}
+
+    def reports(self, top_k=10):
+        # Amounts are whole paise.
+        return service.reports(self.admin, top_k)
+
+    def delete_account(self, account=None):
+        return {"account": service.delete_account(self.admin, account)}
+
+    def update_name(self, account=None, name=None):
+        updated = service.update_name(self.admin, account, name)
+        return {"account": updated.account_number, "holder": updated.holder}
+
+    def reset_pin(self, account=None, pin=None):
+        updated = service.reset_pin(self.admin, account, pin)
+        return {"account": updated.account_number}
+
+    def change_status(self, account=None, status=None):
+        updated = service.change_status(self.admin, account, status)
+        return {"account": updated.account_number, "status": updated.status}
+
+
+OPERATIONS = (
+    "login", "logout", "balance", "deposit", "withdraw", "transfer", "history", "info",
+    "admin_login", "create_admin", "list_accounts", "delete_account", "update_name",
+    "reset_pin", "change_status", "reports", "search_accounts"
+)
+
+
+class BankServer:
+    def __init__(self, workers=STORAGE_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage")
+        self.sessions = 0
+        self.requests = 0
+        self._connections = itertools.count(1)
+
+    async def _dispatch(self, session, request):
+        op = request.get("op")
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {op}")
+        args = {k: v for k, v in request.items() if k not in ("op", "id")}
+        method = getattr(session, op)
+        loop = asyncio.get_running_loop()
+        # Storage calls block on disk, so they run on the worker pool and the
+        # event loop stays free for other sessions.
+        return await loop.run_in_executor(self.executor, lambda: method(**args))
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        # Unix-socket peers have no address; they are throttled all the same.
+        session = Session(peer[0] if isinstance(peer, tuple) else "local", next(self._connections))
+        self.sessions += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                self.requests += 1
+                response = {}
+                closing = False
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("Request must be a JSON object")
+                    response["id"] = request.get("id")
+                    closing = request.get("op") == "quit"
+                    result = {} if closing else await self._dispatch(session, request)
+                    response.update(ok=True, **result)
+                except BankError as e:
+                    response.update(ok=False, error=str(e), error_type=type(e).__name__)
+                except (ValueError, TypeError) as e:
+                    response.update(ok=False, error=str(e))
+                writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+                if closing:
+                    break
+        finally:
+            self.sessions -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def start(self, host=HOST, port=PORT, unix_path=None):
+        if unix_path:
+            if os.path.exists(unix_path):
+                os.remove(unix_path)
+            return await asyncio.start_unix_server(self.handle, path=unix_path, limit=MAX_LINE, backlog=BACKLOG)
+        return await asyncio.start_server(self.handle, host, port, limit=MAX_LINE, backlog=BACKLOG)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+async def serve(host=HOST, port=PORT, unix_path=None, workers=STORAGE_WORKERS):
+    bank = BankServer(workers)
+    server = await bank.start(host, port, unix_path)
+    where = unix_path or f"{host}:{port}"
+    print(f"🏦 Bank server listening on {where}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        bank.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve ATM sessions over a JSON-lines socket protocol.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--unix", help="listen on a Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=STORAGE_WORKERS, help="threads for storage calls")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this local port")
+    parser.add_argument("--metrics-file", help="write Prometheus metrics to this file on exit")
+    parser.add_argument("--profile", help="record a cProfile of the whole run to this file")
+    args = parser.parse_args()
+    if args.profile:
+        metrics.start_profile(args.profile)
+    if args.metrics_file:
+        atexit.register(metrics.write_metrics, args.metrics_file)
+    if args.metrics_port:
+        metrics.serve_metrics(args.metrics_port)
+        print(f"📈 Metrics on http://127.0.0.1:{args.metrics_port}/metrics")
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.workers))
+    except KeyboardInterrupt:
+        print("👋 Server stopped")
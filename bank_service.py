@@ -0,0 +1,360 @@
+from datetime import date
+from admin import Admin
+from admin_storage import save_admin, authenticate_admin
+from bank_account import BankAccount
+from storage import (load_account, load_history, save_account, update_account, update_accounts, remove_account,
+                     iter_accounts, account_exists, SUMMARY_FIELDS, VersionConflict)
+from transaction import day_bounds
+from history_archive import archived_history_page
+from analytics import analytics, DEFAULT_TOP_K
+from account_index import account_index, SEARCH_FIELDS, DEFAULT_LIMIT
+from account_allocator import next_account_number
+from balance_table import balance_table
+from ledger_columns import to_paise
+from pin_security import hash_pin, needs_rehash, verified_pins, login_throttle
+from validation import (validate_account_number, validate_pin, validate_name, validate_amount, validate_date,
+                        validate_email, validate_mobile, validate_gender, validate_branch_code, validate_address)
+
+ACCOUNT_TYPES = ("Savings", "Current", "Fixed Deposit", "Recurring Deposit")
+ACCOUNT_STATUSES = ("Active", "Inactive", "Suspended", "Closed", "Frozen")
+
+
+class BankError(ValueError):
+    pass
+
+
+class InvalidInput(BankError):
+    pass
+
+
+class AccountNotFound(BankError):
+    pass
+
+
+class AuthenticationError(BankError):
+    pass
+
+
+class AccountBlocked(AuthenticationError):
+    def __init__(self, status):
+        super().__init__(f"Login denied. Account status: {status}")
+        self.status = status
+
+
+class TooManyAttempts(AuthenticationError):
+    def __init__(self, retry_after):
+        minutes = max(1, (retry_after + 59) // 60)
+        super().__init__(f"Too many failed attempts. Try again in {minutes} minute(s).")
+        self.retry_after = retry_after
+
+
+class PermissionDenied(BankError):
+    pass
+
+
+class TransactionDenied(BankError):
+    pass
+
+
+class ConcurrentUpdate(BankError):
+    pass
+
+
+def _check(result):
+    if not result[0]:
+        raise InvalidInput(result[1])
+    return result
+
+
+def _business_rules(action):
+    # BankAccount reports rule violations (limits, status, balance) as plain
+    # ValueError; surface them as TransactionDenied.
+    def run(*accounts):
+        try:
+            action(*accounts)
+        except BankError:
+            raise
+        except ValueError as e:
+            raise TransactionDenied(str(e)) from e
+    return run
+
+
+def _apply(acc_nos, action):
+    # update_accounts already retries a lost compare-and-swap; if every retry
+    # loses, report it like any other refused operation.
+    try:
+        return update_accounts(acc_nos, _business_rules(action))
+    except VersionConflict as e:
+        raise ConcurrentUpdate(str(e)) from e
+
+
+def generate_account_number():
+    return next_account_number()
+
+
+class BankService:
+    def account_number(self, acc_no):
+        acc_no = str(acc_no or "").strip().upper()
+        _check(validate_account_number(acc_no))
+        return acc_no
+
+    def amount(self, value):
+        return _check(validate_amount(value))[2]
+
+    def get_account(self, acc_no):
+        acc_no = self.account_number(acc_no)
+        account = load_account(acc_no)
+        if account is None:
+            raise AccountNotFound(f"Account {acc_no} does not exist.")
+        return account
+
+    def _require(self, *acc_nos):
+        for acc_no in acc_nos:
+            if not account_exists(acc_no):
+                raise AccountNotFound(f"Account {acc_no} does not exist.")
+
+    def _precheck(self, acc_no, amount=None, target=None):
+        # Turns away requests that are bound to fail using the shared balance
+        # table, before any account is loaded. Only the rules that come first
+        # in BankAccount are checked here, so the message is the same one the
+        # full check would give; everything else is left to BankAccount.
+        entry = balance_table.get(acc_no)
+        if entry is None:
+            return
+        balance, status, account_type = entry
+        if status != "Active":
+            raise TransactionDenied(f"Transaction denied. Account status: {status}")
+        if amount is None or account_type not in ("Savings", "Current"):
+            return
+        if target is not None:
+            target_entry = balance_table.get(target)
+            if target_entry is None:
+                return
+            if target_entry[1] != "Active":
+                raise TransactionDenied(f"Recipient account is {target_entry[1]}. Transfer denied.")
+        if to_paise(amount) > to_paise(balance):
+            raise TransactionDenied("Insufficient balance")
+
+    def _update(self, acc_no, action):
+        acc_no = self.account_number(acc_no)
+        self._require(acc_no)
+        return _apply([acc_no], action)[0]
+
+    # Customer operations
+
+    def login(self, acc_no, pin, terminal=None):
+        acc_no = self.account_number(acc_no)
+        pin = str(pin or "")
+        _check(validate_pin(pin))
+        # Locked-out attempts are refused before touching storage or hashing.
+        retry_after = login_throttle.check(acc_no, terminal)
+        if retry_after:
+            raise TooManyAttempts(retry_after)
+
+        account = load_account(acc_no)
+        if account is None:
+            login_throttle.record_failure(acc_no, terminal)
+            raise AccountNotFound(f"Account {acc_no} does not exist.")
+        if account.status != "Active":
+            raise AccountBlocked(account.status)
+
+        stored = account.get_pin()
+        if not verified_pins.check(acc_no, stored, pin):
+            if not account.verify_pin(pin):
+                login_throttle.record_failure(acc_no, terminal)
+                raise AuthenticationError("Incorrect PIN")
+            verified_pins.remember(acc_no, stored, pin)
+            if needs_rehash(stored):
+                self._upgrade_pin(acc_no, stored, pin)
+        login_throttle.record_success(acc_no)
+        return account
+
+    def _upgrade_pin(self, acc_no, stored, pin):
+        # Plaintext or outdated-cost PIN: store a fresh hash, unless the PIN
+        # was changed meanwhile. Best effort; login doesn't depend on it.
+        new_hash = hash_pin(pin)
+        try:
+            update_account(acc_no, lambda acc: acc.set_pin(new_hash) if acc.get_pin() == stored else None)
+        except ValueError:
+            pass
+
+    def balance(self, acc_no):
+        acc_no = self.account_number(acc_no)
+        balance = balance_table.balance(acc_no)
+        if balance is None:
+            return self.get_account(acc_no).get_balance()
+        return balance
+
+    def date_range(self, from_date=None, to_date=None):
+        for value in (from_date, to_date):
+            if value:
+                _check(validate_date(value))
+        start, end = day_bounds(from_date, to_date)
+        if start is not None and end is not None and start > end:
+            raise InvalidInput("From date must not be after the to date")
+        return start, end
+
+    def history(self, acc_no, limit=None, offset=0, from_date=None, to_date=None, newest_first=True):
+        acc_no = self.account_number(acc_no)
+        if (limit is not None and int(limit) < 0) or int(offset or 0) < 0:
+            raise InvalidInput("Limit and offset cannot be negative")
+        start, end = self.date_range(from_date, to_date)
+        entries = load_history(acc_no, start, end, offset, limit, newest_first)
+        if entries is None:
+            raise AccountNotFound(f"Account {acc_no} does not exist.")
+        if newest_first and limit is not None and len(entries) >= int(limit):
+            return entries
+        # The page runs past the hot store: read through to archived history.
+        account = load_account(acc_no)
+        if account is None or not account.archived:
+            return entries
+        return archived_history_page(account, start, end, offset, limit, newest_first)
+
+    def deposit(self, acc_no, amount):
+        amount = self.amount(amount)
+        acc_no = self.account_number(acc_no)
+        self._precheck(acc_no)
+        return self._update(acc_no, lambda acc: acc.deposit(amount))
+
+    def withdraw(self, acc_no, amount):
+        amount = self.amount(amount)
+        acc_no = self.account_number(acc_no)
+        self._precheck(acc_no, amount)
+        return self._update(acc_no, lambda acc: acc.withdraw(amount))
+
+    def transfer(self, source, target, amount):
+        source = self.account_number(source)
+        target = self.account_number(target)
+        if source == target:
+            raise TransactionDenied("Cannot transfer to your own account")
+        amount = self.amount(amount)
+        self._precheck(source, amount, target)
+        self._require(source, target)
+        src, dst = _apply([source, target], lambda s, d: s.transfer(d, amount))
+        return src, dst
+
+    def create_account(self, holder, gender, DOB, address, mobile, email, account_type, KYC, branch_code,
+                       pin, balance, account_number=None, opening_date=None):
+        holder = str(holder or "").strip()
+        _check(validate_name(holder))
+        gender = str(gender or "").strip().upper()
+        _check(validate_gender(gender))
+        _check(validate_date(DOB))
+        _check(validate_address(address))
+        _check(validate_mobile(mobile))
+        email = str(email or "").strip().lower()
+        _check(validate_email(email))
+        if account_type not in ACCOUNT_TYPES:
+            raise InvalidInput(f"Account type must be one of: {', '.join(ACCOUNT_TYPES)}")
+        branch_code = str(branch_code or "").strip().upper()
+        _check(validate_branch_code(branch_code))
+        _check(validate_pin(str(pin or "")))
+        balance = self.amount(balance)
+        if account_index.mobile_taken(mobile):
+            raise InvalidInput("Mobile number is already registered to another account.")
+        if account_index.email_taken(email):
+            raise InvalidInput("Email address is already registered to another account.")
+
+        account = BankAccount(
+            account_number=account_number or generate_account_number(),
+            holder=holder,
+            gender=gender,
+            DOB=DOB,
+            address=address.strip(),
+            mobile=str(mobile).strip(),
+            email=email,
+            account_type=account_type,
+            status="Active",
+            KYC=bool(KYC),
+            branch_code=branch_code,
+            opening_date=opening_date or str(date.today()),
+            pin=hash_pin(pin),
+            balance=balance
+        )
+        save_account(account, allow_update=False)
+        return account
+
+    # Admin operations
+
+    def admin_login(self, username, password):
+        admin = authenticate_admin(str(username or "").strip(), str(password or ""))
+        if admin is None:
+            raise AuthenticationError("Invalid admin credentials")
+        return admin
+
+    def _require_admin(self, admin, permission="manage_accounts"):
+        if admin is None:
+            raise PermissionDenied("Admin login required")
+        if not admin.can(permission):
+            raise PermissionDenied(f"Role '{admin.role}' is not allowed to {permission.replace('_', ' ')}")
+
+    def create_admin(self, admin, username, password):
+        self._require_admin(admin, "create_admin")
+        username = str(username or "").strip()
+        if not username or not password:
+            raise InvalidInput("Username and password are required")
+        new_admin = Admin(username, password)
+        save_admin(new_admin)
+        return new_admin
+
+    def list_accounts(self, admin, fields=SUMMARY_FIELDS):
+        self._require_admin(admin)
+        return iter_accounts(fields=fields)
+
+    def account_history(self, admin, acc_no, limit=None, offset=0, from_date=None, to_date=None, newest_first=True):
+        self._require_admin(admin)
+        return self.history(acc_no, limit, offset, from_date, to_date, newest_first)
+
+    def search_accounts(self, admin, by, value, limit=DEFAULT_LIMIT):
+        self._require_admin(admin, "view_reports")
+        value = str(value or "").strip()
+        if not value:
+            raise InvalidInput("Search value cannot be empty")
+        if by == "mobile":
+            acc_nos = account_index.find_by_mobile(value, limit)
+        elif by == "email":
+            acc_nos = account_index.find_by_email(value, limit)
+        elif by == "branch":
+            acc_nos = account_index.find_by_branch(value, limit)
+        elif by == "name":
+            acc_nos = account_index.find_by_name_prefix(value, limit)
+        else:
+            raise InvalidInput(f"Search by one of: {', '.join(SEARCH_FIELDS)}")
+        accounts = (load_account(acc_no) for acc_no in acc_nos)
+        return [acc for acc in accounts if acc is not None]
+
+    def reports(self, admin, top_k=DEFAULT_TOP_K):
+        self._require_admin(admin, "view_reports")
+        if int(top_k) < 1:
+            raise InvalidInput("Top-K must be at least 1")
+        return analytics.report(int(top_k))
+
+    def delete_account(self, admin, acc_no):
+        self._require_admin(admin)
+        acc_no = self.account_number(acc_no)
+        if not remove_account(acc_no):
+            raise AccountNotFound(f"Account {acc_no} does not exist.")
+        return acc_no
+
+    def update_name(self, admin, acc_no, name):
+        self._require_admin(admin)
+        name = str(name or "").strip()
+        _check(validate_name(name))
+        return self._update(acc_no, lambda acc: setattr(acc, "holder", name))
+
+    def reset_pin(self, admin, acc_no, pin):
+        self._require_admin(admin)
+        pin = str(pin or "")
+        _check(validate_pin(pin))
+        new_hash = hash_pin(pin)
+        return self._update(acc_no, lambda acc: acc.set_pin(new_hash))
+
+    def change_status(self, admin, acc_no, status):
+        self._require_admin(admin)
+        status = str(status or "").strip().capitalize()
+        if status not in ACCOUNT_STATUSES:
+            raise InvalidInput(f"Status must be one of: {', '.join(ACCOUNT_STATUSES)}")
+        return self._update(acc_no, lambda acc: setattr(acc, "status", status))
+
+
+service = BankService()
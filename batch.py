@@ -0,0 +1,138 @@
+import csv
+import json
+import os
+import sys
+import time
+from storage import load_account, save_accounts
+from validation import validate_account_number, validate_amount
+
+OPERATIONS = ("deposit", "withdraw", "transfer")
+REPORT_FIELDS = ["line", "op", "account", "amount", "target", "status", "message", "balance"]
+
+
+def read_operations(path):
+    if os.path.splitext(path)[1] in (".jsonl", ".ndjson"):
+        with open(path, "r") as f:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    yield line_no, json.loads(line)
+    else:
+        with open(path, "r", newline="") as f:
+            for line_no, row in enumerate(csv.DictReader(f), 2):
+                yield line_no, row
+
+
+class BatchProcessor:
+    def __init__(self):
+        self.accounts = {}
+        self.touched = {}
+        self.results = []
+
+    def _account(self, acc_no, label):
+        is_valid, error_msg = validate_account_number(acc_no)
+        if not is_valid:
+            raise ValueError(f"{label}: {error_msg}")
+        acc_no = acc_no.strip().upper()
+        account = self.accounts.get(acc_no)
+        if account is None:
+            account = load_account(acc_no)
+            if account is None:
+                raise ValueError(f"{label}: Account {acc_no} does not exist.")
+            self.accounts[acc_no] = account
+        return account
+
+    def apply(self, op):
+        kind = str(op.get("op", "")).strip().lower()
+        if kind not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{kind}'. Use one of: {', '.join(OPERATIONS)}")
+
+        is_valid, error_msg, amount = validate_amount(op.get("amount"))
+        if not is_valid:
+            raise ValueError(error_msg)
+
+        account = self._account(str(op.get("account") or ""), "account")
+        if kind == "deposit":
+            account.deposit(amount)
+        elif kind == "withdraw":
+            account.withdraw(amount)
+        else:
+            target = self._account(str(op.get("target") or ""), "target")
+            if target is account:
+                raise ValueError("Cannot transfer to the same account")
+            account.transfer(target, amount)
+            self.touched[target.account_number] = target
+        self.touched[account.account_number] = account
+        return account
+
+    def run(self, operations):
+        applied = failed = 0
+        for line_no, op in operations:
+            result = {
+                "line": line_no,
+                "op": op.get("op", ""),
+                "account": op.get("account", ""),
+                "amount": op.get("amount", ""),
+                "target": op.get("target", "") or "",
+                "balance": ""
+            }
+            try:
+                account = self.apply(op)
+                result["status"] = "OK"
+                result["message"] = ""
+                result["balance"] = f"{account.get_balance():.2f}"
+                applied += 1
+            except (ValueError, TypeError) as e:
+                result["status"] = "ERROR"
+                result["message"] = str(e)
+                failed += 1
+            self.results.append(result)
+        return applied, failed
+
+    def commit(self):
+        save_accounts(list(self.touched.values()))
+        return len(self.touched)
+
+    def write_report(self, path):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.results)
+
+
+def process_batch(path, report_path=None):
+    start = time.perf_counter()
+    processor = BatchProcessor()
+    applied, failed = processor.run(read_operations(path))
+    saved = processor.commit()
+    elapsed = time.perf_counter() - start
+
+    if report_path is None:
+        report_path = os.path.splitext(path)[0] + ".report.csv"
+    processor.write_report(report_path)
+
+    total = applied + failed
+    return {
+        "total": total,
+        "applied": applied,
+        "failed": failed,
+        "accounts_saved": saved,
+        "seconds": elapsed,
+        "ops_per_sec": total / elapsed if elapsed else 0.0,
+        "report": report_path
+    }
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python batch.py OPERATIONS.csv|OPERATIONS.jsonl [REPORT.csv]")
+        sys.exit(1)
+    try:
+        summary = process_batch(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    except ValueError as e:
+        print(f"❌ Batch rejected, nothing was saved: {e}")
+        sys.exit(1)
+    print(f"✅ Applied {summary['applied']} of {summary['total']} operations "
+          f"({summary['failed']} failed) in {summary['seconds']:.2f}s "
+          f"({summary['ops_per_sec']:,.0f} ops/s)")
+    print(f"   Accounts saved: {summary['accounts_saved']}")
+    print(f"   Report: {summary['report']}")
@@ -0,0 +1,419 @@
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+import storage
+from storage import JsonStorage, create_backend, set_backend, account_to_dict, load_account, save_account, \
+    load_all_accounts, iter_accounts
+from bank_account import BankAccount
+from bank_service import service
+from balance_table import balance_table
+from account_allocator import AccountNumberAllocator, SEQUENCE_START
+from pin_security import hash_pin, verified_pins
+from transaction import Transaction, DEPOSIT, WITHDRAWAL, TRANSFER_OUT, TRANSFER_IN
+from validation import (validate_account_number, validate_name, validate_date, validate_address, validate_mobile,
+                        validate_email, validate_gender, validate_branch_code, validate_pin)
+
+BENCH_DIR = "bench_data"
+BENCH_RESULTS = "benchmark.json"
+SIZES = (1000, 100000, 1000000)
+BACKENDS = ("json", "binary", "jsonl", "sqlite")
+SEED = 42
+# Mean history length; individual accounts vary around it (exponential).
+HISTORY_MEAN = 20
+HISTORY_MAX = 500
+OPS = 1000
+# Uncached logins pay for a full PIN hash each.
+LOGIN_OPS = 20
+FULL_SCAN_REPEATS = 3
+OPEN_REPEATS = 3
+# Hashing a PIN per account would take hours at 1M accounts, so accounts
+# share a small pool of hashed PINs.
+PIN_POOL = 32
+# A run is flagged when an operation's median is this much slower than the
+# baseline's.
+REGRESSION_THRESHOLD = 0.25
+REGRESSION_METRIC = "p50_ms"
+# Differences below this are timer noise, whatever the percentage.
+REGRESSION_MIN_MS = 0.01
+
+FIRST_NAMES = ("Aarav", "Vivaan", "Aditya", "Diya", "Ananya", "Ishaan", "Kavya", "Rohan", "Meera", "Arjun",
+               "Saanvi", "Kabir", "Nisha", "Rahul", "Priya", "Vikram", "Sneha", "Farhan", "Zoya", "Joseph")
+LAST_NAMES = ("Sharma", "Verma", "Iyer", "Nair", "Reddy", "Patel", "Gupta", "Khan", "Das", "Menon",
+              "Singh", "Rao", "Joshi", "Mehta", "Pillai", "Bose", "Kapoor", "Chatterjee", "Fernandes", "Ali")
+STREETS = ("MG Road", "Park Street", "Anna Salai", "Linking Road", "Brigade Road", "Residency Road")
+CITIES = ("Mumbai", "Delhi", "Bengaluru", "Chennai", "Kolkata", "Hyderabad")
+BRANCHES = ("MUM001", "DEL002", "BLR003", "CHN004", "KOL005", "HYD006")
+# (type, weight, opening balance range)
+ACCOUNT_MIX = (
+    ("Savings", 70, (1000, 200000)),
+    ("Current", 20, (10000, 2000000)),
+    ("Fixed Deposit", 5, (10000, 1000000)),
+    ("Recurring Deposit", 5, (500, 50000))
+)
+STATUS_MIX = (("Active", 94), ("Inactive", 3), ("Suspended", 1), ("Frozen", 2))
+
+
+def pool_pin(index):
+    return f"{1000 + (index % PIN_POOL) * 271:04d}"
+
+
+# Only used to format numbers the way the allocator does; never reserves.
+_numbers = AccountNumberAllocator(path=os.devnull)
+
+
+def account_number(index):
+    return _numbers.format(SEQUENCE_START + index)
+
+
+def _pick(rng, mix):
+    return rng.choices([item[0] for item in mix], weights=[item[1] for item in mix])[0]
+
+
+def _history(rng, account_type, opened, count, now):
+    # Running balances stay consistent with the amounts; the last one is the
+    # account's balance.
+    times = sorted(rng.randrange(opened, now) for _ in range(count))
+    history = []
+    running = round(rng.uniform(1000, 50000), 2)
+    history.append(Transaction(times[0], DEPOSIT, running, running))
+    for when in times[1:]:
+        amount = round(rng.uniform(100, 20000), 2)
+        kind = rng.choice((DEPOSIT, DEPOSIT, WITHDRAWAL, TRANSFER_OUT, TRANSFER_IN))
+        if account_type in ("Fixed Deposit", "Recurring Deposit") or (kind in (WITHDRAWAL, TRANSFER_OUT) and amount > running):
+            kind = DEPOSIT if account_type != "Fixed Deposit" else TRANSFER_IN
+        running = round(running + amount if kind in (DEPOSIT, TRANSFER_IN) else running - amount, 2)
+        counterparty = account_number(rng.randrange(1000000)) if kind in (TRANSFER_OUT, TRANSFER_IN) else None
+        history.append(Transaction(when, kind, amount, running, counterparty))
+    return history, running
+
+
+def make_account(index, rng, pin_hashes, now, history_mean=HISTORY_MEAN):
+    first = rng.choice(FIRST_NAMES)
+    last = rng.choice(LAST_NAMES)
+    account_type = _pick(rng, ACCOUNT_MIX)
+    low, high = next(item[2] for item in ACCOUNT_MIX if item[0] == account_type)
+    opened = now - rng.randrange(30, 10 * 365) * 86400
+    born = date(1950, 1, 1) + timedelta(days=rng.randrange(20000))
+    count = min(HISTORY_MAX, int(rng.expovariate(1 / history_mean))) if history_mean else 0
+    if count:
+        history, balance = _history(rng, account_type, opened, count, now)
+    else:
+        history, balance = [], round(rng.uniform(low, high), 2)
+    return BankAccount(
+        account_number=account_number(index),
+        holder=f"{first} {last}",
+        gender=rng.choice("MFO"),
+        DOB=born.strftime("%d-%m-%Y"),
+        address=f"{rng.randrange(1, 999)} {rng.choice(STREETS)}, {rng.choice(CITIES)}",
+        mobile=str(6000000000 + index),
+        email=f"{first.lower()}.{last.lower()}{index}@example.com",
+        account_type=account_type,
+        status=_pick(rng, STATUS_MIX),
+        KYC=rng.random() < 0.9,
+        branch_code=rng.choice(BRANCHES),
+        opening_date=str(datetime.fromtimestamp(opened).date()),
+        pin=pin_hashes[index % PIN_POOL],
+        balance=balance,
+        history=history
+    )
+
+
+def check_account(acc, pin):
+    for result in (validate_account_number(acc.account_number), validate_name(acc.holder),
+                   validate_gender(acc.gender), validate_date(acc.DOB), validate_address(acc.address),
+                   validate_mobile(acc.mobile), validate_email(acc.email),
+                   validate_branch_code(acc.branch_code), validate_pin(pin)):
+        if not result[0]:
+            raise ValueError(f"Generated account {acc.account_number} is invalid: {result[1]}")
+
+
+def generate_accounts(size, history_mean=HISTORY_MEAN, seed=SEED):
+    rng = random.Random(seed)
+    pin_hashes = [hash_pin(pool_pin(i)) for i in range(PIN_POOL)]
+    now = int(time.time())
+    for index in range(size):
+        acc = make_account(index, rng, pin_hashes, now, history_mean)
+        check_account(acc, pool_pin(index))
+        yield acc
+
+
+class _RecordStream:
+    # Feeds accounts to the snapshot writer one at a time, so a 1M-account
+    # dataset never has to be held in memory.
+    def __init__(self, accounts):
+        self.accounts = accounts
+
+    def items(self):
+        return ((acc.account_number, account_to_dict(acc)) for acc in self.accounts)
+
+
+def _store_files(backend):
+    return {
+        "json": (storage.FILE,),
+        "binary": (storage.SNAPSHOT_FILE,),
+        "jsonl": (storage.JSONL_FILE,),
+        "sqlite": (storage.SQLITE_FILE,)
+    }[backend]
+
+
+def generate_dataset(directory, size, backend="json", history_mean=HISTORY_MEAN, seed=SEED):
+    os.makedirs(directory, exist_ok=True)
+    accounts = generate_accounts(size, history_mean, seed)
+    path = os.path.join(directory, _store_files(backend)[0])
+    if backend in ("json", "binary"):
+        JsonStorage(path, os.path.join(directory, storage.JOURNAL_FILE))._write_snapshot(_RecordStream(accounts))
+        return
+    if backend == "jsonl":
+        from jsonl_storage import JsonLinesStorage
+        store = JsonLinesStorage(path)
+    else:
+        from sqlite_storage import SqliteStorage
+        store = SqliteStorage(path)
+    try:
+        chunk = []
+        for acc in accounts:
+            chunk.append(acc)
+            if len(chunk) == 10000:
+                store.save_accounts(chunk)
+                chunk = []
+        store.save_accounts(chunk)
+    finally:
+        store.close()
+
+
+def dataset_dir(size, backend, history_mean, seed):
+    return os.path.join(BENCH_DIR, f"{backend}-{size}-h{history_mean}-s{seed}")
+
+
+def summarize(times):
+    times = sorted(times)
+    count = len(times)
+    total = sum(times)
+
+    def pct(p):
+        return times[min(count - 1, int(p * count))] * 1000
+
+    return {
+        "count": count,
+        "mean_ms": total / count * 1000,
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "max_ms": times[-1] * 1000,
+        "ops_per_sec": count / total if total else 0.0
+    }
+
+
+def timed(action, calls):
+    times = []
+    for args in calls:
+        start = time.perf_counter()
+        action(*args)
+        times.append(time.perf_counter() - start)
+    return summarize(times)
+
+
+def _open(backend, cached):
+    balance_table.close()
+    storage.BACKEND = backend
+    set_backend(create_backend(backend, cached=cached))
+
+
+def _expect_denied(action):
+    # Denials (BankError from the service, ValueError from BankAccount) still
+    # count as a timed operation.
+    def run(*args):
+        try:
+            action(*args)
+        except ValueError:
+            pass
+    return run
+
+
+def run_suite(size, backend="json", ops=OPS, cached=False, history_mean=HISTORY_MEAN, seed=SEED, skip=()):
+    rng = random.Random(seed + 1)
+    results = {}
+
+    def sample(count):
+        return [rng.randrange(size) for _ in range(count)]
+
+    def bench(name, action, calls):
+        if name not in skip:
+            results[name] = timed(action, calls)
+
+    bench("open", lambda: (_open(backend, cached), load_account(account_number(0))), [()] * OPEN_REPEATS)
+    bench("load_account", load_account, [(account_number(i),) for i in sample(ops)])
+
+    # Distinct accounts: saving two stale copies of one account would conflict.
+    loaded = [load_account(account_number(i)) for i in rng.sample(range(size), min(ops, size))]
+    bench("save_account", lambda acc: save_account(acc, allow_update=True), [(acc,) for acc in loaded])
+
+    repeats = 1 if size > 100000 else FULL_SCAN_REPEATS
+    bench("load_all_accounts", load_all_accounts, [()] * repeats)
+    bench("iter_accounts", lambda: sum(1 for _ in iter_accounts()), [()] * repeats)
+
+    verified_pins._entries.clear()
+    logins = [(account_number(i), pool_pin(i)) for i in sample(LOGIN_OPS)]
+    bench("login", _expect_denied(lambda acc_no, pin: service.login(acc_no, pin, "bench")), logins)
+    bench("login_cached", _expect_denied(lambda acc_no, pin: service.login(acc_no, pin, "bench")),
+          [logins[i % len(logins)] for i in range(ops)])
+
+    accounts = [(account_number(i),) for i in sample(ops)]
+    bench("balance", service.balance, accounts)
+    # Denied requests (inactive accounts, deposit-only types, low balance)
+    # are part of the real mix and are timed like the rest.
+    bench("deposit", _expect_denied(lambda acc_no: service.deposit(acc_no, 100)), accounts)
+    bench("withdraw", _expect_denied(lambda acc_no: service.withdraw(acc_no, 100)), accounts)
+    pairs = [(account_number(a), account_number(b)) for a, b in zip(sample(ops), sample(ops)) if a != b]
+    bench("transfer", _expect_denied(lambda source, target: service.transfer(source, target, 100)), pairs)
+
+    # The same operations on BankAccount objects alone, without storage.
+    in_memory = [acc for acc in loaded if acc.status == "Active" and acc.account_type in ("Savings", "Current")]
+    if in_memory:
+        picks = [(in_memory[i % len(in_memory)],) for i in range(ops)]
+        bench("account_deposit", lambda acc: acc.deposit(100), picks)
+        bench("account_withdraw", _expect_denied(lambda acc: acc.withdraw(100)), picks)
+        bench("account_transfer", _expect_denied(lambda acc: acc.transfer(in_memory[0], 100)), picks)
+        bench("account_history_page", lambda acc: acc.get_history_page(limit=10), picks)
+    return results
+
+
+def run_benchmarks(sizes=SIZES, backend="json", ops=OPS, cached=False, history_mean=HISTORY_MEAN, seed=SEED, skip=()):
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend must be one of: {', '.join(BACKENDS)}")
+    report = {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": backend,
+            "cached": cached,
+            "history_mean": history_mean,
+            "seed": seed,
+            "ops": ops,
+            "durability": storage.DURABILITY
+        },
+        "datasets": {},
+        "results": {}
+    }
+    home = os.getcwd()
+    for size in sizes:
+        source = dataset_dir(size, backend, history_mean, seed)
+        if not os.path.isdir(source):
+            print(f"⏳ Generating {size:,} accounts ({backend}) in {source}")
+            start = time.perf_counter()
+            generate_dataset(source, size, backend, history_mean, seed)
+            report["datasets"][str(size)] = {"generate_seconds": time.perf_counter() - start}
+        # Work on a copy so every run starts from the same data.
+        work = tempfile.mkdtemp(prefix="run-", dir=BENCH_DIR)
+        try:
+            for name in _store_files(backend):
+                shutil.copy2(os.path.join(source, name), work)
+            os.chdir(work)
+            report["datasets"].setdefault(str(size), {})["bytes"] = sum(
+                os.path.getsize(name) for name in _store_files(backend))
+            print(f"🏁 Benchmarking {size:,} accounts")
+            report["results"][str(size)] = run_suite(size, backend, ops, cached, history_mean, seed, skip)
+        finally:
+            storage.get_backend().close()
+            balance_table.close()
+            os.chdir(home)
+            shutil.rmtree(work, ignore_errors=True)
+    return report
+
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD, metric=REGRESSION_METRIC):
+    # [(size, operation, baseline value, current value)] for every operation
+    # that got slower than the threshold allows.
+    regressions = []
+    for size, operations in current["results"].items():
+        for name, stats in operations.items():
+            before = baseline.get("results", {}).get(size, {}).get(name)
+            if not before or before[metric] <= 0 or stats[metric] - before[metric] < REGRESSION_MIN_MS:
+                continue
+            if stats[metric] > before[metric] * (1 + threshold):
+                regressions.append((size, name, before[metric], stats[metric]))
+    return regressions
+
+
+def print_report(report):
+    for size, operations in report["results"].items():
+        print(f"\n📊 {int(size):,} accounts ({report['meta']['backend']})")
+        print(f"   {'operation':<22} {'count':>6} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'ops/s':>12}")
+        for name, stats in operations.items():
+            print(f"   {name:<22} {stats['count']:>6} {stats['p50_ms']:>10.3f} {stats['p90_ms']:>10.3f} "
+                  f"{stats['p99_ms']:>10.3f} {stats['ops_per_sec']:>12,.0f}")
+
+
+def print_regressions(regressions, threshold=REGRESSION_THRESHOLD):
+    if not regressions:
+        print(f"\n✅ No operation regressed by more than {threshold:.0%}")
+        return
+    print(f"\n❌ {len(regressions)} regression(s) over {threshold:.0%} ({REGRESSION_METRIC}):")
+    for size, name, before, after in regressions:
+        print(f"   {int(size):>9,} {name:<22} {before:.3f} → {after:.3f} ms ({after / before - 1:+.0%})")
+
+
+def _parse_args(argv):
+    options = {"--backend": "json", "--ops": str(OPS), "--history": str(HISTORY_MEAN), "--seed": str(SEED),
+               "--out": BENCH_RESULTS, "--compare": None, "--threshold": str(REGRESSION_THRESHOLD), "--skip": ""}
+    flags = set()
+    sizes = []
+    args = list(argv)
+    while args:
+        arg = args.pop(0)
+        if arg == "--cached":
+            flags.add(arg)
+        elif arg in options:
+            if not args:
+                raise ValueError(f"{arg} needs a value")
+            options[arg] = args.pop(0)
+        elif arg.isdigit():
+            sizes.append(int(arg))
+        elif arg.endswith(".json") and options["--compare"] is not None:
+            # benchmark.py --compare OLD.json NEW.json: compare without running.
+            options["--against"] = arg
+        else:
+            raise ValueError(f"Unknown argument: {arg}")
+    return sizes or list(SIZES), options, flags
+
+
+if __name__ == "__main__":
+    try:
+        sizes, options, flags = _parse_args(sys.argv[1:])
+        threshold = float(options["--threshold"])
+        if "--against" in options:
+            with open(options["--compare"]) as f:
+                baseline = json.load(f)
+            with open(options["--against"]) as f:
+                report = json.load(f)
+        else:
+            report = run_benchmarks(
+                sizes, options["--backend"], int(options["--ops"]), "--cached" in flags,
+                int(options["--history"]), int(options["--seed"]),
+                tuple(name for name in options["--skip"].split(",") if name)
+            )
+            with open(options["--out"], "w") as f:
+                json.dump(report, f, indent=4)
+            baseline = None
+            if options["--compare"]:
+                with open(options["--compare"]) as f:
+                    baseline = json.load(f)
+    except (ValueError, OSError) as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+
+    print_report(report)
+    if "--against" not in options:
+        print(f"\n💾 Results written to {options['--out']}")
+    if baseline is not None:
+        regressions = compare(baseline, report, threshold)
+        print_regressions(regressions, threshold)
+        if regressions:
+            sys.exit(1)
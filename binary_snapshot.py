@@ -0,0 +1,153 @@
+import json
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from collections.abc import MutableMapping
+
+# Layout: header, then the account numbers as one JSON list, then count + 1
+# little-endian uint64 offsets, then the records back to back (compact JSON
+# each). The CRC covers everything after the header.
+MAGIC = b"BNKSNAP\x00"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQI")  # magic, version, count, key list bytes, crc32
+# Records are staged in memory up to this size, then in a temporary file.
+SPOOL_BYTES = 8 * 1024 * 1024
+COPY_BLOCK = 1024 * 1024
+
+
+def is_binary_snapshot(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+
+def _encode(record):
+    return json.dumps(record, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class SnapshotRecords(MutableMapping):
+    # Account records backed by a loaded snapshot. Opening it only parses the
+    # key list and offsets; a record is decoded each time it is read and not
+    # kept, so a full scan doesn't leave every account decoded in memory
+    # (point reads are one small json.loads; the account cache sits in front).
+    # Records written since the load live in _changed, and untouched ones are
+    # written back as their original bytes.
+    def __init__(self, keys, offsets, blob):
+        self._index = dict(zip(keys, range(len(keys))))
+        self._offsets = offsets
+        self._blob = blob
+        self._changed = {}
+
+    def _raw(self, i):
+        return self._blob[self._offsets[i]:self._offsets[i + 1]]
+
+    def copy(self):
+        # Shares the (read-only) loaded snapshot; changes to either copy
+        # don't show in the other.
+        other = SnapshotRecords((), self._offsets, self._blob)
+        other._index = dict(self._index)
+        other._changed = dict(self._changed)
+        return other
+
+    def __getitem__(self, acc_no):
+        record = self._changed.get(acc_no)
+        if record is not None:
+            return record
+        return json.loads(bytes(self._raw(self._index[acc_no])))
+
+    def __setitem__(self, acc_no, record):
+        self._index.pop(acc_no, None)
+        self._changed[acc_no] = record
+
+    def __delitem__(self, acc_no):
+        if acc_no in self._changed:
+            del self._changed[acc_no]
+        else:
+            del self._index[acc_no]
+
+    def __contains__(self, acc_no):
+        return acc_no in self._changed or acc_no in self._index
+
+    def __iter__(self):
+        yield from list(self._index)
+        yield from list(self._changed)
+
+    def __len__(self):
+        return len(self._index) + len(self._changed)
+
+    def encoded_items(self):
+        for acc_no, i in self._index.items():
+            yield acc_no, self._raw(i)
+        for acc_no, record in self._changed.items():
+            yield acc_no, _encode(record)
+
+
+def write_snapshot(f, records):
+    if isinstance(records, SnapshotRecords):
+        items = records.encoded_items()
+    else:
+        items = ((str(acc_no), _encode(record)) for acc_no, record in records.items())
+
+    # The key list and offsets come first in the file but are only known
+    # once every record has been encoded, so the records are staged (on
+    # disk past SPOOL_BYTES) and copied after them. Only keys and offsets
+    # are kept in memory.
+    keys = []
+    offsets = array("Q", [0])
+    end = 0
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as staged:
+        for acc_no, data in items:
+            keys.append(acc_no)
+            staged.write(data)
+            end += len(data)
+            offsets.append(end)
+        if sys.byteorder == "big":
+            offsets.byteswap()
+
+        parts = [json.dumps(keys, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), offsets.tobytes()]
+        crc = 0
+        for part in parts:
+            crc = zlib.crc32(part, crc)
+        staged.seek(0)
+        while True:
+            block = staged.read(COPY_BLOCK)
+            if not block:
+                break
+            crc = zlib.crc32(block, crc)
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(keys), len(parts[0]), crc))
+        for part in parts:
+            f.write(part)
+        staged.seek(0)
+        while True:
+            block = staged.read(COPY_BLOCK)
+            if not block:
+                break
+            f.write(block)
+
+
+def read_snapshot(f):
+    data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError("Snapshot is truncated")
+    magic, version, count, keys_size, crc = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a binary account snapshot")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    body = memoryview(data)[HEADER.size:]
+    if zlib.crc32(body) != crc:
+        raise ValueError("Snapshot checksum mismatch")
+
+    keys = json.loads(bytes(body[:keys_size]))
+    offsets_end = keys_size + (count + 1) * 8
+    offsets = array("Q")
+    offsets.frombytes(body[keys_size:offsets_end])
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    if len(keys) != count or offsets[-1] != len(body) - offsets_end:
+        raise ValueError("Snapshot is truncated")
+    return SnapshotRecords(keys, offsets, body[offsets_end:])
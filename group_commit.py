@@ -0,0 +1,112 @@
+import threading
+import time
+
+# "sync": every caller waits until its write is on disk; writers that arrive
+# while an fsync is running share the next one. "interval": fsync in the
+# background every interval, callers don't wait (a machine crash can lose
+# that much). "os": never fsync, leave it to the OS.
+DURABILITY_MODES = ("sync", "interval", "os")
+
+
+class GroupCommit:
+    # Turns many small appends into few fsyncs. Writers call written() after
+    # their (unsynced) write, drop their locks, then wait(ticket). The first
+    # waiter becomes the leader: it optionally lingers up to `window` seconds
+    # or until `max_batch` writes are pending, fsyncs once, and wakes every
+    # writer the fsync covered.
+    def __init__(self, sync, durability="sync", window=0.0, max_batch=64, interval=0.1):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Durability must be one of: {', '.join(DURABILITY_MODES)}")
+        self.sync = sync
+        self.durability = durability
+        self.window = window
+        self.max_batch = max_batch
+        self.interval = interval
+        self._cond = threading.Condition()
+        self._written = 0
+        self._synced = 0
+        self._flushing = False
+        self._flusher = None
+        self._closed = False
+        self.syncs = 0
+
+    def written(self):
+        with self._cond:
+            self._written += 1
+            ticket = self._written
+            if self._written - self._synced >= self.max_batch:
+                self._cond.notify_all()
+        if self.durability == "interval" and self._flusher is None:
+            self._start_flusher()
+        return ticket
+
+    def wait(self, ticket):
+        if self.durability != "sync":
+            return
+        with self._cond:
+            while self._synced < ticket:
+                if not self._flushing:
+                    self._flushing = True
+                    break
+                self._cond.wait()
+            else:
+                return
+            if self.window:
+                deadline = time.monotonic() + self.window
+                while self._written - self._synced < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+        self._sync_pending()
+
+    def _sync_pending(self):
+        # Called with _flushing set; everything written so far is covered.
+        with self._cond:
+            target = self._written
+        try:
+            self.sync()
+        except BaseException:
+            with self._cond:
+                self._flushing = False
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._synced = max(self._synced, target)
+            self._flushing = False
+            self.syncs += 1
+            self._cond.notify_all()
+
+    def flush(self):
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            if self._synced >= self._written:
+                return
+            self._flushing = True
+        self._sync_pending()
+
+    def _start_flusher(self):
+        with self._cond:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed, self.interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
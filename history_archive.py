@@ -0,0 +1,230 @@
+import json
+import lzma
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from jsonl_storage import JsonLinesStorage
+from sqlite_storage import SqliteStorage
+from storage import JsonStorage, get_backend, _unwrap, load_account, load_all_accounts, update_account, checkpoint
+from transaction import to_transactions, to_records, extend_times, query_history
+
+ARCHIVE_DIR = "archive"
+ARCHIVE_AGE_DAYS = 365
+# "lzma" packs tighter, "zlib" is faster; segments of either kind stay readable.
+ARCHIVE_CODEC = "lzma"
+# Accounts sharing all but the last SEGMENT_DIGITS characters of their number
+# share one segment file.
+SEGMENT_DIGITS = 3
+SEGMENT_CACHE_SIZE = 8
+SAVE_SAMPLE = 100
+
+CODECS = {
+    "lzma": (".xz", lambda data: lzma.compress(data, preset=6), lzma.decompress),
+    "zlib": (".z", lambda data: zlib.compress(data, 9), zlib.decompress)
+}
+
+_cache_lock = threading.Lock()
+_segment_cache = OrderedDict()
+
+
+def segment_name(acc_no):
+    return acc_no[:-SEGMENT_DIGITS] or "0"
+
+
+def _segment_file(name, archive_dir):
+    for ext, _, _ in CODECS.values():
+        path = os.path.join(archive_dir, name + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _codec_for(path):
+    for ext, compress, decompress in CODECS.values():
+        if path.endswith(ext):
+            return compress, decompress
+    raise ValueError(f"Unknown archive segment type: {path}")
+
+
+def read_segment(name, archive_dir=ARCHIVE_DIR):
+    # {account number: [history records]}; decoded segments are kept in a
+    # small LRU keyed by file signature since old statements are read rarely
+    # but usually page by page.
+    path = _segment_file(name, archive_dir)
+    if path is None:
+        return {}
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        if key in _segment_cache:
+            _segment_cache.move_to_end(key)
+            return _segment_cache[key]
+    with open(path, "rb") as f:
+        segment = json.loads(_codec_for(path)[1](f.read()).decode("utf-8"))
+    with _cache_lock:
+        _segment_cache[key] = segment
+        while len(_segment_cache) > SEGMENT_CACHE_SIZE:
+            _segment_cache.popitem(last=False)
+    return segment
+
+
+def write_segment(name, segment, archive_dir=ARCHIVE_DIR, codec=ARCHIVE_CODEC):
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}'. Use one of: {', '.join(CODECS)}")
+    ext, compress, _ = CODECS[codec]
+    os.makedirs(archive_dir, exist_ok=True)
+    old_path = _segment_file(name, archive_dir)
+    path = os.path.join(archive_dir, name + ext)
+    data = json.dumps(segment, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(compress(data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    if old_path is not None and old_path != path:
+        os.remove(old_path)
+    return os.path.getsize(path)
+
+
+def load_archived(acc_no, count, archive_dir=ARCHIVE_DIR):
+    # Only the first `count` entries are trusted: anything past the count the
+    # account recorded was written by an archival run that never committed.
+    records = read_segment(segment_name(acc_no), archive_dir).get(acc_no, [])
+    return to_transactions(records[:count])
+
+
+def archived_history_page(account, start=None, end=None, offset=0, limit=None, newest_first=True, archive_dir=ARCHIVE_DIR):
+    history = load_archived(account.account_number, account.archived, archive_dir) + account.history
+    return query_history(history, extend_times([], history), start, end, offset, limit, newest_first)
+
+
+def _hot_size():
+    backend = _unwrap(get_backend())
+    path = getattr(backend, "path", None)
+    if path is None or not os.path.exists(path):
+        return 0
+    size = os.path.getsize(path)
+    journal = getattr(backend, "journal_path", None)
+    if journal and os.path.exists(journal):
+        size += os.path.getsize(journal)
+    return size
+
+
+def _scratch_backend(directory):
+    # Empty store of the same kind as the live one, for timing only.
+    backend = _unwrap(get_backend())
+    if isinstance(backend, JsonLinesStorage):
+        return JsonLinesStorage(os.path.join(directory, "data.jsonl"))
+    ext = os.path.splitext(backend.path)[1]
+    return JsonStorage(os.path.join(directory, "data" + ext), os.path.join(directory, "data.journal"),
+                       journal_mode=backend.journal_mode, binary=backend.binary)
+
+
+def _save_latency(accounts):
+    # Average time of a no-op update (load, save the whole record) over a
+    # sample of accounts: what every deposit pays for the inline history.
+    # Timed on copies in a scratch store so the live accounts are never
+    # rewritten (or their versions bumped) just to be measured.
+    accounts = [acc for acc in accounts[:SAVE_SAMPLE] if acc is not None]
+    if not accounts:
+        return 0.0
+    with tempfile.TemporaryDirectory() as directory:
+        backend = _scratch_backend(directory)
+        try:
+            backend.save_all_accounts({acc.account_number: acc for acc in accounts})
+            start = time.perf_counter()
+            for acc in accounts:
+                backend.save_account(backend.load_account(acc.account_number), allow_update=True)
+            backend.wait_durable()
+            return (time.perf_counter() - start) / len(accounts)
+        finally:
+            backend.close()
+
+
+def archive_history(older_than_days=ARCHIVE_AGE_DAYS, archive_dir=ARCHIVE_DIR, codec=ARCHIVE_CODEC, measure=True):
+    if isinstance(_unwrap(get_backend()), SqliteStorage):
+        raise ValueError("The SQLite backend keeps history in its own indexed table; nothing to archive.")
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}'. Use one of: {', '.join(CODECS)}")
+
+    cutoff = int(time.time()) - int(older_than_days) * 86400
+    checkpoint()
+    accounts = load_all_accounts()
+    sample = [acc for acc in accounts if acc.history][:SAVE_SAMPLE]
+    hot_before = _hot_size()
+    save_before = _save_latency(sample) if measure else None
+
+    # Phase 1: work out what moves, grouped by segment.
+    groups = {}
+    for acc in accounts:
+        times = extend_times([], acc.history)
+        moving = 0
+        while moving < len(times) and times[moving] < cutoff:
+            moving += 1
+        if moving:
+            groups.setdefault(segment_name(acc.account_number), []).append((acc, moving))
+
+    moved = touched = 0
+    archive_bytes = 0
+    for name, members in groups.items():
+        # Phase 2: write the segment first, so a crash before the hot store is
+        # trimmed only leaves uncounted (ignored) entries behind.
+        segment = dict(read_segment(name, archive_dir))
+        for acc, moving in members:
+            kept = segment.get(acc.account_number, [])[:acc.archived]
+            segment[acc.account_number] = kept + to_records(acc.history[:moving])
+        archive_bytes += write_segment(name, segment, archive_dir, codec)
+
+        # Phase 3: trim the hot copies. Deposits only append, so the prefix
+        # is still the one archived unless another archival run got there.
+        for acc, moving in members:
+            archived_before = acc.archived
+            head = to_records(acc.history[:moving])
+
+            def trim(current, archived_before=archived_before, head=head, moving=moving):
+                if current.archived != archived_before or to_records(current.history[:moving]) != head:
+                    raise ValueError(f"Account {current.account_number} history changed during archival")
+                current.history = current.history[moving:]
+                current.archived += moving
+
+            try:
+                update_account(acc.account_number, trim)
+            except ValueError:
+                continue
+            moved += moving
+            touched += 1
+
+    checkpoint()
+    hot_after = _hot_size()
+    save_after = _save_latency([load_account(acc.account_number) for acc in sample]) if measure else None
+    return {
+        "cutoff": cutoff,
+        "accounts": touched,
+        "entries": moved,
+        "segments": len(groups),
+        "archive_bytes": archive_bytes,
+        "hot_bytes_before": hot_before,
+        "hot_bytes_after": hot_after,
+        "save_seconds_before": save_before,
+        "save_seconds_after": save_after
+    }
+
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else ARCHIVE_AGE_DAYS
+    codec = sys.argv[2] if len(sys.argv) > 2 else ARCHIVE_CODEC
+    try:
+        stats = archive_history(days, codec=codec)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ Archived {stats['entries']} entries from {stats['accounts']} accounts "
+          f"into {stats['segments']} segments ({stats['archive_bytes']:,} bytes, {codec})")
+    print(f"   Hot store: {stats['hot_bytes_before']:,} → {stats['hot_bytes_after']:,} bytes")
+    if stats["save_seconds_before"] is not None:
+        print(f"   Avg save: {stats['save_seconds_before'] * 1000:.3f} ms → {stats['save_seconds_after'] * 1000:.3f} ms")
@@ -0,0 +1,40 @@
+import json
+import os
+
+# Helpers shared by the append-only files (data.journal, data.jsonl,
+# admin.journal): one JSON object per line, complete once its newline is on
+# disk.
+
+
+def read_line(line):
+    # One newline-terminated line -> (position of the record in the line,
+    # record). Before torn tails were cut off, a crashed writer's fragment
+    # could be left without a newline and the next append glued onto it. The
+    # fragment was never acknowledged, but the record after it was, so it is
+    # recovered: the first '{"' from which the rest of the line parses.
+    try:
+        return 0, json.loads(line)
+    except ValueError:
+        pass
+    start = line.find(b'{"', 1)
+    while start != -1:
+        try:
+            record = json.loads(line[start:])
+        except ValueError:
+            record = None
+        if isinstance(record, dict):
+            return start, record
+        start = line.find(b'{"', start + 1)
+    raise ValueError("No complete record in journal line")
+
+
+def drop_torn_tail(path, end):
+    # Callers hold the file lock and have just read the file up to `end`, so
+    # nobody is mid-append: anything after it is what a crashed writer left
+    # behind. Appending after that would glue the next record onto it.
+    try:
+        size = os.path.getsize(path)
+    except FileNotFoundError:
+        return
+    if size > end:
+        os.truncate(path, end)
@@ -0,0 +1,354 @@
+import json
+import os
+import threading
+from file_lock import FileLock
+from journal_lines import read_line, drop_torn_tail
+from metrics import bytes_read, bytes_written
+from storage import StorageBackend, account_to_dict, account_from_dict, check_fields, project_record, check_version, versioned_record
+from transaction import query_records
+
+# Compact once superseded records make up more than this share of the file.
+COMPACT_RATIO = 0.5
+COMPACT_MIN_BYTES = 4 * 1024 * 1024
+# Start of the first line of a group of records saved together.
+BATCH_PREFIX = b'{"batch":'
+
+
+class JsonLinesStorage(StorageBackend):
+    # Record-per-line data file (one JSON object per account version, newest
+    # wins) plus a sidecar index of "acc<TAB>offset<TAB>length" lines, so a
+    # point lookup is one seek and one json.loads regardless of file size.
+    # Deletions are tombstone lines, indexed with a negative length.
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path or os.path.splitext(path)[0] + ".idx"
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.splitext(path)[0] + ".lock")
+        self._index = None
+        self._covered = 0
+        self._dead_bytes = 0
+        self._data_ino = None
+        self._reader = None
+        self._reader_ino = None
+        self._writes = threading.local()
+        self.skipped_records = 0
+
+    def _note(self, acc_no, offset, length):
+        old = self._index.get(acc_no)
+        if old is not None:
+            self._dead_bytes += old[1]
+        if length > 0:
+            self._index[acc_no] = (offset, length)
+        else:
+            self._index.pop(acc_no, None)
+            self._dead_bytes -= length
+        self._covered = max(self._covered, offset + abs(length))
+
+    def _load_index(self):
+        self._index = {}
+        self._covered = 0
+        self._dead_bytes = 0
+        if not os.path.exists(self.index_path):
+            return False
+        with open(self.index_path, "r") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 3:
+                    continue
+                self._note(parts[0], int(parts[1]), int(parts[2]))
+        return True
+
+    def _scan(self, start):
+        # Index every complete record from `start` onwards. Used to extend a
+        # stale index after other writers appended, and for full rebuilds.
+        # Accounts saved together are written as a group whose first line
+        # carries "batch": <lines in group>; a group is only indexed once all
+        # of its lines are there, so a torn write loses all of it or none.
+        entries = []
+        group = []
+        expected = 0
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    skip, record = read_line(line)
+                except ValueError:
+                    # Not a torn write (that always ends in a whole record).
+                    self.skipped_records += 1
+                    offset += len(line)
+                    group = []
+                    expected = 0
+                    continue
+                if skip:
+                    # A torn fragment ends any group it belonged to.
+                    group = []
+                if not group:
+                    expected = record.get("batch", 1)
+                size = len(line) - skip
+                length = -size if record.get("deleted") else size
+                group.append((record["acc"], offset + skip, length))
+                offset += len(line)
+                if len(group) == expected:
+                    entries.extend(group)
+                    group = []
+        bytes_read("jsonl", offset - start)
+        for acc_no, offset, length in entries:
+            self._note(acc_no, offset, length)
+        self._append_index(entries)
+
+    def _rebuild_index(self):
+        with self._file_lock:
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            self._index = {}
+            self._covered = 0
+            self._dead_bytes = 0
+            if os.path.exists(self.path):
+                self._scan(0)
+
+    def _ensure_index(self):
+        try:
+            st = os.stat(self.path)
+            size, ino = st.st_size, st.st_ino
+        except FileNotFoundError:
+            size, ino = 0, None
+        if ino != self._data_ino:
+            # Replaced by a compaction or bulk save elsewhere; its index was
+            # rewritten alongside it.
+            self._index = None
+            self._data_ino = ino
+        if self._index is None:
+            if not self._load_index() or self._covered > size:
+                self._rebuild_index()
+        elif self._covered > size:
+            self._rebuild_index()
+        if size > self._covered:
+            self._scan(self._covered)
+
+    def _append_index(self, entries):
+        if not entries:
+            return
+        payload = "".join(f"{acc_no}\t{offset}\t{length}\n" for acc_no, offset, length in entries)
+        fd = os.open(self.index_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, payload.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def _append_records(self, records):
+        # Callers hold the file lock and have just called _ensure_index().
+        # Anything past the last complete record (or group) is cut off first,
+        # so the new lines can't glue onto a fragment or complete a dead group.
+        drop_torn_tail(self.path, self._covered)
+        if len(records) > 1:
+            records = [{"batch": len(records), **records[0]}] + records[1:]
+        lines = [(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8") for record in records]
+        payload = b"".join(lines)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, payload)
+            os.fsync(fd)
+            bytes_written("jsonl", len(payload))
+            offset = os.lseek(fd, 0, os.SEEK_CUR) - len(payload)
+        finally:
+            os.close(fd)
+        locations = []
+        for line in lines:
+            locations.append((offset, len(line)))
+            offset += len(line)
+        return locations
+
+    def _append_record(self, record):
+        return self._append_records([record])[0]
+
+    def _read_raw(self, offset, length):
+        st = os.stat(self.path)
+        if self._reader is None or self._reader_ino != st.st_ino:
+            if self._reader is not None:
+                self._reader.close()
+            self._reader = open(self.path, "rb")
+            self._reader_ino = st.st_ino
+        self._reader.seek(offset)
+        bytes_read("jsonl", length)
+        return self._reader.read(length)
+
+    def _read_at(self, offset, length):
+        return json.loads(self._read_raw(offset, length))
+
+    def _read_record(self, acc_no):
+        location = self._index.get(acc_no)
+        if location is None:
+            return None
+        try:
+            record = self._read_at(*location)
+        except ValueError:
+            record = None
+        if record is None or record.get("acc") != acc_no:
+            # The data file was replaced underneath the index.
+            self._rebuild_index()
+            location = self._index.get(acc_no)
+            if location is None:
+                return None
+            record = self._read_at(*location)
+        return record["data"]
+
+    def _maybe_compact(self):
+        if self._covered >= COMPACT_MIN_BYTES and self._dead_bytes > self._covered * COMPACT_RATIO:
+            self.compact()
+
+    def compact(self):
+        with self._lock, self._file_lock:
+            self._ensure_index()
+            tmp = self.path + ".tmp"
+            entries = []
+            offset = 0
+            with open(tmp, "wb") as out:
+                for acc_no, (old_offset, length) in sorted(self._index.items(), key=lambda item: item[1][0]):
+                    line = self._read_raw(old_offset, length)
+                    if line.startswith(BATCH_PREFIX):
+                        # Copied on its own now, so no longer heads a group.
+                        record = json.loads(line)
+                        del record["batch"]
+                        line = (json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8")
+                    out.write(line)
+                    entries.append((acc_no, offset, len(line)))
+                    offset += len(line)
+                out.flush()
+                os.fsync(out.fileno())
+            bytes_written("jsonl", offset)
+            os.replace(tmp, self.path)
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            self._index = {}
+            self._covered = 0
+            self._dead_bytes = 0
+            for acc_no, offset, length in entries:
+                self._note(acc_no, offset, length)
+            self._append_index(entries)
+
+    def _stored_version(self, acc_no):
+        data = self._read_record(acc_no)
+        return None if data is None else data.get("version", 0)
+
+    def save_account(self, account, allow_update=False):
+        self._save([account], allow_update)
+
+    def save_accounts(self, accounts, allow_update=True):
+        self._save(list(accounts), allow_update)
+
+    def _save(self, accounts, allow_update):
+        if not accounts:
+            return
+        with self._lock, self._file_lock:
+            before = self.version()
+            self._ensure_index()
+            for acc in accounts:
+                acc_no = str(acc.account_number)
+                check_version(acc_no, self._stored_version(acc_no), acc, allow_update)
+            records = [{"acc": str(acc.account_number), "data": versioned_record(acc)} for acc in accounts]
+            entries = []
+            for record, (offset, length) in zip(records, self._append_records(records)):
+                self._note(record["acc"], offset, length)
+                entries.append((record["acc"], offset, length))
+            self._append_index(entries)
+            for acc in accounts:
+                acc.version += 1
+            self._maybe_compact()
+            self._writes.versions = (before, self.version())
+
+    def save_all_accounts(self, accounts_dict):
+        with self._lock, self._file_lock:
+            before = self.version()
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as out:
+                for acc_no, acc in accounts_dict.items():
+                    record = {"acc": str(acc_no), "data": account_to_dict(acc)}
+                    out.write((json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n").encode("utf-8"))
+                out.flush()
+                os.fsync(out.fileno())
+                bytes_written("jsonl", out.tell())
+            os.replace(tmp, self.path)
+            self._rebuild_index()
+            self._writes.versions = (before, self.version())
+
+    def delete_account(self, acc_no):
+        acc_no = str(acc_no)
+        with self._lock, self._file_lock:
+            before = self.version()
+            self._ensure_index()
+            if acc_no not in self._index:
+                return False
+            offset, length = self._append_record({"acc": acc_no, "deleted": True})
+            self._note(acc_no, offset, -length)
+            self._append_index([(acc_no, offset, -length)])
+            self._writes.versions = (before, self.version())
+            return True
+
+    def account_exists(self, acc_no):
+        with self._lock:
+            self._ensure_index()
+            return str(acc_no) in self._index
+
+    def version(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size)
+
+    def load_account(self, acc_no):
+        acc_no = str(acc_no)
+        with self._lock:
+            self._ensure_index()
+            data = self._read_record(acc_no)
+            if data is None:
+                return None
+            return account_from_dict(acc_no, data)
+
+    def load_history(self, acc_no, start=None, end=None, offset=0, limit=None, newest_first=True):
+        # The record line is still parsed whole, but only the page's entries
+        # become Transactions; no account or history columns are built.
+        with self._lock:
+            self._ensure_index()
+            data = self._read_record(str(acc_no))
+        if data is None:
+            return None
+        return query_records(data.get("history") or [], start, end, offset, limit, newest_first)
+
+    def load_all_accounts(self):
+        with self._lock:
+            self._ensure_index()
+            by_offset = sorted(self._index.items(), key=lambda item: item[1][0])
+            return [account_from_dict(acc_no, self._read_at(*location)["data"]) for acc_no, location in by_offset]
+
+    def iter_accounts(self, fields=None):
+        fields = check_fields(fields)
+        with self._lock:
+            self._ensure_index()
+            live = dict(self._index)
+        if not live:
+            return
+        # One sequential pass; a line is decoded only if the index says it is
+        # the newest version of an account. Records are matched on where they
+        # end, since one recovered from a glued line starts mid-line.
+        wanted = {offset + length: (acc_no, length) for acc_no, (offset, length) in live.items()}
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                hit = wanted.get(offset)
+                if hit is not None:
+                    acc_no, length = hit
+                    yield project_record(acc_no, json.loads(line[-length:])["data"], fields)
+        bytes_read("jsonl", offset)
+
+    def close(self):
+        with self._lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
@@ -0,0 +1,219 @@
+import sys
+import time
+from array import array
+from storage import iter_accounts
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LEDGER_FILE = "ledger.npz"
+CATEGORY_FIELDS = ("account_type", "status", "branch_code")
+LEDGER_FIELDS = ("account_number", "balance", "KYC") + CATEGORY_FIELDS
+FLOAT_EXACT = 2 ** 53
+# Lower edges of the balance bands used by reports, in rupees.
+BALANCE_BANDS = (0, 1000, 10000, 100000, 1000000)
+
+# Known values get stable codes; anything else found in the data is appended.
+KNOWN_CATEGORIES = {
+    "account_type": ("Savings", "Current", "Fixed Deposit", "Recurring Deposit"),
+    "status": ("Active", "Inactive", "Suspended", "Closed", "Frozen"),
+    "branch_code": ()
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("The columnar ledger needs NumPy. Install it with: pip install numpy")
+
+
+def to_paise(amount):
+    # Rounds once at the boundary; everything after this is exact integer math.
+    return int(round(float(amount) * 100))
+
+
+def format_paise(paise):
+    sign = "-" if paise < 0 else ""
+    rupees, paise = divmod(abs(int(paise)), 100)
+    return f"{sign}₹{rupees:,}.{paise:02d}"
+
+
+def band_labels(edges_rupees=BALANCE_BANDS):
+    edges = [to_paise(edge) for edge in edges_rupees]
+    labels = [f"< {format_paise(edges[0])}"]
+    labels += [f"{format_paise(lo)} – {format_paise(hi)}" for lo, hi in zip(edges[:-1], edges[1:])]
+    labels.append(f">= {format_paise(edges[-1])}")
+    return labels
+
+
+class LedgerSnapshot:
+    # Account table as parallel NumPy columns: int64 balances in paise,
+    # small unsigned category codes and a bool KYC flag.
+    def __init__(self, account_numbers, balances, kyc, codes, categories):
+        self.account_numbers = account_numbers
+        self.balances = balances
+        self.kyc = kyc
+        self.codes = codes
+        self.categories = categories
+
+    @classmethod
+    def from_rows(cls, rows):
+        _require_numpy()
+        account_numbers = []
+        balances = array("q")
+        kyc = array("b")
+        lookups = {field: {value: i for i, value in enumerate(KNOWN_CATEGORIES[field])} for field in CATEGORY_FIELDS}
+        raw_codes = {field: array("I") for field in CATEGORY_FIELDS}
+
+        for row in rows:
+            account_numbers.append(row.account_number)
+            balances.append(to_paise(row.balance))
+            kyc.append(1 if row.KYC else 0)
+            for field in CATEGORY_FIELDS:
+                lookup = lookups[field]
+                value = getattr(row, field)
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(lookup)
+                raw_codes[field].append(code)
+
+        codes = {}
+        categories = {}
+        for field in CATEGORY_FIELDS:
+            lookup = lookups[field]
+            dtype = np.uint8 if len(lookup) <= 256 else np.uint16 if len(lookup) <= 65536 else np.uint32
+            codes[field] = np.frombuffer(raw_codes[field], dtype=np.uint32).astype(dtype)
+            categories[field] = tuple(sorted(lookup, key=lookup.get))
+        return cls(
+            np.array(account_numbers, dtype=object),
+            np.frombuffer(balances, dtype=np.int64).copy(),
+            np.frombuffer(kyc, dtype=np.int8).astype(bool),
+            codes,
+            categories
+        )
+
+    @classmethod
+    def load(cls, path=LEDGER_FILE):
+        _require_numpy()
+        with np.load(path, allow_pickle=False) as data:
+            codes = {field: data[f"code_{field}"] for field in CATEGORY_FIELDS}
+            categories = {field: tuple(data[f"cat_{field}"].tolist()) for field in CATEGORY_FIELDS}
+            return cls(data["account_numbers"].astype(object), data["balances"], data["kyc"], codes, categories)
+
+    def save(self, path=LEDGER_FILE):
+        arrays = {
+            "account_numbers": self.account_numbers.astype(str),
+            "balances": self.balances,
+            "kyc": self.kyc
+        }
+        for field in CATEGORY_FIELDS:
+            arrays[f"code_{field}"] = self.codes[field]
+            arrays[f"cat_{field}"] = np.array(self.categories[field], dtype=str)
+        np.savez_compressed(path, **arrays)
+
+    def __len__(self):
+        return len(self.balances)
+
+    def code_for(self, field, value):
+        try:
+            return self.categories[field].index(value)
+        except ValueError:
+            return None
+
+    def mask(self, **filters):
+        # mask(status="Active", KYC=False) -> boolean selector
+        selected = np.ones(len(self), dtype=bool)
+        for field, value in filters.items():
+            if field == "KYC":
+                selected &= self.kyc == bool(value)
+            elif field in self.codes:
+                code = self.code_for(field, value)
+                if code is None:
+                    return np.zeros(len(self), dtype=bool)
+                selected &= self.codes[field] == code
+            else:
+                raise ValueError(f"Cannot filter on '{field}'. Use KYC or one of: {', '.join(CATEGORY_FIELDS)}")
+        return selected
+
+    def select(self, selected):
+        return LedgerSnapshot(
+            self.account_numbers[selected],
+            self.balances[selected],
+            self.kyc[selected],
+            {field: codes[selected] for field, codes in self.codes.items()},
+            self.categories
+        )
+
+    def total(self):
+        return int(self.balances.sum(dtype=np.int64))
+
+    def average(self):
+        return self.total() / len(self) if len(self) else 0.0
+
+    def group_by(self, field):
+        # {category: (accounts, total paise)}
+        if field == "KYC":
+            codes, labels = self.kyc.astype(np.uint8), (False, True)
+        else:
+            codes, labels = self.codes[field], self.categories[field]
+        counts = np.bincount(codes, minlength=len(labels))
+        if int(np.abs(self.balances).sum(dtype=np.int64)) < FLOAT_EXACT:
+            # bincount sums its weights as float64, which is exact for
+            # integers below 2**53 paise, and is far faster than np.add.at.
+            totals = np.rint(np.bincount(codes, weights=self.balances, minlength=len(labels))).astype(np.int64)
+        else:
+            totals = np.zeros(len(labels), dtype=np.int64)
+            np.add.at(totals, codes, self.balances)
+        return {labels[i]: (int(counts[i]), int(totals[i])) for i in range(len(labels)) if counts[i]}
+
+    def distribution(self, edges_rupees=BALANCE_BANDS):
+        # Accounts per balance band: [edge_i, edge_i+1), last band open-ended.
+        edges = np.array([to_paise(edge) for edge in edges_rupees], dtype=np.int64)
+        bands = np.searchsorted(edges, self.balances, side="right")
+        counts = np.bincount(bands, minlength=len(edges) + 1)
+        return list(zip(band_labels(edges_rupees), (int(c) for c in counts)))
+
+    def top(self, k=10):
+        k = min(int(k), len(self))
+        if k <= 0:
+            return []
+        picked = np.argpartition(self.balances, len(self) - k)[len(self) - k:]
+        picked = picked[np.argsort(self.balances[picked])[::-1]]
+        return [(self.account_numbers[i], int(self.balances[i])) for i in picked]
+
+
+def build_snapshot():
+    return LedgerSnapshot.from_rows(iter_accounts(fields=LEDGER_FIELDS))
+
+
+if __name__ == "__main__":
+    try:
+        start = time.perf_counter()
+        if len(sys.argv) > 1 and sys.argv[1] == "--load":
+            ledger = LedgerSnapshot.load(sys.argv[2] if len(sys.argv) > 2 else LEDGER_FILE)
+        else:
+            ledger = build_snapshot()
+            if len(sys.argv) > 1 and sys.argv[1] == "--save":
+                ledger.save(sys.argv[2] if len(sys.argv) > 2 else LEDGER_FILE)
+        loaded = time.perf_counter() - start
+    except ImportError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    total = ledger.total()
+    by_type = ledger.group_by("account_type")
+    by_status = ledger.group_by("status")
+    bands = ledger.distribution()
+    elapsed = time.perf_counter() - start
+
+    print(f"📊 {len(ledger):,} accounts, total {format_paise(total)}, average {format_paise(round(ledger.average()))}")
+    for title, groups in (("Account type", by_type), ("Status", by_status)):
+        print(f"\n{title}:")
+        for label, (count, paise) in groups.items():
+            print(f"   {label:<18} {count:>10,}  {format_paise(paise):>22}")
+    print("\nBalance bands:")
+    for label, count in bands:
+        print(f"   {label:<30} {count:>10,}")
+    print(f"\n   Snapshot {loaded * 1000:.1f} ms, aggregates {elapsed * 1000:.2f} ms")
@@ -0,0 +1,272 @@
+import atexit
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Set BANK_METRICS=0 to leave every instrumented function unwrapped.
+METRICS_ENABLED = os.environ.get("BANK_METRICS", "1") != "0"
+# Dump the metrics here at exit (and on every write_metrics() call).
+METRICS_FILE = os.environ.get("BANK_METRICS_FILE")
+# Profile the whole process with cProfile and save the stats here at exit.
+PROFILE_FILE = os.environ.get("BANK_PROFILE")
+METRICS_PORT = 9100
+PREFIX = "bank_"
+
+# Upper bounds in seconds: in-memory account operations land in the first
+# few buckets, saves and hashed logins further up.
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Raw timings are buffered per histogram and sorted into buckets in batches.
+FOLD_EVERY = 1024
+
+HELP = {
+    "operation_seconds": ("histogram", "Time spent in an instrumented operation"),
+    "operation_errors_total": ("counter", "Instrumented operations that raised"),
+    "storage_bytes_read_total": ("counter", "Bytes read from account storage files"),
+    "storage_bytes_written_total": ("counter", "Bytes written to account storage files")
+}
+
+
+class Histogram:
+    __slots__ = ("buckets", "sum", "count", "pending")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+        # list.append is atomic, so recording a timing takes no lock.
+        self.pending = []
+
+
+class MetricsRegistry:
+    # Histograms and counters keyed by (name, labels), labels being a tuple
+    # of (key, value) pairs. A timing is appended to its histogram's pending
+    # list and bucketed later by fold(); all formatting happens in render().
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+
+    def histogram(self, name, labels):
+        with self._lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = Histogram()
+            return histogram
+
+    def observe(self, name, labels, seconds):
+        histogram = self.histogram(name, labels)
+        histogram.pending.append(seconds)
+        if len(histogram.pending) >= FOLD_EVERY:
+            self.fold(histogram)
+
+    def fold(self, histogram):
+        with self._lock:
+            pending = histogram.pending
+            # Appends made meanwhile land after `count` and stay pending.
+            count = len(pending)
+            timings = pending[:count]
+            del pending[:count]
+            buckets = histogram.buckets
+            for seconds in timings:
+                buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            histogram.sum += sum(timings)
+            histogram.count += count
+
+    def inc(self, name, labels, amount=1):
+        with self._lock:
+            self.counters[(name, labels)] = self.counters.get((name, labels), 0) + amount
+
+    def reset(self):
+        with self._lock:
+            # In place: timed() wrappers hold on to their histogram's lists.
+            for histogram in self.histograms.values():
+                histogram.buckets[:] = [0] * len(histogram.buckets)
+                histogram.sum = 0.0
+                histogram.count = 0
+                del histogram.pending[:]
+            self.counters.clear()
+
+    def snapshot(self):
+        for histogram in list(self.histograms.values()):
+            self.fold(histogram)
+        with self._lock:
+            histograms = {key: (list(h.buckets), h.sum, h.count) for key, h in self.histograms.items()}
+            return histograms, dict(self.counters)
+
+    def render(self):
+        # Prometheus text exposition format.
+        histograms, counters = self.snapshot()
+        lines = []
+        names = sorted({name for name, _ in histograms} | {name for name, _ in counters})
+        for name in names:
+            kind, text = HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {PREFIX}{name} {text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, hits in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+                    cumulative += hits
+                    lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {total:.9f}")
+                lines.append(f"{PREFIX}{name}_count{_labels(labels)} {count}")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{PREFIX}{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+registry = MetricsRegistry()
+
+
+def timed(op):
+    # Decorator: latency histogram and error counter for one operation.
+    # With metrics disabled the function is returned untouched.
+    labels = (("op", op),)
+
+    def decorate(func):
+        if not METRICS_ENABLED:
+            return func
+        histogram = registry.histogram("operation_seconds", labels)
+        pending = histogram.pending
+        clock = time.perf_counter
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            except BaseException:
+                registry.inc("operation_errors_total", labels)
+                raise
+            finally:
+                pending.append(clock() - start)
+                if len(pending) >= FOLD_EVERY:
+                    registry.fold(histogram)
+        return wrapper
+    return decorate
+
+
+def bytes_read(store, amount):
+    if METRICS_ENABLED and amount:
+        registry.inc("storage_bytes_read_total", (("store", store),), amount)
+
+
+def bytes_written(store, amount):
+    if METRICS_ENABLED and amount:
+        registry.inc("storage_bytes_written_total", (("store", store),), amount)
+
+
+def render():
+    return registry.render()
+
+
+def write_metrics(path=None):
+    path = path or METRICS_FILE
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+    return path
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port=METRICS_PORT, host="127.0.0.1"):
+    # GET /metrics on a daemon thread; returns the server so callers can
+    # shut it down.
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_profiler = None
+# Before Python 3.12 cProfile only sees the thread that enabled it, so every
+# other thread (storage worker pool, checkpoints, metrics server) gets its
+# own profiler and their stats are merged into one file at the end. From
+# 3.12 cProfile runs on sys.monitoring, which covers every thread and allows
+# only one active profiler, so the caller's profiler is all there is.
+PER_THREAD_PROFILERS = not hasattr(sys, "monitoring")
+_thread_profilers = []
+_profile_lock = threading.Lock()
+
+
+def _profile_thread(frame, event, arg):
+    # Set with threading.setprofile, so this is the first profile event of
+    # each new thread: it replaces itself with a profiler for that thread.
+    sys.setprofile(None)
+    with _profile_lock:
+        if _profiler is None:
+            return
+        profiler = cProfile.Profile()
+        _thread_profilers.append(profiler)
+    profiler.enable()
+
+
+def start_profile(path=None):
+    # Profiles everything from now until exit (or stop_profile()), in this
+    # thread and every thread started afterwards; the stats file opens with
+    # `python -m pstats PATH` or snakeviz.
+    global _profiler
+    with _profile_lock:
+        if _profiler is not None:
+            return
+        _profiler = cProfile.Profile()
+    if PER_THREAD_PROFILERS:
+        threading.setprofile(_profile_thread)
+    _profiler.enable()
+    atexit.register(stop_profile, path or PROFILE_FILE or "bank.prof")
+
+
+def stop_profile(path="bank.prof"):
+    global _profiler
+    with _profile_lock:
+        if _profiler is None:
+            return None
+        profiler, threads = _profiler, list(_thread_profilers)
+        _profiler = None
+        _thread_profilers.clear()
+    if PER_THREAD_PROFILERS:
+        threading.setprofile(None)
+    profiler.disable()
+    # A worker still running keeps its hook until it next calls into
+    # Python; its counts so far are included.
+    stats = pstats.Stats(profiler)
+    for other in threads:
+        stats.add(other)
+    stats.dump_stats(path)
+    return path
+
+
+if METRICS_FILE:
+    atexit.register(write_metrics)
+if PROFILE_FILE:
+    start_profile(PROFILE_FILE)
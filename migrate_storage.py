@@ -0,0 +1,77 @@
+import os
+import sys
+from storage import JsonStorage, FILE, SQLITE_FILE
+from sqlite_storage import SqliteStorage
+from jsonl_storage import JsonLinesStorage
+from pin_security import is_pin_hash
+
+
+def open_target(path):
+    ext = os.path.splitext(path)[1]
+    if ext == ".jsonl":
+        return JsonLinesStorage(path)
+    if ext in (".json", ".snap"):
+        # data.json <-> data.snap converts between the text and binary snapshot.
+        return JsonStorage(path)
+    return SqliteStorage(path)
+
+
+def migrate_json(json_path=FILE, target_path=SQLITE_FILE):
+    source = JsonStorage(json_path)
+    accounts = source.load_all_accounts()
+
+    target = open_target(target_path)
+    if getattr(target, "journal_path", None) == source.journal_path:
+        # data.json and data.snap share data.journal: fold it into the source
+        # before the target's save truncates it.
+        source.checkpoint()
+    try:
+        target.save_all_accounts({acc.account_number: acc for acc in accounts})
+    finally:
+        target.close()
+    return len(accounts)
+
+
+def convert_history(path=FILE):
+    # Loading turns old formatted history strings into Transaction records;
+    # rewriting every account stores them in the compact form.
+    store = open_target(path)
+    try:
+        accounts = store.load_all_accounts()
+        store.save_all_accounts({acc.account_number: acc for acc in accounts})
+    finally:
+        store.close()
+    return len(accounts), sum(len(acc.history) for acc in accounts)
+
+
+def hash_pins(path=FILE):
+    # Replaces plaintext PINs with salted hashes; already-hashed ones are kept.
+    store = open_target(path)
+    try:
+        accounts = store.load_all_accounts()
+        hashed = 0
+        for acc in accounts:
+            if not is_pin_hash(acc.get_pin()):
+                acc.set_pin(acc.get_pin())
+                hashed += 1
+        if hashed:
+            store.save_all_accounts({acc.account_number: acc for acc in accounts})
+    finally:
+        store.close()
+    return hashed
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--hash-pins":
+        path = sys.argv[2] if len(sys.argv) > 2 else FILE
+        print(f"✅ Hashed {hash_pins(path)} plaintext PINs in {path}")
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == "--convert-history":
+        path = sys.argv[2] if len(sys.argv) > 2 else FILE
+        count, entries = convert_history(path)
+        print(f"✅ Converted {entries} history entries across {count} accounts in {path}")
+        sys.exit(0)
+    json_path = sys.argv[1] if len(sys.argv) > 1 else FILE
+    target_path = sys.argv[2] if len(sys.argv) > 2 else SQLITE_FILE
+    count = migrate_json(json_path, target_path)
+    print(f"✅ Migrated {count} accounts from {json_path} to {target_path}")
@@ -0,0 +1,213 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from account_allocator import allocator
+from account_index import account_index
+from bank_account import BankAccount
+from bank_service import ACCOUNT_TYPES
+from pin_security import hash_pin
+from storage import save_accounts
+from validation import (validate_name, validate_gender, validate_date, validate_address, validate_mobile,
+                        validate_email, validate_branch_code, validate_pin, validate_amount)
+
+# Same fields, in the same order, as BankService.create_account.
+FIELDS = ["holder", "gender", "DOB", "address", "mobile", "email", "account_type", "KYC", "branch_code", "pin", "balance"]
+# Rows per task sent to a worker. Each row costs one PIN hash, so this is
+# small enough to keep every worker busy until the end of the file.
+CHUNK_SIZE = 200
+# Chunks queued per worker while reading ahead.
+READ_AHEAD = 2
+YES_NO = {"Y": True, "YES": True, "N": False, "NO": False}
+
+
+def read_rows(path):
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        missing = [field for field in FIELDS if field not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        yield reader.fieldnames
+        for line_no, row in enumerate(reader, 2):
+            yield line_no, row
+
+
+def _chunks(rows, size):
+    chunk = []
+    for item in rows:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def check_row(row):
+    # Normalised account fields for one row, or the list of everything wrong
+    # with it. Runs in the worker processes.
+    value = {field: str(row.get(field) or "").strip() for field in FIELDS}
+    reasons = []
+
+    def check(result):
+        if not result[0]:
+            reasons.append(result[1])
+        return result
+
+    check(validate_name(value["holder"]))
+    value["gender"] = value["gender"].upper()
+    check(validate_gender(value["gender"]))
+    check(validate_date(value["DOB"]))
+    check(validate_address(value["address"]))
+    check(validate_mobile(value["mobile"]))
+    value["email"] = value["email"].lower()
+    check(validate_email(value["email"]))
+    account_type = {name.lower(): name for name in ACCOUNT_TYPES}.get(value["account_type"].lower())
+    if account_type is None:
+        reasons.append(f"Account type must be one of: {', '.join(ACCOUNT_TYPES)}")
+    value["account_type"] = account_type
+    kyc = YES_NO.get(value["KYC"].upper())
+    if kyc is None:
+        reasons.append("KYC must be Y or N.")
+    value["KYC"] = kyc
+    value["branch_code"] = value["branch_code"].upper()
+    check(validate_branch_code(value["branch_code"]))
+    check(validate_pin(value["pin"]))
+    value["balance"] = check(validate_amount(value["balance"]))[2]
+
+    if reasons:
+        return None, reasons
+    value["pin"] = hash_pin(value["pin"])
+    return value, []
+
+
+def check_chunk(chunk):
+    return [(line_no, *check_row(row)) for line_no, row in chunk]
+
+
+def _checked(chunks, workers):
+    # (chunk, results) in file order. Only workers * READ_AHEAD chunks are in
+    # flight, so the file is streamed rather than read up front.
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, check_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((chunk, pool.submit(check_chunk, chunk)))
+            if len(pending) >= workers * READ_AHEAD:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+class Onboarding:
+    def __init__(self, rejects_writer):
+        self.rejects_writer = rejects_writer
+        self.accounts = []
+        self.rejected = 0
+        # Mobile/email -> line of the accepted row that claimed it.
+        self.mobiles = {}
+        self.emails = {}
+
+    def reject(self, line_no, row, reasons):
+        self.rejects_writer.writerow({**row, "line": line_no, "reason": "; ".join(reasons)})
+        self.rejected += 1
+
+    def add(self, line_no, row, value):
+        # Uniqueness depends on every earlier row, so it is checked here
+        # rather than in the workers.
+        reasons = []
+        if value["mobile"] in self.mobiles:
+            reasons.append(f"Mobile number already used on line {self.mobiles[value['mobile']]}.")
+        elif account_index.mobile_taken(value["mobile"]):
+            reasons.append("Mobile number is already registered to another account.")
+        if value["email"] in self.emails:
+            reasons.append(f"Email address already used on line {self.emails[value['email']]}.")
+        elif account_index.email_taken(value["email"]):
+            reasons.append("Email address is already registered to another account.")
+        if reasons:
+            self.reject(line_no, row, reasons)
+            return
+        self.mobiles[value["mobile"]] = line_no
+        self.emails[value["email"]] = line_no
+        self.accounts.append(value)
+
+    def run(self, rows, workers=1, chunk_size=CHUNK_SIZE):
+        for chunk, results in _checked(_chunks(rows, chunk_size), workers):
+            for (line_no, row), (_, value, reasons) in zip(chunk, results):
+                if value is None:
+                    self.reject(line_no, row, reasons)
+                else:
+                    self.add(line_no, row, value)
+
+    def commit(self):
+        # Numbers are allocated only for accounts that are actually created.
+        opening_date = str(date.today())
+        accounts = [
+            BankAccount(account_number=allocator.allocate(), status="Active", opening_date=opening_date, **value)
+            for value in self.accounts
+        ]
+        # Create-only: a number that somehow already has an account fails
+        # the whole batch instead of overwriting that account.
+        save_accounts(accounts, allow_update=False)
+        return accounts
+
+
+def onboard(path, rejects_path=None, workers=None, chunk_size=CHUNK_SIZE, dry_run=False):
+    start = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    if rejects_path is None:
+        rejects_path = os.path.splitext(path)[0] + ".rejects.csv"
+
+    rows = read_rows(path)
+    fieldnames = next(rows)
+    # The source file already holds the PINs; the rejects file doesn't repeat them.
+    reject_fields = ["line"] + [field for field in fieldnames if field != "pin"] + ["reason"]
+    with open(rejects_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=reject_fields, extrasaction="ignore")
+        writer.writeheader()
+        onboarding = Onboarding(writer)
+        onboarding.run(rows, workers, chunk_size)
+
+    created = 0 if dry_run else len(onboarding.commit())
+    elapsed = time.perf_counter() - start
+    total = len(onboarding.accounts) + onboarding.rejected
+    return {
+        "total": total,
+        "accepted": len(onboarding.accounts),
+        "rejected": onboarding.rejected,
+        "created": created,
+        "workers": workers,
+        "seconds": elapsed,
+        "rows_per_sec": total / elapsed if elapsed else 0.0,
+        "rejects": rejects_path
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open accounts in bulk from a CSV of customers.")
+    parser.add_argument("csv", help=f"columns: {','.join(FIELDS)}")
+    parser.add_argument("--rejects", help="where to write rejected rows (default: CSV name + .rejects.csv)")
+    parser.add_argument("--workers", type=int, help="validation processes (default: one per core)")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="rows per worker task")
+    parser.add_argument("--dry-run", action="store_true", help="validate and write rejects, create nothing")
+    args = parser.parse_args()
+    try:
+        summary = onboard(args.csv, args.rejects, args.workers, args.chunk, args.dry_run)
+    except (OSError, ValueError) as e:
+        print(f"❌ Onboarding failed, no accounts were created: {e}")
+        sys.exit(1)
+    verb = "Validated" if args.dry_run else "Created"
+    count = summary["accepted"] if args.dry_run else summary["created"]
+    print(f"✅ {verb} {count} of {summary['total']} accounts ({summary['rejected']} rejected) "
+          f"in {summary['seconds']:.2f}s with {summary['workers']} worker(s) "
+          f"({summary['rows_per_sec']:,.0f} rows/s)")
+    print(f"   Rejects: {summary['rejects']}")
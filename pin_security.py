@@ -0,0 +1,176 @@
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# PBKDF2-SHA256 cost. A 4-digit PIN can't resist an offline search on its
+# own, so the hash mainly keeps PINs out of plain sight; online guessing is
+# stopped by the throttle below. Raise it as far as the login latency
+# budget allows; old hashes are upgraded on the next successful login.
+PIN_HASH_ITERATIONS = 60000
+PIN_SALT_BYTES = 16
+HASH_PREFIX = "pbkdf2_sha256"
+
+# Verified-PIN cache: repeat logins within SESSION_TTL seconds skip the hash.
+SESSION_TTL = 300
+SESSION_CACHE_SIZE = 10000
+
+# Sliding-window lockout: too many failures inside the window blocks further
+# attempts for that account / terminal until old failures age out.
+FAILURE_WINDOW = 15 * 60
+MAX_ACCOUNT_FAILURES = 5
+MAX_TERMINAL_FAILURES = 20
+MAX_TRACKED_KEYS = 100000
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def is_pin_hash(value):
+    return isinstance(value, str) and value.startswith(HASH_PREFIX + "$")
+
+
+def hash_pin(pin, iterations=None, salt=None):
+    iterations = iterations or PIN_HASH_ITERATIONS
+    salt = salt or os.urandom(PIN_SALT_BYTES)
+    digest = hashlib.pbkdf2_hmac("sha256", str(pin).encode("utf-8"), salt, iterations)
+    return f"{HASH_PREFIX}${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def check_pin(stored, pin):
+    pin = str(pin)
+    if not is_pin_hash(stored):
+        # Plaintext PIN from before hashing; upgraded on successful login.
+        return hmac.compare_digest(str(stored).encode("utf-8"), pin.encode("utf-8"))
+    try:
+        _, iterations, salt, digest = stored.split("$")
+        salt = base64.b64decode(salt)
+        digest = base64.b64decode(digest)
+        iterations = int(iterations)
+    except ValueError:
+        return False
+    candidate = hashlib.pbkdf2_hmac("sha256", pin.encode("utf-8"), salt, iterations)
+    return hmac.compare_digest(candidate, digest)
+
+
+def needs_rehash(stored, iterations=None):
+    if not is_pin_hash(stored):
+        return True
+    try:
+        return int(stored.split("$")[1]) != (iterations or PIN_HASH_ITERATIONS)
+    except (IndexError, ValueError):
+        return True
+
+
+class VerifiedPins:
+    # Remembers (account, stored hash, keyed digest of the PIN) for a short
+    # time after a successful check. The PIN itself is never kept: only an
+    # HMAC under a per-process random key, which costs microseconds.
+    def __init__(self, ttl=SESSION_TTL, max_entries=SESSION_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._key = os.urandom(32)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_key(self, acc_no, stored, pin):
+        tag = hmac.new(self._key, str(pin).encode("utf-8"), hashlib.sha256).digest()
+        return (acc_no, stored, tag)
+
+    def check(self, acc_no, stored, pin):
+        key = self._cache_key(acc_no, stored, pin)
+        now = time.monotonic()
+        with self._lock:
+            expires = self._entries.get(key)
+            if expires is not None and expires > now:
+                self.hits += 1
+                return True
+            if expires is not None:
+                del self._entries[key]
+            self.misses += 1
+        return False
+
+    def remember(self, acc_no, stored, pin):
+        key = self._cache_key(acc_no, stored, pin)
+        with self._lock:
+            self._entries[key] = time.monotonic() + self.ttl
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def forget(self, acc_no):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == acc_no]:
+                del self._entries[key]
+
+
+class LoginThrottle:
+    # Failure timestamps per key in a sliding window. check() is a dict
+    # lookup and a few deque pops, so locked-out traffic is turned away
+    # before any account is loaded or any hash computed.
+    def __init__(self, window=FAILURE_WINDOW, max_account=MAX_ACCOUNT_FAILURES,
+                 max_terminal=MAX_TERMINAL_FAILURES, max_keys=MAX_TRACKED_KEYS):
+        self.window = window
+        self.limits = {"account": max_account, "terminal": max_terminal}
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._failures = OrderedDict()
+        self.rejected = 0
+
+    def _recent(self, key, now):
+        failures = self._failures.get(key)
+        if failures is None:
+            return 0
+        while failures and failures[0] <= now - self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return 0
+        return len(failures)
+
+    def retry_after(self, key, now):
+        failures = self._failures.get(key)
+        return int(failures[0] + self.window - now) + 1 if failures else 0
+
+    def check(self, acc_no, terminal=None):
+        # Returns the number of seconds to wait, or 0 if the attempt may go on.
+        now = time.monotonic()
+        with self._lock:
+            for kind, value in (("account", acc_no), ("terminal", terminal)):
+                if value is None:
+                    continue
+                key = (kind, value)
+                if self._recent(key, now) >= self.limits[kind]:
+                    self.rejected += 1
+                    return self.retry_after(key, now)
+        return 0
+
+    def record_failure(self, acc_no, terminal=None):
+        now = time.monotonic()
+        with self._lock:
+            for kind, value in (("account", acc_no), ("terminal", terminal)):
+                if value is None:
+                    continue
+                key = (kind, value)
+                failures = self._failures.get(key)
+                if failures is None:
+                    failures = self._failures[key] = deque(maxlen=self.limits[kind])
+                failures.append(now)
+                self._failures.move_to_end(key)
+            # Bounded memory under a spray of random account numbers.
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def record_success(self, acc_no):
+        with self._lock:
+            self._failures.pop(("account", acc_no), None)
+
+
+verified_pins = VerifiedPins()
+login_throttle = LoginThrottle()
@@ -1,3 +1,4 @@
 from admin_storage import initialize_supreme_admin
 
-initialize_supreme_admin()
+if __name__ == "__main__":
+    initialize_supreme_admin()
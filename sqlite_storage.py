@@ -0,0 +1,361 @@
+import json
+import sqlite3
+import threading
+from bank_account import BankAccount
+from storage import StorageBackend, check_fields, account_row_type, check_version
+from transaction import Transaction, to_transactions, page_bounds
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    account_number TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    gender TEXT,
+    dob TEXT,
+    address TEXT,
+    mobile TEXT,
+    email TEXT,
+    account_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    kyc INTEGER NOT NULL,
+    branch_code TEXT,
+    opening_date TEXT,
+    pin TEXT NOT NULL,
+    balance REAL NOT NULL,
+    history_len INTEGER NOT NULL DEFAULT 0,
+    archived INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS transactions (
+    account_number TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    entry TEXT NOT NULL,
+    ts INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_number, seq)
+) WITHOUT ROWID;
+"""
+
+# Statements are kept as module constants so sqlite3's statement cache
+# reuses the prepared form on every call.
+SELECT_ACCOUNT = "SELECT * FROM accounts WHERE account_number = ?"
+SELECT_EXISTS = "SELECT 1 FROM accounts WHERE account_number = ?"
+SELECT_ALL_ACCOUNTS = "SELECT * FROM accounts ORDER BY account_number"
+SELECT_HISTORY = "SELECT entry FROM transactions WHERE account_number = ? ORDER BY seq"
+SELECT_ALL_HISTORY = "SELECT account_number, entry FROM transactions ORDER BY account_number, seq"
+SELECT_PAGE = "SELECT {columns} FROM accounts WHERE account_number > ? ORDER BY account_number LIMIT ?"
+# History pages are seeks on seq (0..history_len-1) rather than OFFSET
+# scans; a date range is turned into a seq range through the ts index. ts is
+# the entry time clamped to never go backwards (as extend_times does), so it
+# rises with seq and matches the in-memory query.
+SELECT_HISTORY_LEN = "SELECT history_len FROM accounts WHERE account_number = ?"
+SELECT_SEQ_FROM = "SELECT seq FROM transactions WHERE account_number = ? AND ts >= ? ORDER BY ts, seq LIMIT 1"
+SELECT_SEQ_AFTER = "SELECT seq FROM transactions WHERE account_number = ? AND ts > ? ORDER BY ts, seq LIMIT 1"
+SELECT_HISTORY_RANGE = """
+SELECT entry FROM transactions WHERE account_number = ? AND seq >= ? AND seq < ?
+ORDER BY seq {order}
+"""
+SELECT_STORED = "SELECT history_len, version FROM accounts WHERE account_number = ?"
+SELECT_LAST_TS = "SELECT ts FROM transactions WHERE account_number = ? AND seq = ?"
+INSERT_ACCOUNT = """
+INSERT INTO accounts (account_number, holder, gender, dob, address, mobile, email,
+                      account_type, status, kyc, branch_code, opening_date, pin, balance, history_len, archived, version)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPDATE_ACCOUNT = """
+UPDATE accounts SET holder = ?, gender = ?, dob = ?, address = ?, mobile = ?, email = ?,
+                    account_type = ?, status = ?, kyc = ?, branch_code = ?, opening_date = ?,
+                    pin = ?, balance = ?, history_len = ?, archived = ?, version = ?
+WHERE account_number = ?
+"""
+INSERT_TRANSACTION = "INSERT INTO transactions (account_number, seq, entry, ts) VALUES (?, ?, ?, ?)"
+CREATE_TS_INDEX = "CREATE INDEX IF NOT EXISTS transactions_ts ON transactions (account_number, ts)"
+DELETE_HISTORY = "DELETE FROM transactions WHERE account_number = ?"
+DELETE_ACCOUNT = "DELETE FROM accounts WHERE account_number = ?"
+# Bumped when stored rows need rewriting on open: 1 = ts is clamped.
+SCHEMA_VERSION = 1
+
+
+# BankAccount attribute -> accounts column
+COLUMNS = {
+    "account_number": "account_number", "holder": "holder", "gender": "gender",
+    "DOB": "dob", "address": "address", "mobile": "mobile", "email": "email",
+    "account_type": "account_type", "status": "status", "KYC": "kyc",
+    "branch_code": "branch_code", "opening_date": "opening_date", "balance": "balance"
+}
+PAGE_SIZE = 1000
+
+
+def _row_to_account(row, history):
+    return BankAccount(
+        account_number=row["account_number"],
+        holder=row["holder"],
+        gender=row["gender"],
+        DOB=row["dob"],
+        address=row["address"],
+        mobile=row["mobile"],
+        email=row["email"],
+        account_type=row["account_type"],
+        status=row["status"],
+        KYC=bool(row["kyc"]),
+        branch_code=row["branch_code"],
+        opening_date=row["opening_date"],
+        pin=row["pin"],
+        balance=row["balance"],
+        history=history,
+        version=row["version"],
+        archived=row["archived"]
+    )
+
+
+def _encode_entry(entry):
+    return json.dumps(entry.to_record(), separators=(",", ":"), ensure_ascii=False)
+
+
+def _decode_record(text):
+    # Rows written before typed records hold the old formatted string, which
+    # History parses like any other legacy entry.
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def _decode_entry(text):
+    return Transaction.from_record(_decode_record(text))
+
+
+def _clamped_times(entries, last=0):
+    for entry in entries:
+        if entry.time > last:
+            last = entry.time
+        yield last
+
+
+def _account_fields(acc):
+    return (
+        acc.holder, acc.gender, acc.DOB, acc.address, acc.mobile, acc.email,
+        acc.account_type, acc.status, int(bool(acc.KYC)), acc.branch_code,
+        acc.opening_date, acc.get_pin(), float(acc.balance), len(acc.history), acc.archived
+    )
+
+
+class SqliteStorage(StorageBackend):
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._writes = threading.local()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        columns = [r["name"] for r in self._conn.execute("PRAGMA table_info(accounts)")]
+        if "version" not in columns:
+            self._conn.execute("ALTER TABLE accounts ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        if "archived" not in columns:
+            self._conn.execute("ALTER TABLE accounts ADD COLUMN archived INTEGER NOT NULL DEFAULT 0")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._fill_ts()
+        self._conn.execute(CREATE_TS_INDEX)
+
+    def _fill_ts(self):
+        # Older files have no ts column, or raw entry times in it.
+        cur = self._conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [r["name"] for r in cur.execute("PRAGMA table_info(transactions)")]
+            if "ts" not in columns:
+                cur.execute("ALTER TABLE transactions ADD COLUMN ts INTEGER NOT NULL DEFAULT 0")
+            rows = cur.execute("SELECT account_number, seq, entry FROM transactions ORDER BY account_number, seq").fetchall()
+            updates = []
+            last = (None, 0)
+            for acc_no, seq, entry in rows:
+                ts = _decode_entry(entry).time
+                if acc_no == last[0] and ts < last[1]:
+                    ts = last[1]
+                updates.append((ts, acc_no, seq))
+                last = (acc_no, ts)
+            cur.executemany("UPDATE transactions SET ts = ? WHERE account_number = ? AND seq = ?", updates)
+            cur.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            cur.execute("COMMIT")
+        except BaseException:
+            cur.execute("ROLLBACK")
+            raise
+
+    def _write_account(self, cur, acc, stored_len, version):
+        acc_no = str(acc.account_number)
+        fields = _account_fields(acc) + (version,)
+        if stored_len is None:
+            cur.execute(INSERT_ACCOUNT, (acc_no,) + fields)
+            new_entries = acc.history
+            start = 0
+        else:
+            cur.execute(UPDATE_ACCOUNT, fields + (acc_no,))
+            # History is append-only in normal operation, so only the tail
+            # past what is already stored is inserted.
+            if len(acc.history) < stored_len:
+                cur.execute(DELETE_HISTORY, (acc_no,))
+                stored_len = 0
+            new_entries = acc.history[stored_len:]
+            start = stored_len
+        last = 0
+        if start and new_entries:
+            row = cur.execute(SELECT_LAST_TS, (acc_no, start - 1)).fetchone()
+            last = 0 if row is None else row[0]
+        cur.executemany(
+            INSERT_TRANSACTION,
+            ((acc_no, start + i, _encode_entry(entry), ts)
+             for i, (entry, ts) in enumerate(zip(new_entries, _clamped_times(new_entries, last))))
+        )
+
+    def save_account(self, account, allow_update=False):
+        self._save([account], allow_update)
+
+    def save_accounts(self, accounts, allow_update=True):
+        self._save(list(accounts), allow_update)
+
+    def _save(self, accounts, allow_update):
+        if not accounts:
+            return
+        with self._lock:
+            cur = self._conn.cursor()
+            # BEGIN IMMEDIATE takes the database write lock, so the version
+            # check and the write below are one atomic compare-and-swap.
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                # Read inside the write transaction, after any earlier commit.
+                before = self.version()
+                for account in accounts:
+                    acc_no = str(account.account_number)
+                    row = cur.execute(SELECT_STORED, (acc_no,)).fetchone()
+                    check_version(acc_no, None if row is None else row[1], account, allow_update)
+                    self._write_account(cur, account, None if row is None else row[0], account.version + 1)
+                cur.execute("COMMIT")
+                self._writes.versions = (before, self.version())
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            for account in accounts:
+                account.version += 1
+
+    def save_all_accounts(self, accounts_dict):
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                # Read inside the write transaction, after any earlier commit.
+                before = self.version()
+                cur.execute("DELETE FROM transactions")
+                cur.execute("DELETE FROM accounts")
+                for acc in accounts_dict.values():
+                    self._write_account(cur, acc, None, acc.version)
+                cur.execute("COMMIT")
+                self._writes.versions = (before, self.version())
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+
+    def delete_account(self, acc_no):
+        acc_no = str(acc_no)
+        with self._lock:
+            cur = self._conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                # Read inside the write transaction, after any earlier commit.
+                before = self.version()
+                cur.execute(DELETE_HISTORY, (acc_no,))
+                deleted = cur.execute(DELETE_ACCOUNT, (acc_no,)).rowcount
+                cur.execute("COMMIT")
+                self._writes.versions = (before, self.version())
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            return deleted > 0
+
+    def load_account(self, acc_no):
+        acc_no = str(acc_no)
+        with self._lock:
+            row = self._conn.execute(SELECT_ACCOUNT, (acc_no,)).fetchone()
+            if row is None:
+                return None
+            history = [_decode_record(r[0]) for r in self._conn.execute(SELECT_HISTORY, (acc_no,))]
+            return _row_to_account(row, history)
+
+    def load_history(self, acc_no, start=None, end=None, offset=0, limit=None, newest_first=True):
+        # Entries are appended in time order, so the date range is one run of
+        # seq numbers; each bound is a single index seek.
+        acc_no = str(acc_no)
+        query = SELECT_HISTORY_RANGE.format(order="DESC" if newest_first else "ASC")
+        with self._lock:
+            cur = self._conn.cursor()
+            # One read transaction, so the bounds and the page agree.
+            cur.execute("BEGIN")
+            try:
+                row = cur.execute(SELECT_HISTORY_LEN, (acc_no,)).fetchone()
+                if row is None:
+                    return None
+                lo, hi = 0, row[0]
+                if start is not None:
+                    row = cur.execute(SELECT_SEQ_FROM, (acc_no, int(start))).fetchone()
+                    lo = hi if row is None else row[0]
+                if end is not None:
+                    row = cur.execute(SELECT_SEQ_AFTER, (acc_no, int(end))).fetchone()
+                    hi = hi if row is None else row[0]
+                begin, stop = page_bounds(lo, hi, offset, limit, newest_first)
+                return [_decode_entry(r[0]) for r in cur.execute(query, (acc_no, begin, stop))]
+            finally:
+                cur.execute("COMMIT")
+
+    def account_exists(self, acc_no):
+        with self._lock:
+            return self._conn.execute(SELECT_EXISTS, (str(acc_no),)).fetchone() is not None
+
+    def version(self):
+        # data_version only moves when another connection commits, which is
+        # exactly the "someone else changed it" signal the cache needs.
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def load_all_accounts(self):
+        with self._lock:
+            histories = {}
+            for acc_no, entry in self._conn.execute(SELECT_ALL_HISTORY):
+                histories.setdefault(acc_no, []).append(_decode_record(entry))
+            return [
+                _row_to_account(row, histories.get(row["account_number"], []))
+                for row in self._conn.execute(SELECT_ALL_ACCOUNTS)
+            ]
+
+    def iter_accounts(self, fields=None):
+        fields = check_fields(fields)
+        row_type = account_row_type(fields)
+        columns = [COLUMNS[f] for f in fields if f != "history"]
+        if "account_number" not in columns:
+            columns.insert(0, "account_number")
+        query = SELECT_PAGE.format(columns=", ".join(columns))
+
+        # Keyset pagination so no cursor stays open between yields.
+        last = ""
+        while True:
+            with self._lock:
+                page = self._conn.execute(query, (last, PAGE_SIZE)).fetchall()
+            if not page:
+                return
+            for row in page:
+                acc_no = row["account_number"]
+                values = []
+                for f in fields:
+                    if f == "history":
+                        with self._lock:
+                            values.append(to_transactions([_decode_record(r[0]) for r in self._conn.execute(SELECT_HISTORY, (acc_no,))]))
+                    elif f == "KYC":
+                        values.append(bool(row["kyc"]))
+                    else:
+                        values.append(row[COLUMNS[f]])
+                yield row_type._make(values)
+            last = page[-1]["account_number"]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,100 +1,788 @@
 import json
 import os
+import random
+import threading
+import time
+from collections import namedtuple
+from functools import lru_cache
+from account_locks import account_locks
+from binary_snapshot import SnapshotRecords, is_binary_snapshot, read_snapshot, write_snapshot
 from bank_account import BankAccount
+from file_lock import FileLock
+from group_commit import GroupCommit
+from journal_lines import read_line, drop_torn_tail
+from metrics import timed, bytes_read, bytes_written
+from transaction import to_records, to_transactions, query_records
 
 FILE = "data.json"
+SNAPSHOT_FILE = "data.snap"
+JOURNAL_FILE = "data.journal"
+JSONL_FILE = "data.jsonl"
+SQLITE_FILE = "bank.db"
 
+# Journal mode appends one compact record per mutation instead of rewriting
+# FILE, and folds the journal back into FILE every CHECKPOINT_EVERY records.
+JOURNAL_MODE = True
+CHECKPOINT_EVERY = 500
 
-def save_all_accounts_to_file(accounts_dict):
-    with open(FILE, "w") as f:
-        json.dump(
-            {
-            str(acc_no): {
-                "holder": acc.holder,
-                "gender": acc.gender,
-                "DOB": acc.DOB,
-                "address": acc.address,
-                "mobile": acc.mobile,
-                "email": acc.email,
-                "account_type": acc.account_type,
-                "Status": acc.status,
-                "KYC": acc.KYC,
-                "branch_code": acc.branch_code,
-                "opening_date": acc.opening_date,
-                "pin": acc.get_pin(),
-                "balance": float(acc.balance),
-                "history": acc.history
-            }
-            for acc_no, acc in accounts_dict.items()
-            }, f, indent=4
-        )
+# When journal appends reach the disk: "sync" (each save waits for an fsync,
+# shared by all saves that arrive while one is in progress), "interval"
+# (background fsync every DURABILITY_INTERVAL_MS; saves don't wait) or "os".
+# A sync-mode leader can also wait up to GROUP_COMMIT_WINDOW_MS, or until
+# GROUP_COMMIT_MAX saves are pending, to batch more saves per fsync.
+DURABILITY = os.environ.get("BANK_DURABILITY", "sync")
+GROUP_COMMIT_WINDOW_MS = 0
+GROUP_COMMIT_MAX = 64
+DURABILITY_INTERVAL_MS = 100
 
-def save_account(account, allow_update=False):
-    accounts = load_all_accounts()
-    accounts_dict = {acc.account_number: acc for acc in accounts}
-    
-    if not allow_update and account.account_number in accounts_dict:
+# "json" (data.json + journal), "binary" (data.snap + journal), "jsonl"
+# (data.jsonl + offset index) or "sqlite" (bank.db)
+BACKEND = os.environ.get("BANK_STORAGE", "json")
+
+# In-process LRU cache of BankAccount objects in front of the backend.
+CACHE_ENABLED = True
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_WRITE_BACK = False
+
+
+def account_to_dict(acc):
+    return {
+        "holder": acc.holder,
+        "gender": acc.gender,
+        "DOB": acc.DOB,
+        "address": acc.address,
+        "mobile": acc.mobile,
+        "email": acc.email,
+        "account_type": acc.account_type,
+        "status": acc.status,
+        "KYC": acc.KYC,
+        "branch_code": acc.branch_code,
+        "opening_date": acc.opening_date,
+        "pin": acc.get_pin(),
+        "balance": float(acc.balance),
+        "history": to_records(acc.history),
+        "version": acc.version,
+        "archived": acc.archived
+    }
+
+
+def account_from_dict(acc_no, acc_data):
+    account = BankAccount(
+        account_number=acc_no,
+        holder=acc_data["holder"],
+        gender=acc_data["gender"],
+        DOB=acc_data["DOB"],
+        address=acc_data["address"],
+        mobile=acc_data["mobile"],
+        email=acc_data["email"],
+        account_type=acc_data["account_type"],
+        status=acc_data.get("status", acc_data.get("Status", "Active")),
+        KYC=acc_data["KYC"],
+        branch_code=acc_data["branch_code"],
+        opening_date=acc_data["opening_date"],
+        pin=acc_data["pin"],
+        balance=float(acc_data["balance"]),
+        history=acc_data.get("history"),
+        archived=acc_data.get("archived", 0)
+    )
+    account.version = acc_data.get("version", 0)
+    return account
+
+
+class VersionConflict(ValueError):
+    pass
+
+
+def check_version(acc_no, stored_version, account, allow_update):
+    # Compare-and-swap guard: a save only succeeds if the stored record is
+    # still the version the account was loaded at.
+    if stored_version is None:
+        if account.version:
+            raise VersionConflict(f"Account {acc_no} was removed by another session.")
+    elif not allow_update:
         raise ValueError("Account number already exists!")
+    elif stored_version != account.version:
+        raise VersionConflict(f"Account {acc_no} was changed by another session. Please retry.")
 
-    accounts_dict[account.account_number] = account
-    save_all_accounts_to_file(accounts_dict)
 
-def load_account(acc_no):
-    if not os.path.exists(FILE):
+def versioned_record(account):
+    record = account_to_dict(account)
+    record["version"] = account.version + 1
+    return record
+
+
+ACCOUNT_FIELDS = (
+    "account_number", "holder", "gender", "DOB", "address", "mobile", "email",
+    "account_type", "status", "KYC", "branch_code", "opening_date", "balance", "history"
+)
+SUMMARY_FIELDS = ACCOUNT_FIELDS[:-1]
+
+
+@lru_cache(maxsize=None)
+def account_row_type(fields):
+    return namedtuple("AccountRow", fields)
+
+
+def check_fields(fields):
+    fields = SUMMARY_FIELDS if fields is None else tuple(fields)
+    unknown = [f for f in fields if f not in ACCOUNT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown account field(s): {', '.join(unknown)}")
+    return fields
+
+
+def project_record(acc_no, acc_data, fields):
+    values = []
+    for field in fields:
+        if field == "account_number":
+            values.append(acc_no)
+        elif field == "status":
+            values.append(acc_data.get("status", acc_data.get("Status", "Active")))
+        elif field == "balance":
+            values.append(float(acc_data["balance"]))
+        elif field == "history":
+            values.append(to_transactions(acc_data.get("history")))
+        else:
+            values.append(acc_data[field])
+    return account_row_type(fields)._make(values)
+
+
+class StorageBackend:
+    def load_account(self, acc_no):
+        raise NotImplementedError
+
+    def save_account(self, account, allow_update=False):
+        raise NotImplementedError
+
+    def load_all_accounts(self):
+        raise NotImplementedError
+
+    def delete_account(self, acc_no):
+        raise NotImplementedError
+
+    def save_all_accounts(self, accounts_dict):
+        raise NotImplementedError
+
+    def save_accounts(self, accounts, allow_update=True):
+        # Upsert several existing accounts (or, with allow_update=False,
+        # create new ones); backends override this to make it a single write.
+        for account in accounts:
+            self.save_account(account, allow_update=allow_update)
+
+    def account_exists(self, acc_no):
+        return self.load_account(acc_no) is not None
+
+    def load_history(self, acc_no, start=None, end=None, offset=0, limit=None, newest_first=True):
+        # One page of an account's history, or None if the account doesn't exist.
+        account = self.load_account(acc_no)
+        if account is None:
+            return None
+        return account.get_history_page(start, end, offset, limit, newest_first)
+
+    def iter_accounts(self, fields=None):
+        fields = check_fields(fields)
+        row_type = account_row_type(fields)
+        for acc in self.load_all_accounts():
+            yield row_type._make(getattr(acc, f) for f in fields)
+
+    def version(self):
+        # Token that changes whenever the stored data may have been modified
+        # by someone else; None means "unknown, never invalidate".
         return None
 
-    with open(FILE, "r") as file:
-        data = json.load(file)
+    def last_write(self):
+        # (version before, version after) of the calling thread's latest
+        # write, both read under the backend's write lock. A view that was in
+        # step with `before` is in step with `after` once it has applied that
+        # write; holding any other version means a write it never saw landed
+        # in between. Backends that track this set self._writes.versions.
+        writes = getattr(self, "_writes", None)
+        if writes is None:
+            return None, self.version()
+        return getattr(writes, "versions", (None, None))
 
-    acc_no = str(acc_no)
-    if acc_no not in data:
+    def wait_durable(self):
+        # Blocks until this thread's saves are on disk. Storage calls it after
+        # releasing its locks, so concurrent saves can share one fsync.
+        pass
+
+    def close(self):
+        pass
+
+
+def _file_sig(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
         return None
+    return (st.st_mtime_ns, st.st_size)
 
-    acc = data[acc_no]
-    return BankAccount(
-        int(acc_no),
-        acc["holder"],
-        acc["gender"],
-        acc["DOB"],
-        acc["address"],
-        acc["mobile"],
-        acc["email"],
-        acc["account_type"],
-        acc["status"],
-        acc["KYC"],
-        acc["branch_code"],
-        acc["opening_date"],
-        acc["pin"],
-        acc["balance"],
-        acc["history"]
-    )
 
-def load_all_accounts():
-    if not os.path.exists(FILE):
-        return []
-
-    with open(FILE, "r") as file:
-        data = json.load(file)
-
-    accounts = []
-    for acc_no, acc_data in data.items():
-            account = BankAccount(
-                account_number=acc_no,
-                holder=acc_data["holder"],
-                gender=acc_data["gender"],
-                DOB=acc_data["DOB"],
-                address=acc_data["address"],
-                mobile=acc_data["mobile"],
-                email=acc_data["email"],
-                account_type=acc_data["account_type"],
-                status=acc_data.get("status", "Active"),
-                KYC=acc_data["KYC"],
-                branch_code=acc_data["branch_code"],
-                opening_date=acc_data["opening_date"],
-                pin=acc_data["pin"],
-                balance=float(acc_data["balance"])
-            )
-            account.set_pin(acc_data["pin"])
-            account.history = acc_data.get("history", [])
+class JsonStorage(StorageBackend):
+    def __init__(self, path=None, journal_path=None, journal_mode=None, durability=None, checkpoint_every=None, binary=None):
+        self.path = path or FILE
+        if journal_path is None:
+            journal_path = JOURNAL_FILE if path is None else os.path.splitext(path)[0] + ".journal"
+        self.journal_path = journal_path
+        # Snapshot format written at checkpoints; either format is read.
+        self.binary = os.path.splitext(self.path)[1] == ".snap" if binary is None else binary
+        self.journal_mode = JOURNAL_MODE if journal_mode is None else journal_mode
+        self.checkpoint_every = checkpoint_every or CHECKPOINT_EVERY
+        self._commit = GroupCommit(
+            self._sync_journal, durability or DURABILITY, window=GROUP_COMMIT_WINDOW_MS / 1000,
+            max_batch=GROUP_COMMIT_MAX, interval=DURABILITY_INTERVAL_MS / 1000
+        )
+        self._journal_fd = None
+        # Guards _journal_fd itself: the group-commit leader syncs without
+        # holding self._lock.
+        self._fd_lock = threading.Lock()
+        self._tickets = threading.local()
+        self._writes = threading.local()
+
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.splitext(self.path)[0] + ".lock")
+        self._records = None
+        self._snapshot_sig = None
+        self._journal_offset = 0
+        self._journal_ino = None
+        self._journal_entries = 0
+        self._checkpoint_thread = None
+        self._checkpoint_lock = threading.Lock()
+        self.skipped_records = 0
+
+    def _write_snapshot(self, records):
+        tmp = self.path + ".tmp"
+        self._write_snapshot_file(tmp, records)
+        os.replace(tmp, self.path)
+
+    def _write_snapshot_file(self, tmp, records):
+        if self.binary:
+            with open(tmp, "wb") as f:
+                write_snapshot(f, records)
+                f.flush()
+                os.fsync(f.fileno())
+            bytes_written("json", os.path.getsize(tmp))
+            return
+        with open(tmp, "w", encoding="utf-8") as f:
+            # One compact account per line: still valid JSON and easy to
+            # diff, without indenting every history record over many lines.
+            # Written record by record, so a streamed source is never held
+            # in memory as a whole.
+            f.write("{")
+            separator = "\n"
+            for acc_no, record in records.items():
+                f.write(f"{separator}{json.dumps(acc_no)}: {json.dumps(record, separators=(',', ':'), ensure_ascii=False)}")
+                separator = ",\n"
+            f.write("\n}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        bytes_written("json", os.path.getsize(tmp))
+
+    def _apply_journal_entry(self, entry):
+        if entry["op"] == "put":
+            self._records[entry["acc"]] = entry["data"]
+        elif entry["op"] == "batch":
+            # Several accounts saved together (e.g. both sides of a transfer)
+            # are one line, so a torn write loses all of them or none.
+            for put in entry["puts"]:
+                self._records[put["acc"]] = put["data"]
+        elif entry["op"] == "del":
+            self._records.pop(entry["acc"], None)
+
+    def _catch_up_journal(self):
+        try:
+            st = os.stat(self.journal_path)
+            size, ino = st.st_size, st.st_ino
+        except FileNotFoundError:
+            size, ino = 0, None
+        if ino != self._journal_ino:
+            if self._journal_offset:
+                # Swapped for a shorter one by a checkpoint: our offset
+                # means nothing in the new file.
+                return False
+            self._journal_ino = ino
+        if size < self._journal_offset:
+            return False
+        if size == self._journal_offset:
+            return True
+
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._journal_offset)
+            chunk = f.read(size - self._journal_offset)
+
+        # A record is only complete once its newline is on disk. A torn tail
+        # is either being written right now or left by a crashed writer; the
+        # next append cuts the latter off before writing (drop_torn_tail).
+        end = chunk.rfind(b"\n") + 1
+        bytes_read("json", end)
+        for line in chunk[:end].splitlines():
+            if line.strip():
+                try:
+                    entry = read_line(line)[1]
+                except ValueError:
+                    # Not a torn write (that always ends in a whole record).
+                    self.skipped_records += 1
+                    continue
+                self._apply_journal_entry(entry)
+                self._journal_entries += 1
+        self._journal_offset += end
+        return True
+
+    def _reload(self):
+        self._snapshot_sig = _file_sig(self.path)
+        if self._snapshot_sig is not None:
+            bytes_read("json", self._snapshot_sig[1])
+        if self._snapshot_sig is None:
+            self._records = {}
+        elif is_binary_snapshot(self.path):
+            with open(self.path, "rb") as f:
+                self._records = read_snapshot(f)
+        else:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._records = json.load(f)
+        self._journal_offset = 0
+        self._journal_ino = None
+        self._journal_entries = 0
+        if self.journal_mode:
+            self._catch_up_journal()
+
+    def _state(self):
+        with self._lock:
+            if self._records is None or _file_sig(self.path) != self._snapshot_sig:
+                self._reload()
+            elif self.journal_mode and not self._catch_up_journal():
+                self._reload()
+            return self._records
+
+    def _journal(self):
+        if self._journal_fd is not None:
+            try:
+                if os.stat(self.journal_path).st_ino == os.fstat(self._journal_fd).st_ino:
+                    return self._journal_fd
+            except FileNotFoundError:
+                pass
+        # First use, or the journal was removed or replaced underneath us.
+        fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        with self._fd_lock:
+            old, self._journal_fd = self._journal_fd, fd
+        if old is not None:
+            os.close(old)
+        return fd
+
+    def _sync_journal(self):
+        # fsync a duplicate, so the descriptor can't be closed (and its
+        # number reused for another file) by _journal() or close() mid-sync.
+        with self._fd_lock:
+            if self._journal_fd is None:
+                return
+            fd = os.dup(self._journal_fd)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _append_journal(self, *entries):
+        # Written but not yet synced; the caller waits on the returned ticket
+        # once it has let go of the locks, so other saves can share the fsync.
+        # Callers hold the file lock and have just called _state().
+        drop_torn_tail(self.journal_path, self._journal_offset)
+        lines = "".join(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n" for entry in entries)
+        data = lines.encode("utf-8")
+        os.write(self._journal(), data)
+        bytes_written("json", len(data))
+        ticket = self._commit.written()
+        self._catch_up_journal()
+        self._maybe_checkpoint()
+        return ticket
+
+    def _maybe_checkpoint(self):
+        if self._journal_entries < self.checkpoint_every:
+            return
+        if self._checkpoint_thread is not None and self._checkpoint_thread.is_alive():
+            return
+        self._checkpoint_thread = threading.Thread(target=self.checkpoint, daemon=True)
+        self._checkpoint_thread.start()
+
+    def _truncate_journal(self):
+        if os.path.exists(self.journal_path):
+            os.truncate(self.journal_path, 0)
+
+    def _cut_journal(self, offset):
+        # Drop the first `offset` bytes (now in the snapshot). The rest goes
+        # into a new file swapped in whole, so a crash leaves either journal,
+        # and replaying the old one over the new snapshot only rewrites
+        # records with the values they already have. Callers hold the file
+        # lock, so a partial last line is a crashed writer's and is dropped.
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(offset)
+                rest = f.read()
+        except FileNotFoundError:
+            return
+        rest = rest[:rest.rfind(b"\n") + 1]
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(rest)
+            f.flush()
+            os.fsync(f.fileno())
+        bytes_written("json", len(rest))
+        os.replace(tmp, self.journal_path)
+        applied = rest[:max(self._journal_offset - offset, 0)]
+        self._journal_offset = len(applied)
+        self._journal_ino = os.stat(self.journal_path).st_ino
+        self._journal_entries = applied.count(b"\n")
+
+    def _copy_state(self):
+        records = self._state()
+        # Stored records are replaced, never changed in place, so a shallow
+        # copy is a consistent view.
+        return records.copy() if isinstance(records, SnapshotRecords) else dict(records)
+
+    def checkpoint(self):
+        # The locks are held only to copy the state and, at the end, to swap
+        # the snapshot in and cut the journal; serialising and fsyncing the
+        # snapshot happens while reads and saves carry on.
+        with self._checkpoint_lock:
+            with self._lock, self._file_lock:
+                records = self._copy_state()
+                covered = self._journal_offset
+                base_sig = self._snapshot_sig
+            tmp = f"{self.path}.{os.getpid()}.checkpoint"
+            try:
+                self._write_snapshot_file(tmp, records)
+                del records
+                with self._lock, self._file_lock:
+                    self._state()
+                    if self._snapshot_sig != base_sig:
+                        # Replaced meanwhile (another process checkpointed or
+                        # everything was rewritten): this copy is stale.
+                        return
+                    before = self.version()
+                    os.replace(tmp, self.path)
+                    self._snapshot_sig = _file_sig(self.path)
+                    if self.journal_mode:
+                        self._cut_journal(covered)
+                    self._writes.versions = (before, self.version())
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+        if _unwrap(get_backend()) is self:
+            # Same accounts, new version token: let derived views re-stamp
+            # instead of treating it as a foreign change and re-scanning.
+            _notify()
+
+    def save_all_accounts(self, accounts_dict):
+        with self._lock, self._file_lock:
+            before = self.version()
+            self._write_snapshot({
+                str(acc_no): account_to_dict(acc)
+                for acc_no, acc in accounts_dict.items()
+            })
+            self._truncate_journal()
+            self._reload()
+            self._writes.versions = (before, self.version())
+
+    def _stored_version(self, records, acc_no):
+        record = records.get(acc_no)
+        return None if record is None else record.get("version", 0)
+
+    def save_account(self, account, allow_update=False):
+        self._save([account], allow_update)
+
+    def save_accounts(self, accounts, allow_update=True):
+        self._save(list(accounts), allow_update)
+
+    def _save(self, accounts, allow_update):
+        if not accounts:
+            return
+        ticket = None
+        with self._lock, self._file_lock:
+            before = self.version()
+            records = self._state()
+            for acc in accounts:
+                acc_no = str(acc.account_number)
+                check_version(acc_no, self._stored_version(records, acc_no), acc, allow_update)
+            puts = [(str(acc.account_number), versioned_record(acc)) for acc in accounts]
+            if self.journal_mode:
+                if len(puts) == 1:
+                    entry = {"op": "put", "acc": puts[0][0], "data": puts[0][1]}
+                else:
+                    entry = {"op": "batch", "puts": [{"acc": acc_no, "data": record} for acc_no, record in puts]}
+                ticket = self._append_journal(entry)
+            else:
+                records.update(puts)
+                self._write_snapshot(records)
+                self._reload()
+            for acc in accounts:
+                acc.version += 1
+            self._writes.versions = (before, self.version())
+        if ticket is not None:
+            self._tickets.last = ticket
+
+    def delete_account(self, acc_no):
+        acc_no = str(acc_no)
+        ticket = None
+        with self._lock, self._file_lock:
+            before = self.version()
+            records = self._state()
+            if acc_no not in records:
+                return False
+            if self.journal_mode:
+                ticket = self._append_journal({"op": "del", "acc": acc_no})
+            else:
+                del records[acc_no]
+                self._write_snapshot(records)
+                self._reload()
+            self._writes.versions = (before, self.version())
+        if ticket is not None:
+            self._tickets.last = ticket
+        return True
+
+    def account_exists(self, acc_no):
+        with self._lock:
+            return str(acc_no) in self._state()
+
+    def wait_durable(self):
+        ticket = getattr(self._tickets, "last", None)
+        if ticket is not None:
+            self._tickets.last = None
+            self._commit.wait(ticket)
+
+    def close(self):
+        with self._lock:
+            # Waits for an fsync already in flight, then syncs the rest.
+            self._commit.close()
+            with self._fd_lock:
+                fd, self._journal_fd = self._journal_fd, None
+            if fd is not None:
+                os.close(fd)
+
+    def version(self):
+        journal_sig = _file_sig(self.journal_path) if self.journal_mode else None
+        return (_file_sig(self.path), journal_sig and journal_sig[1])
+
+    def load_account(self, acc_no):
+        acc_no = str(acc_no)
+        with self._lock:
+            acc = self._state().get(acc_no)
+            if acc is None:
+                return None
+            return account_from_dict(acc_no, acc)
+
+    def load_history(self, acc_no, start=None, end=None, offset=0, limit=None, newest_first=True):
+        # From the stored record, without building the account or its
+        # history columns just to return one page.
+        with self._lock:
+            acc = self._state().get(str(acc_no))
+            if acc is None:
+                return None
+            return query_records(acc.get("history") or [], start, end, offset, limit, newest_first)
+
+    def load_all_accounts(self):
+        with self._lock:
+            return [account_from_dict(acc_no, acc_data) for acc_no, acc_data in self._state().items()]
+
+    def iter_accounts(self, fields=None):
+        fields = check_fields(fields)
+        with self._lock:
+            records = self._copy_state()
+        # Decoded one at a time as the scan reaches them (binary snapshots
+        # don't keep what they decode).
+        for acc_no, acc_data in records.items():
+            yield project_record(acc_no, acc_data, fields)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name=None, cached=None):
+    name = name or BACKEND
+    if name == "json":
+        backend = JsonStorage()
+    elif name == "binary":
+        backend = JsonStorage(SNAPSHOT_FILE, JOURNAL_FILE)
+    elif name == "sqlite":
+        from sqlite_storage import SqliteStorage
+        backend = SqliteStorage(SQLITE_FILE)
+    elif name == "jsonl":
+        from jsonl_storage import JsonLinesStorage
+        backend = JsonLinesStorage(JSONL_FILE)
+    else:
+        raise ValueError(f"Unknown storage backend: {name}")
+
+    if CACHE_ENABLED if cached is None else cached:
+        from account_cache import CachedStorage
+        backend = CachedStorage(backend, max_bytes=CACHE_MAX_BYTES, write_back=CACHE_WRITE_BACK)
+    return backend
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+    return _backend
+
+
+def set_backend(backend):
+    global _backend
+    with _backend_lock:
+        if _backend is not None and _backend is not backend:
+            _backend.close()
+        _backend = backend
+    _notify(reset=True)
+
+
+def _unwrap(backend):
+    return getattr(backend, "backend", backend)
+
+
+@timed("storage_checkpoint")
+def checkpoint():
+    backend = _unwrap(get_backend())
+    if isinstance(backend, JsonStorage):
+        backend.checkpoint()
+
+
+def flush():
+    backend = get_backend()
+    if hasattr(backend, "flush"):
+        backend.flush()
+
+
+def cache_stats():
+    backend = get_backend()
+    if hasattr(backend, "stats"):
+        return backend.stats()
+    return None
+
+
+class AccountNumbers:
+    # Set-like view over stored account numbers for membership checks
+    # (e.g. validate_account_number(existing=account_numbers)).
+    def __contains__(self, acc_no):
+        return account_exists(acc_no)
+
+
+account_numbers = AccountNumbers()
+
+
+def account_exists(acc_no):
+    return get_backend().account_exists(acc_no)
+
+
+# Callbacks run after every successful write through this module as
+# listener(saved_accounts, removed_account_numbers, reset), so derived views
+# can update incrementally instead of re-scanning the store.
+_listeners = []
+
+
+def add_save_listener(listener):
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_save_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def _notify(saved=(), removed=(), reset=False):
+    for listener in list(_listeners):
+        listener(saved, removed, reset)
+
+
+@timed("storage_save_all")
+def save_all_accounts_to_file(accounts_dict):
+    get_backend().save_all_accounts(accounts_dict)
+    _notify(reset=True)
+
+
+@timed("storage_save_account")
+def save_account(account, allow_update=False):
+    backend = get_backend()
+    backend.save_account(account, allow_update)
+    backend.wait_durable()
+    _notify(saved=(account,))
+
+
+@timed("storage_save_accounts")
+def save_accounts(accounts, allow_update=True):
+    # All or nothing. With allow_update=False every account must be new.
+    accounts = list(accounts)
+    backend = get_backend()
+    backend.save_accounts(accounts, allow_update)
+    backend.wait_durable()
+    _notify(saved=accounts)
+
+
+MAX_RETRIES = 5
+# Before retry n (from 0) wait a random time up to RETRY_DELAY * 2**n seconds,
+# capped at RETRY_MAX_DELAY, so sessions that collided don't collide again.
+RETRY_DELAY = 0.005
+RETRY_MAX_DELAY = 0.2
+
+
+@timed("storage_update_accounts")
+def update_accounts(acc_nos, action, retries=MAX_RETRIES):
+    # Load the accounts, apply `action` to them and save them together,
+    # starting over from freshly loaded copies if another session got there
+    # first. Threads in this process are serialised per account.
+    with account_locks.locked(acc_nos):
+        return _update_locked(acc_nos, action, retries)
+
+
+def _update_locked(acc_nos, action, retries):
+    for attempt in range(retries):
+        accounts = []
+        for acc_no in acc_nos:
+            account = load_account(acc_no)
+            if account is None:
+                raise ValueError(f"Account {acc_no} does not exist.")
             accounts.append(account)
-    return accounts
+        action(*accounts)
+        try:
+            if len(accounts) == 1:
+                save_account(accounts[0], allow_update=True)
+            else:
+                save_accounts(accounts)
+            return accounts
+        except VersionConflict:
+            if attempt == retries - 1:
+                raise
+            time.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_DELAY * 2 ** attempt)))
+
+
+def update_account(acc_no, action, retries=MAX_RETRIES):
+    return update_accounts([acc_no], action, retries)[0]
+
+
+@timed("storage_remove_account")
+def remove_account(acc_no):
+    backend = get_backend()
+    deleted = backend.delete_account(acc_no)
+    backend.wait_durable()
+    if deleted:
+        _notify(removed=(str(acc_no),))
+    return deleted
+
+
+@timed("storage_load_account")
+def load_account(acc_no):
+    return get_backend().load_account(acc_no)
+
+
+@timed("storage_load_history")
+def load_history(acc_no, start=None, end=None, offset=0, limit=None, newest_first=True):
+    return get_backend().load_history(acc_no, start, end, offset, limit, newest_first)
+
+
+@timed("storage_load_all_accounts")
+def load_all_accounts():
+    return get_backend().load_all_accounts()
+
+
+def iter_accounts(fields=None):
+    return get_backend().iter_accounts(fields)
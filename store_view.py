@@ -0,0 +1,71 @@
+import threading
+from storage import iter_accounts, get_backend
+
+
+class StoreView:
+    # Base for in-memory views derived from every stored account. The store
+    # is scanned once (one streaming pass over FIELDS); after that each save
+    # notification is applied incrementally. A backend version change the
+    # view did not see (another process, or a write that bypassed the save
+    # hook) triggers a fresh scan on next use.
+    FIELDS = ()
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = None
+        self.scans = 0
+        self._reset()
+
+    def _reset(self):
+        pass
+
+    def _load(self, rows):
+        for row in rows:
+            self._add_row(row)
+
+    def _add_row(self, row):
+        raise NotImplementedError
+
+    def _saved(self, account):
+        raise NotImplementedError
+
+    def _saved_all(self, accounts):
+        for acc in accounts:
+            self._saved(acc)
+
+    def _removed(self, acc_no):
+        raise NotImplementedError
+
+    def _scan(self):
+        self._reset()
+        self._version = get_backend().version()
+        self._load(iter_accounts(fields=self.FIELDS))
+        self._loaded = True
+        self.scans += 1
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._scan()
+            return
+        version = get_backend().version()
+        if version is not None and version != self._version:
+            self._scan()
+
+    def on_save(self, saved, removed, reset):
+        with self._lock:
+            if reset:
+                self._loaded = False
+                return
+            if not self._loaded:
+                return
+            before, after = get_backend().last_write()
+            if before != self._version:
+                # Someone else wrote since we were last in step; applying
+                # just this write would leave theirs out.
+                self._loaded = False
+                return
+            self._saved_all(saved)
+            for acc_no in removed:
+                self._removed(acc_no)
+            self._version = after
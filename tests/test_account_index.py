@@ -0,0 +1,39 @@
+import random
+import unittest
+from account_index import AccountIndex, BULK_SAVE
+from bank_account import BankAccount
+
+NAMES = ("Asha Rao", "Ravi Kumar", "Meera Iyer", "Arjun Singh", "Asha Nair")
+
+
+def _account(n, rng):
+    return BankAccount(f"ACC{100000 + n}", rng.choice(NAMES), "F", "01-01-1990", "12 Park Street",
+                       f"98765{rng.randrange(100):05d}", f"user{rng.randrange(50)}@example.com", "Savings",
+                       "Active", True, rng.choice(("BR001", "BR002")), "2020-01-01", "1234", 5000)
+
+
+def _state(index):
+    return index.entries, index.by_mobile, index.by_email, index.by_branch, index.holders
+
+
+class BulkSaveTest(unittest.TestCase):
+    def test_bulk_save_matches_one_at_a_time(self):
+        rng = random.Random(7)
+        existing = [_account(n, rng) for n in range(200)]
+        # New accounts, changed existing ones, and one saved twice.
+        batch = [_account(n, rng) for n in range(150, 300)] + [_account(299, rng)]
+        self.assertGreaterEqual(len(batch), BULK_SAVE)
+
+        bulk, single = AccountIndex(), AccountIndex()
+        for index in (bulk, single):
+            for acc in existing:
+                index._saved(acc)
+        bulk._saved_all(batch)
+        for acc in batch:
+            single._saved(acc)
+        self.assertEqual(_state(bulk), _state(single))
+        self.assertEqual(bulk.holders, sorted(bulk.holders))
+
+
+if __name__ == "__main__":
+    unittest.main()
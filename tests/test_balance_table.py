@@ -0,0 +1,75 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from bank_account import BankAccount
+from balance_table import BalanceTable
+from storage import JsonStorage, set_backend, get_backend, save_account, iter_accounts, add_save_listener, \
+    remove_save_listener
+
+
+def _account(acc_no, balance):
+    return BankAccount(acc_no, "Asha Rao", "F", "01-01-1990", "12 Park Street", "9876543210",
+                       "asha@example.com", "Savings", "Active", True, "BR001", "2020-01-01", "1234", balance)
+
+
+class BalanceTableRebuildTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        set_backend(JsonStorage("data.json"))
+        self.table = BalanceTable("test_balances.dat")
+        add_save_listener(self.table.on_save)
+        for i in range(20):
+            save_account(_account(f"ACC{100000 + i}", 1000 + i))
+
+    def tearDown(self):
+        remove_save_listener(self.table.on_save)
+        self.table.close()
+        set_backend(None)
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def _wait_rebuilt(self):
+        self.table._rebuild_thread.join()
+
+    def test_stale_table_is_rebuilt_off_the_read_path(self):
+        self.assertIsNone(self.table.get("ACC100001"))
+        self._wait_rebuilt()
+        self.assertEqual(self.table.balance("ACC100001"), 1001)
+
+        # A write that bypasses the save hook: the read falls back instead of
+        # rescanning, and the table catches up in the background.
+        account = get_backend().load_account("ACC100002")
+        account.deposit(500)
+        get_backend().save_account(account, allow_update=True)
+        self.assertIsNone(self.table.get("ACC100002"))
+        self._wait_rebuilt()
+        self.assertEqual(self.table.balance("ACC100002"), 1502)
+        self.assertEqual(self.table.rebuilds, 2)
+
+    def test_saves_during_rebuild_are_kept(self):
+        started = threading.Event()
+        proceed = threading.Event()
+
+        def slow_scan(fields=None):
+            started.set()
+            proceed.wait()
+            return iter_accounts(fields=fields)
+
+        with mock.patch("balance_table.iter_accounts", slow_scan):
+            self.assertIsNone(self.table.get("ACC100003"))
+            started.wait()
+            account = get_backend().load_account("ACC100003")
+            account.deposit(200)
+            save_account(account, allow_update=True)
+            save_account(_account("ACC200000", 7))
+            proceed.set()
+            self._wait_rebuilt()
+        self.assertEqual(self.table.balance("ACC100003"), 1203)
+        self.assertEqual(self.table.balance("ACC200000"), 7)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+from bank_account import BankAccount
+from jsonl_storage import JsonLinesStorage
+from sqlite_storage import SqliteStorage
+from storage import JsonStorage
+
+BASE = 1700000000
+
+
+def _account():
+    account = BankAccount("100001", "Asha Rao", "F", "01-01-1990", "12 Park Street", "9876543210",
+                          "asha@example.com", "Savings", "Active", True, "BR001", "2020-01-01", "1234", 5000)
+    # The clock steps back 50 s after the third entry.
+    for i, offset in enumerate((0, 100, 200, 150, 160, 300)):
+        account.history.add(BASE + offset, "D", 10.0, 5000.0 + 10 * i)
+    return account
+
+
+class HistoryQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _check(self, backend):
+        account = _account()
+        try:
+            backend.save_account(account)
+            for start, end in ((BASE + 150, None), (None, BASE + 160), (BASE + 120, BASE + 170), (BASE + 201, None)):
+                for newest_first in (True, False):
+                    expected = account.get_history_page(start, end, newest_first=newest_first)
+                    got = backend.load_history("100001", start, end, newest_first=newest_first)
+                    self.assertEqual([e.balance for e in got], [e.balance for e in expected], (start, end))
+        finally:
+            backend.close()
+
+    def test_json_matches_in_memory_page(self):
+        self._check(JsonStorage(os.path.join(self.tmp.name, "data.json")))
+
+    def test_jsonl_matches_in_memory_page(self):
+        self._check(JsonLinesStorage(os.path.join(self.tmp.name, "data.jsonl")))
+
+    def test_sqlite_matches_in_memory_page(self):
+        self._check(SqliteStorage(os.path.join(self.tmp.name, "bank.db")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+from admin import Admin
+from admin_storage import AdminRegistry
+from bank_account import BankAccount
+from jsonl_storage import JsonLinesStorage
+from storage import JsonStorage
+
+
+def _account(acc_no, holder):
+    return BankAccount(acc_no, holder, "F", "01-01-1990", "12 Park Street", "9876543210",
+                       "asha@example.com", "Savings", "Active", True, "BR001", "2020-01-01", "1234", 5000)
+
+
+def _glue_last_line(path):
+    # What an older writer left after a crash: half of a record with no
+    # newline, and the next (acknowledged) record appended straight after it.
+    with open(path, "rb") as f:
+        lines = f.readlines()
+    fragment = lines[0][:len(lines[0]) // 2]
+    with open(path, "wb") as f:
+        f.write(b"".join(lines[:-1]) + fragment + lines[-1])
+
+
+class GluedRecordTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_json_journal(self):
+        path = os.path.join(self.dir, "data.json")
+        store = JsonStorage(path, journal_mode=True)
+        store.save_account(_account("100001", "Asha Rao"))
+        store.save_account(_account("100002", "Ravi Kumar"))
+        store.close()
+        _glue_last_line(store.journal_path)
+
+        store = JsonStorage(path, journal_mode=True)
+        try:
+            self.assertEqual(store.load_account("100002").holder, "Ravi Kumar")
+            self.assertEqual(store.skipped_records, 0)
+            store.save_account(_account("100003", "Meera Iyer"))
+        finally:
+            store.close()
+        store = JsonStorage(path, journal_mode=True)
+        try:
+            self.assertEqual(sorted(acc.account_number for acc in store.load_all_accounts()), ["100001", "100002", "100003"])
+        finally:
+            store.close()
+
+    def test_jsonl_store(self):
+        path = os.path.join(self.dir, "data.jsonl")
+        store = JsonLinesStorage(path)
+        store.save_account(_account("100001", "Asha Rao"))
+        store.save_account(_account("100002", "Ravi Kumar"))
+        store.close()
+        _glue_last_line(path)
+        os.remove(store.index_path)
+
+        store = JsonLinesStorage(path)
+        try:
+            self.assertEqual(store.load_account("100002").holder, "Ravi Kumar")
+            rows = {row.account_number: row.holder for row in store.iter_accounts(("account_number", "holder"))}
+            self.assertEqual(rows, {"100001": "Asha Rao", "100002": "Ravi Kumar"})
+        finally:
+            store.close()
+
+    def test_admin_journal(self):
+        registry = AdminRegistry(os.path.join(self.dir, "admin.json"), os.path.join(self.dir, "admin.journal"))
+        registry.add(Admin("alice", "x", "admin"))
+        registry.add(Admin("bob", "y", "admin"))
+        _glue_last_line(registry.journal_path)
+
+        registry = AdminRegistry(registry.path, registry.journal_path)
+        self.assertIsNotNone(registry.get("bob"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import os
+import pstats
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+
+def _worker_task(n):
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+
+
+class ProfileTest(unittest.TestCase):
+    def test_profile_covers_worker_threads(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.prof")
+            metrics.start_profile(path)
+            try:
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    list(pool.map(_worker_task, [1000] * 4))
+            finally:
+                self.assertEqual(metrics.stop_profile(path), path)
+            calls = [value[0] for key, value in pstats.Stats(path).stats.items() if key[2] == "_worker_task"]
+            self.assertEqual(calls, [4])
+
+    def test_start_twice_and_stop_without_start(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "run.prof")
+            metrics.start_profile(path)
+            metrics.start_profile(path)
+            self.assertEqual(metrics.stop_profile(path), path)
+            self.assertIsNone(metrics.stop_profile(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import time
+import unittest
+import storage
+from bank_account import BankAccount
+from history_archive import archive_history, archived_history_page
+from migrate_storage import migrate_json
+from sqlite_storage import SqliteStorage
+from storage import JsonStorage, set_backend, save_account
+
+
+def _account(acc_no):
+    account = BankAccount(acc_no, "Asha Rao", "F", "01-01-1990", "12 Park Street", "9876543210",
+                          "asha@example.com", "Savings", "Active", True, "BR001", "2020-01-01", "1234", 5000)
+    old = int(time.time()) - 3 * 365 * 86400
+    for i in range(5):
+        account.history.add(old + i, "D", 100.0, 5000.0 + 100 * i)
+    for i in range(3):
+        account.history.add(int(time.time()) - 10 + i, "W", 50.0, 5400.0 - 50 * i)
+    return account
+
+
+class MigrateArchivedTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        set_backend(None)
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_archived_entries_survive_migration_to_sqlite(self):
+        set_backend(JsonStorage("data.json"))
+        save_account(_account("100001"))
+        summary = archive_history(older_than_days=365, archive_dir="archive", measure=False)
+        self.assertEqual(summary["entries"], 5)
+        storage.checkpoint()
+
+        self.assertEqual(migrate_json("data.json", "bank.db"), 1)
+        target = SqliteStorage("bank.db")
+        try:
+            account = target.load_account("100001")
+        finally:
+            target.close()
+        self.assertEqual(account.archived, 5)
+        self.assertEqual(len(account.history), 3)
+        page = archived_history_page(account, archive_dir="archive", newest_first=False)
+        self.assertEqual([entry.kind for entry in page], ["D"] * 5 + ["W"] * 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import storage
+from bank_account import BankAccount
+from bank_service import service, ConcurrentUpdate
+from storage import JsonStorage, set_backend, get_backend, save_account, load_account
+
+
+def _account(acc_no):
+    return BankAccount(acc_no, "Asha Rao", "F", "01-01-1990", "12 Park Street", "9876543210",
+                       "asha@example.com", "Savings", "Active", True, "BR001", "2020-01-01", "1234", 5000)
+
+
+def _save_behind(acc_no):
+    # Another session saving the account while this one holds a copy.
+    other = get_backend().load_account(acc_no)
+    other.holder = other.holder + "!"
+    get_backend().save_account(other, allow_update=True)
+
+
+class UpdateRetryTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        set_backend(JsonStorage("data.json"))
+        save_account(_account("ACC100001"))
+
+    def tearDown(self):
+        set_backend(None)
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_retries_back_off_and_then_succeed(self):
+        calls = []
+
+        def deposit(acc):
+            calls.append(acc.version)
+            if len(calls) < 3:
+                _save_behind(acc.account_number)
+            acc.deposit(100)
+
+        with mock.patch("storage.time.sleep") as sleep:
+            storage.update_account("ACC100001", deposit)
+        self.assertEqual(len(calls), 3)
+        delays = [c.args[0] for c in sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        for attempt, delay in enumerate(delays):
+            self.assertLessEqual(delay, storage.RETRY_DELAY * 2 ** attempt)
+        self.assertEqual(load_account("ACC100001").get_balance(), 5100)
+
+    def test_losing_every_retry_is_a_bank_error(self):
+        with mock.patch("storage.time.sleep"), \
+                mock.patch.object(BankAccount, "deposit", lambda acc, amount: _save_behind(acc.account_number)):
+            with self.assertRaises(ConcurrentUpdate):
+                service.deposit("ACC100001", 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,337 @@
+import math
+import re
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+
+DEPOSIT = "D"
+WITHDRAWAL = "W"
+TRANSFER_OUT = "T"
+TRANSFER_IN = "R"
+NOTE = "N"
+
+KIND_NAMES = {
+    DEPOSIT: "deposit",
+    WITHDRAWAL: "withdrawal",
+    TRANSFER_OUT: "transfer_out",
+    TRANSFER_IN: "transfer_in",
+    NOTE: "note"
+}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+DATE_FORMAT = "%d-%m-%Y"
+
+LEGACY_ENTRY = re.compile(
+    r"^\[(?P<time>[^\]]+)\] (?P<action>Deposited|Withdrew|Transferred|Received): "
+    r"₹(?P<amount>-?[\d,]+(?:\.\d+)?)(?: (?:to|from) (?P<counterparty>\S+))?, "
+    r"Balance: ₹(?P<balance>-?[\d,]+(?:\.\d+)?)$"
+)
+LEGACY_TIME = re.compile(r"^\[(?P<time>[^\]]+)\]")
+LEGACY_KINDS = {
+    "Deposited": DEPOSIT,
+    "Withdrew": WITHDRAWAL,
+    "Transferred": TRANSFER_OUT,
+    "Received": TRANSFER_IN
+}
+
+
+class Transaction:
+    # One history entry. Kept as typed fields and only turned into text when
+    # displayed; stored as a short list: [time, kind, amount, balance(, counterparty)].
+    # Accounts hold their entries in a History; a Transaction is built when
+    # an entry is read.
+    __slots__ = ("time", "kind", "amount", "balance", "counterparty")
+
+    def __init__(self, time, kind, amount, balance, counterparty=None):
+        self.time = int(time)
+        self.kind = kind
+        self.amount = float(amount)
+        self.balance = None if balance is None else float(balance)
+        self.counterparty = counterparty
+
+    @classmethod
+    def from_record(cls, record):
+        if isinstance(record, cls):
+            return record
+        if isinstance(record, str):
+            return parse_legacy_entry(record)
+        return cls(*record)
+
+    def to_record(self):
+        record = [self.time, self.kind, self.amount, self.balance]
+        if self.counterparty is not None:
+            record.append(self.counterparty)
+        return record
+
+    def to_dict(self):
+        return {
+            "time": self.time,
+            "kind": KIND_NAMES.get(self.kind, self.kind),
+            "amount": self.amount,
+            "balance": self.balance,
+            "counterparty": self.counterparty
+        }
+
+    def format(self):
+        stamp = datetime.fromtimestamp(self.time).strftime(TIME_FORMAT)
+        if self.kind == DEPOSIT:
+            action = f"Deposited: ₹{self.amount:.2f}"
+        elif self.kind == WITHDRAWAL:
+            action = f"Withdrew: ₹{self.amount:.2f}"
+        elif self.kind == TRANSFER_OUT:
+            action = f"Transferred: ₹{self.amount:.2f} to {self.counterparty}"
+        elif self.kind == TRANSFER_IN:
+            action = f"Received: ₹{self.amount:.2f} from {self.counterparty}"
+        else:
+            return self.counterparty or ""
+        return f"[{stamp}] {action}, Balance: ₹{self.balance:.2f}"
+
+    def __str__(self):
+        return self.format()
+
+    def __repr__(self):
+        return f"Transaction({self.to_record()!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Transaction):
+            return NotImplemented
+        return self.to_record() == other.to_record()
+
+
+def _parse_time(text):
+    try:
+        return int(datetime.strptime(text, TIME_FORMAT).timestamp())
+    except ValueError:
+        return 0
+
+
+def parse_legacy_entry(text):
+    # Converts the old "[time] Action: ₹x, Balance: ₹y" strings. Anything
+    # unrecognised is kept verbatim as a note so no history is lost.
+    match = LEGACY_ENTRY.match(text)
+    if match is None:
+        stamp = LEGACY_TIME.match(text)
+        return Transaction(_parse_time(stamp.group("time")) if stamp else 0, NOTE, 0, None, text)
+    return Transaction(
+        _parse_time(match.group("time")),
+        LEGACY_KINDS[match.group("action")],
+        match.group("amount").replace(",", ""),
+        match.group("balance").replace(",", ""),
+        match.group("counterparty")
+    )
+
+
+class History(Sequence):
+    # An account's transaction history as parallel columns: times, one-byte
+    # kind codes, amounts and balances in typed arrays (NaN for "no
+    # balance"), and counterparties in a list that only exists once an entry
+    # has one. About 25 bytes an entry (33 with counterparties) instead of
+    # ~230 for a list of Transaction objects. Indexing builds a Transaction;
+    # slicing returns another History.
+    __slots__ = ("times", "kinds", "amounts", "balances", "counterparties")
+
+    def __init__(self, entries=()):
+        self.times = array("q")
+        self.kinds = bytearray()
+        self.amounts = array("d")
+        self.balances = array("d")
+        self.counterparties = None
+        for entry in entries:
+            self.append(entry)
+
+    def add(self, time, kind, amount, balance, counterparty=None):
+        code = kind.encode("ascii") if isinstance(kind, str) else b""
+        if len(code) != 1:
+            raise ValueError(f"Unknown transaction kind {kind!r}")
+        if counterparty is not None and self.counterparties is None:
+            self.counterparties = [None] * len(self.times)
+        self.times.append(int(time))
+        self.kinds += code
+        self.amounts.append(float(amount))
+        self.balances.append(math.nan if balance is None else float(balance))
+        if self.counterparties is not None:
+            # Interned: the same few account numbers recur across entries.
+            self.counterparties.append(None if counterparty is None else sys.intern(str(counterparty)))
+
+    @classmethod
+    def from_records(cls, records):
+        # Stored [time, kind, amount, balance(, counterparty)] lists, one
+        # column at a time; anything else (legacy strings, Transactions, odd
+        # values) goes entry by entry.
+        history = cls()
+        if not records:
+            return history
+        try:
+            if not all(type(record) is list for record in records):
+                raise TypeError
+            kinds = "".join([record[1] for record in records]).encode("ascii")
+            if len(kinds) != len(records):
+                raise TypeError
+            history.times = array("q", [record[0] for record in records])
+            history.amounts = array("d", [record[2] for record in records])
+            history.balances = array("d", [math.nan if record[3] is None else record[3] for record in records])
+            history.kinds = bytearray(kinds)
+            if any(len(record) > 4 for record in records):
+                history.counterparties = [
+                    sys.intern(str(record[4])) if len(record) > 4 and record[4] is not None else None
+                    for record in records
+                ]
+        except (TypeError, ValueError, IndexError, OverflowError):
+            history = cls(records)
+        return history
+
+    def append(self, entry):
+        if isinstance(entry, Transaction):
+            self.add(entry.time, entry.kind, entry.amount, entry.balance, entry.counterparty)
+        elif isinstance(entry, str):
+            self.append(parse_legacy_entry(entry))
+        else:
+            self.add(*entry)
+
+    def _entry(self, i):
+        balance = self.balances[i]
+        return Transaction(
+            self.times[i], chr(self.kinds[i]), self.amounts[i], None if math.isnan(balance) else balance,
+            None if self.counterparties is None else self.counterparties[i]
+        )
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            part = History()
+            part.times = self.times[i]
+            part.kinds = self.kinds[i]
+            part.amounts = self.amounts[i]
+            part.balances = self.balances[i]
+            if self.counterparties is not None:
+                part.counterparties = self.counterparties[i]
+            return part
+        if i < 0:
+            i += len(self.times)
+        if not 0 <= i < len(self.times):
+            raise IndexError("history index out of range")
+        return self._entry(i)
+
+    def __iter__(self):
+        for i in range(len(self.times)):
+            yield self._entry(i)
+
+    def __add__(self, other):
+        combined = self.copy()
+        for entry in other:
+            combined.append(entry)
+        return combined
+
+    def __radd__(self, other):
+        return History(other) + self
+
+    def __eq__(self, other):
+        if isinstance(other, (History, list)):
+            return to_records(self) == to_records(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"History({self.records()!r})"
+
+    def copy(self):
+        return self[:]
+
+    def records(self):
+        counterparties = self.counterparties or ()
+        records = []
+        for i, (time, kind, amount, balance) in enumerate(zip(self.times, self.kinds, self.amounts, self.balances)):
+            record = [time, chr(kind), amount, None if math.isnan(balance) else balance]
+            if counterparties and counterparties[i] is not None:
+                record.append(counterparties[i])
+            records.append(record)
+        return records
+
+
+def to_transactions(history):
+    if isinstance(history, History):
+        return history.copy()
+    if isinstance(history, list):
+        return History.from_records(history)
+    return History(history or ())
+
+
+def to_records(history):
+    if isinstance(history, History):
+        return history.records()
+    return [entry.to_record() for entry in history]
+
+
+def extend_times(times, history):
+    # Sorted timestamp index parallel to history. Entries are appended in
+    # time order; a clock step backwards is clamped so bisection stays valid.
+    last = times[-1] if times else 0
+    if isinstance(history, History):
+        new = history.times[len(times):]
+    else:
+        new = (entry.time for entry in history[len(times):])
+    for time in new:
+        if time > last:
+            last = time
+        times.append(last)
+    return times
+
+
+def page_bounds(lo, hi, offset=0, limit=None, newest_first=True):
+    # [begin, stop) of one page of the entries lo..hi-1, counting `offset`
+    # from the newest end when newest_first.
+    offset = max(int(offset or 0), 0)
+    if newest_first:
+        stop = max(hi - offset, lo)
+        begin = lo if limit is None else max(stop - int(limit), lo)
+    else:
+        begin = min(lo + offset, hi)
+        stop = hi if limit is None else min(begin + int(limit), hi)
+    return begin, stop
+
+
+def query_history(history, times, start=None, end=None, offset=0, limit=None, newest_first=True):
+    # start/end are inclusive epoch seconds; only the requested window is
+    # sliced out of the list.
+    lo = 0 if start is None else bisect_left(times, start)
+    hi = len(history) if end is None else bisect_right(times, end)
+    begin, stop = page_bounds(lo, hi, offset, limit, newest_first)
+    page = list(history[begin:stop])
+    return page[::-1] if newest_first else page
+
+
+def _record_times(records):
+    # Clamped like extend_times, so the window matches query_history's even
+    # across a clock step backwards.
+    times = []
+    last = 0
+    for record in records:
+        time = record[0] if type(record) is list else Transaction.from_record(record).time
+        if time > last:
+            last = time
+        times.append(last)
+    return times
+
+
+def query_records(records, start=None, end=None, offset=0, limit=None, newest_first=True):
+    # Same page as query_history, straight from stored records: only the
+    # entries on the page are decoded (a date range reads each entry's time).
+    times = _record_times(records) if start is not None or end is not None else ()
+    lo = 0 if start is None else bisect_left(times, start)
+    hi = len(records) if end is None else bisect_right(times, end)
+    begin, stop = page_bounds(lo, hi, offset, limit, newest_first)
+    page = [Transaction.from_record(record) for record in records[begin:stop]]
+    return page[::-1] if newest_first else page
+
+
+def day_bounds(from_date=None, to_date=None):
+    # DD-MM-YYYY dates -> inclusive epoch range covering both whole days.
+    start = end = None
+    if from_date:
+        start = int(datetime.strptime(from_date, DATE_FORMAT).timestamp())
+    if to_date:
+        end = int((datetime.strptime(to_date, DATE_FORMAT) + timedelta(days=1)).timestamp()) - 1
+    return start, end
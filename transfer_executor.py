@@ -0,0 +1,119 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from account_locks import account_locks
+from storage import update_accounts
+from validation import validate_account_number, validate_amount
+
+DEFAULT_WORKERS = 8
+
+
+class TransferExecutor:
+    def __init__(self, max_workers=DEFAULT_WORKERS):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self._stats_lock = threading.Lock()
+        self.completed = 0
+        self.failed = 0
+        self.lock_wait = 0.0
+        self.max_lock_wait = 0.0
+
+    def _record(self, ok, waited):
+        with self._stats_lock:
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.lock_wait += waited
+            self.max_lock_wait = max(self.max_lock_wait, waited)
+
+    def transfer(self, source, target, amount):
+        source = source.strip().upper()
+        target = target.strip().upper()
+        result = {"source": source, "target": target, "amount": amount, "lock_wait": 0.0}
+        try:
+            for acc_no in (source, target):
+                is_valid, error_msg = validate_account_number(acc_no)
+                if not is_valid:
+                    raise ValueError(error_msg)
+            if source == target:
+                raise ValueError("Cannot transfer to the same account")
+            is_valid, error_msg, amount = validate_amount(amount)
+            if not is_valid:
+                raise ValueError(error_msg)
+        except ValueError as e:
+            result.update(status="ERROR", message=str(e))
+            self._record(False, 0.0)
+            return result
+
+        waited = 0.0
+        try:
+            with account_locks.locked([source, target]) as waited:
+                # Both accounts are locked, so debit, credit and both history
+                # entries happen and are saved together in one write.
+                src, dst = update_accounts([source, target], lambda s, d: s.transfer(d, amount))
+            result.update(status="OK", message="", balance=src.get_balance())
+            ok = True
+        except ValueError as e:
+            result.update(status="ERROR", message=str(e))
+            ok = False
+        result["lock_wait"] = waited
+        self._record(ok, waited)
+        return result
+
+    def submit(self, source, target, amount):
+        return self._pool.submit(self.transfer, source, target, amount)
+
+    def run(self, transfers):
+        start = time.perf_counter()
+        futures = [self.submit(source, target, amount) for source, target, amount in transfers]
+        results = [future.result() for future in futures]
+        elapsed = time.perf_counter() - start
+        return results, self.stats(elapsed)
+
+    def stats(self, elapsed=None):
+        with self._stats_lock:
+            done = self.completed + self.failed
+            stats = {
+                "workers": self.max_workers,
+                "completed": self.completed,
+                "failed": self.failed,
+                "lock_wait_total": self.lock_wait,
+                "lock_wait_avg": self.lock_wait / done if done else 0.0,
+                "lock_wait_max": self.max_lock_wait
+            }
+        if elapsed is not None:
+            stats["seconds"] = elapsed
+            stats["transfers_per_sec"] = done / elapsed if elapsed else 0.0
+        return stats
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+
+if __name__ == "__main__":
+    from batch import read_operations
+
+    if len(sys.argv) < 2:
+        print("Usage: python transfer_executor.py TRANSFERS.csv|TRANSFERS.jsonl [WORKERS]")
+        sys.exit(1)
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_WORKERS
+    transfers = [
+        (str(op.get("account") or ""), str(op.get("target") or ""), op.get("amount"))
+        for _, op in read_operations(sys.argv[1])
+    ]
+    with TransferExecutor(workers) as executor:
+        results, stats = executor.run(transfers)
+    for result in results:
+        if result["status"] != "OK":
+            print(f"❌ {result['source']} → {result['target']} ₹{result['amount']}: {result['message']}")
+    print(f"✅ {stats['completed']} transfers completed, {stats['failed']} failed "
+          f"in {stats['seconds']:.2f}s ({stats['transfers_per_sec']:,.0f}/s)")
+    print(f"   Lock wait: avg {stats['lock_wait_avg'] * 1000:.3f} ms, max {stats['lock_wait_max'] * 1000:.3f} ms")
@@ -2,6 +2,23 @@ import re
 from datetime import datetime
 
 
+# Allocated account numbers are ACC + 11-digit sequence + Luhn check digit;
+# older numbers (ACC + 10-digit timestamp) carry no check digit.
+CHECKED_ACCOUNT_LENGTH = 15
+
+
+def luhn_digit(digits):
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        d = int(ch)
+        if i % 2 == 0:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return str((10 - total % 10) % 10)
+
+
 def validate_account_number(acc_no, existing=None):
     if not acc_no:
         return False, "Account number cannot be empty."
@@ -13,13 +30,11 @@ def validate_account_number(acc_no, existing=None):
     if not re.match(pattern, acc_no):
         return False, "Invalid format. Account number must be ACC followed by digits (e.g., ACC1767122042)."
     
-    if existing is not None:
-        if isinstance(existing, dict):
-            if acc_no not in existing:
-                return False, f"Account {acc_no} does not exist."
-        elif isinstance(existing, (list, tuple, set)):
-            if acc_no not in existing:
-                return False, f"Account {acc_no} does not exist."
+    if len(acc_no) == CHECKED_ACCOUNT_LENGTH and luhn_digit(acc_no[3:-1]) != acc_no[-1]:
+        return False, "Invalid account number. Please check the digits and try again."
+    
+    if existing is not None and acc_no not in existing:
+        return False, f"Account {acc_no} does not exist."
     
     return True, ""
 